@@ -9,6 +9,8 @@ from qfluentwidgets import FluentIcon, ConfigItem, qconfig
 from server.my_test import VocabularyLearningSystem
 from client.home import Ui_home_widget
 from client.appcard import AppCard
+from client.chart_loader import ChartLoader
+from client.db_connection_pool import DatabaseConnection
 class HomeWidget(QWidget):
     def __init__(self,parent=None):
         super().__init__()
@@ -50,7 +52,9 @@ class HomeWidget(QWidget):
         # 从父窗口获取用户名并传递给 VocabularyLearningSystem
         username = self.parent.username if hasattr(self.parent, 'username') else None
         self.VLS = VocabularyLearningSystem(username=username)
-        self.ui.HorizontalFlipView.addImage(self.VLS.show_day_stats())
+        # 每日统计图在后台渲染，先显示占位图
+        self.chart_loader = ChartLoader(self)
+        self.chart_loader.load(self.ui.HorizontalFlipView, [self.VLS.submit_day_stats()])
         self.ui.HorizontalFlipView.setAspectRatioMode(Qt.AspectRatioMode.KeepAspectRatio)
         self.ui.HorizontalFlipView.setItemSize(QSize(561, 270))
         self.ui.HorizontalFlipView.setFixedSize(QSize(561, 270))
@@ -106,7 +110,11 @@ class HomeWidget(QWidget):
 
     def flush(self):
         username = self.parent.username if hasattr(self.parent, 'username') else None
-        self.VLS = VocabularyLearningSystem(username=username)
+        if self.VLS.username == username:
+            # 同一用户只重新加载有变化的数据
+            self.VLS.refresh()
+        else:
+            self.VLS = VocabularyLearningSystem(username=username)
 
         # 使用更简单的方式：重新初始化整个 home 界面
         # 保存旧的 HorizontalFlipView 的父布局位置
@@ -135,7 +143,7 @@ class HomeWidget(QWidget):
             self.ui.HorizontalFlipView.setFixedSize(old_size)
             self.ui.HorizontalFlipView.setItemSize(old_item_size)
             self.ui.HorizontalFlipView.setAspectRatioMode(old_aspect_mode)
-            self.ui.HorizontalFlipView.addImage(self.VLS.show_day_stats())
+            self.chart_loader.load(self.ui.HorizontalFlipView, [self.VLS.submit_day_stats()])
             self.ui.HorizontalFlipView.show()
 
         except Exception as e:
@@ -211,11 +219,8 @@ class HomeWidget(QWidget):
     def _load_score_from_database(self):
         """从数据库加载用户积分"""
         try:
-            from server.database_manager import DatabaseFactory
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-            user_config = db.get_user_config(self.parent.username)
-            db.close()
+            with DatabaseConnection() as db:
+                user_config = db.get_user_config(self.parent.username)
 
             if user_config and 'total_score' in user_config:
                 self.configitem.value = float(user_config['total_score'])
@@ -229,11 +234,8 @@ class HomeWidget(QWidget):
     def _load_target_score(self):
         """从数据库加载用户目标积分"""
         try:
-            from server.database_manager import DatabaseFactory
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-            user_config = db.get_user_config(self.parent.username)
-            db.close()
+            with DatabaseConnection() as db:
+                user_config = db.get_user_config(self.parent.username)
 
             if user_config and 'target_score' in user_config:
                 self.target_score = int(user_config['target_score'])
@@ -251,13 +253,10 @@ class HomeWidget(QWidget):
     def _save_score_to_database(self):
         """保存用户积分到数据库"""
         try:
-            from server.database_manager import DatabaseFactory
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-            db.save_user_config(
-                username=self.parent.username,
-                total_score=float(self.configitem.value)
-            )
-            db.close()
+            with DatabaseConnection() as db:
+                db.save_user_config(
+                    username=self.parent.username,
+                    total_score=float(self.configitem.value)
+                )
         except Exception as e:
             print(f"[ERROR] Failed to save score to database: {e}")
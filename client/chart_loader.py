@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+把后台渲染的统计图异步放进 HorizontalFlipView
+
+load() 先为每张图放入占位图，ChartService 渲染完成后（在工作线程中）通过信号
+回到界面线程解码 PNG 并替换对应位置的图片；已缓存的图直接显示，不经过占位图。
+渲染失败时占位图换成"图表生成失败"。
+"""
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+
+def placeholder_image(width=561, height=270, text="图表生成中…"):
+    """渲染完成前（或失败后）显示的占位图"""
+    image = QImage(width, height, QImage.Format_ARGB32)
+    image.fill(QColor(245, 245, 245))
+    painter = QPainter(image)
+    painter.setPen(QColor(150, 150, 150))
+    painter.drawText(image.rect(), Qt.AlignCenter, text)
+    painter.end()
+    return image
+
+
+def _to_qimage(png):
+    image = QImage()
+    image.loadFromData(png)
+    return image
+
+
+class ChartLoader(QObject):
+    """异步加载图表到 FlipView"""
+    chartReady = pyqtSignal(object, int, bytes)  # FlipView, 位置, PNG
+    chartFailed = pyqtSignal(object, int, str)   # FlipView, 位置, 错误信息
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.chartReady.connect(self._apply)
+        self.chartFailed.connect(self._apply_failure)
+
+    def load(self, flip_view, futures):
+        """
+        把一组渲染任务追加到 flip_view 末尾
+
+        Args:
+            flip_view: HorizontalFlipView
+            futures: ChartService.submit() 返回的 Future 列表（按显示顺序）
+        """
+        start = flip_view.count()
+        images = []
+        pending = []  # 放了占位图的位置
+        for offset, future in enumerate(futures):
+            if future.done() and future.exception() is None:
+                images.append(_to_qimage(future.result()))
+            else:
+                images.append(placeholder_image())
+                pending.append(offset)
+        flip_view.addImages(images)
+
+        # 占位图都要被替换：期间已完成的 Future 调用 add_done_callback 时回调立即执行
+        for offset in pending:
+            futures[offset].add_done_callback(
+                lambda f, index=start + offset: self._deliver(flip_view, index, f))
+
+    def _deliver(self, flip_view, index, future):
+        # 在渲染线程中调用：只发信号，界面操作在 _apply 中完成
+        if future.exception() is not None:
+            print(f"[ERROR] Chart rendering failed: {future.exception()}")
+            self.chartFailed.emit(flip_view, index, str(future.exception()))
+            return
+        self.chartReady.emit(flip_view, index, future.result())
+
+    def _apply(self, flip_view, index, png):
+        self._set_image(flip_view, index, _to_qimage(png))
+
+    def _apply_failure(self, flip_view, index, error):
+        self._set_image(flip_view, index, placeholder_image(text="图表生成失败"))
+
+    def _set_image(self, flip_view, index, image):
+        try:
+            if index < flip_view.count():
+                flip_view.setItemImage(index, image)
+        except RuntimeError:
+            # FlipView 已被删除（例如刷新时重新创建），忽略过期的结果
+            pass
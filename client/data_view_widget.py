@@ -54,9 +54,12 @@ class dataWidget(QWidget):
 
     def flush(self):
         """刷新数据"""
-        # 重新创建 VLS 实例以获取最新数据
+        # 同一用户只重新加载有变化的数据，切换用户时重新创建 VLS 实例
         username = self.parent.username if self.parent and hasattr(self.parent, 'username') else None
-        self.VLS = VocabularyLearningSystem(username)
+        if self.VLS.username == username:
+            self.VLS.refresh()
+        else:
+            self.VLS = VocabularyLearningSystem(username)
 
         # 清空表格
         self.ui.TableWidget.clearContents()
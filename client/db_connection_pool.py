@@ -2,88 +2,246 @@
 数据库连接池管理
 提供全局的数据库连接复用机制
 """
-from threading import Lock
+import atexit
+import time
+from collections import deque
+from threading import Condition, Lock
 from typing import Optional
 from server.database_manager import DatabaseFactory
 
 
 class DatabaseConnectionPool:
-    """数据库连接池 - 单例模式"""
+    """
+    数据库连接池 - 单例模式
+
+    - 最多同时存在 max_size 个连接，池满时借用方等待归还（最长 acquire_timeout 秒）
+    - 借出前做健康检查（DatabaseInterface.ping），失效连接直接丢弃并新建
+    - 空闲超过 idle_timeout 秒的连接会被关闭回收
+    - get_stats() 返回创建/复用/等待耗时等统计信息
+    - 程序退出时 shutdown() 关闭所有连接（ExcelDatabase 在 close() 时才保存修改过的表）
+    """
     _instance = None
     _lock = Lock()
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, max_size=4, idle_timeout=300.0, acquire_timeout=10.0):
         if not hasattr(self, '_initialized'):
-            self._connection = None
-            self._connection_count = 0
-            self._lock = Lock()
+            self.max_size = max_size
+            self.idle_timeout = idle_timeout
+            self.acquire_timeout = acquire_timeout
+            self._cond = Condition(Lock())
+            self._idle = deque()  # (db, 归还时间)，右端为最近归还
+            self._size = 0  # 已创建且未关闭的连接数（空闲 + 借出）
+            self._shutdown = False  # shutdown() 之后归还的连接直接关闭
+            self._stats = {
+                'created': 0,
+                'reused': 0,
+                'closed': 0,
+                'evicted_idle': 0,
+                'health_check_failures': 0,
+                'acquire_timeouts': 0,
+                'waits': 0,
+                'total_wait_time': 0.0,
+                'max_wait_time': 0.0,
+                'peak_in_use': 0,
+            }
             self._initialized = True
 
+    def _create_connection(self):
+        """新建一个数据库连接（在锁外调用）"""
+        db = DatabaseFactory.from_config_file('config.json')
+        if db and db.connect():
+            return db
+        return None
+
+    def _close_quietly(self, db):
+        try:
+            db.close()
+        except Exception as e:
+            print(f"[WARNING] Failed to close pooled connection: {e}")
+
+    def _evict_idle_locked(self, now):
+        """关闭空闲超时的连接（调用方须持有锁），返回待关闭的连接列表"""
+        expired = []
+        # 左端是最早归还的连接
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            db, _ = self._idle.popleft()
+            expired.append(db)
+            self._size -= 1
+            self._stats['evicted_idle'] += 1
+            self._stats['closed'] += 1
+        return expired
+
+    def acquire(self, timeout=None):
+        """
+        借出一个可用连接
+
+        Args:
+            timeout: 池满时的最长等待秒数，默认使用 acquire_timeout
+
+        Returns:
+            数据库实例；超时或无法连接时返回 None
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        waited = False
+
+        while True:
+            candidate = None
+            create_new = False
+            with self._cond:
+                while True:
+                    expired = self._evict_idle_locked(time.monotonic())
+                    if expired:
+                        break
+                    if self._idle:
+                        # LIFO：优先复用最近归还的连接，让其余连接自然空闲超时
+                        candidate, _ = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create_new = True
+                        break
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._stats['acquire_timeouts'] += 1
+                        print("[ERROR] Timed out waiting for a database connection")
+                        return None
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if not candidate and not create_new:
+                # 只是回收了过期连接，关闭后重新尝试
+                for db in expired:
+                    self._close_quietly(db)
+                continue
+
+            if candidate is not None:
+                if candidate.ping():
+                    self._on_checkout(start, waited, reused=True)
+                    return candidate
+                # 健康检查失败：丢弃并重试
+                print("[WARNING] Pooled connection failed health check, discarding")
+                self._close_quietly(candidate)
+                with self._cond:
+                    self._size -= 1
+                    self._stats['health_check_failures'] += 1
+                    self._stats['closed'] += 1
+                    self._cond.notify()
+                continue
+
+            db = self._create_connection()
+            if db is None:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                print("[ERROR] Failed to connect to database")
+                return None
+            self._on_checkout(start, waited, reused=False)
+            return db
+
+    def _on_checkout(self, start, waited, reused):
+        """记录一次借出的统计信息"""
+        wait_time = time.monotonic() - start
+        with self._cond:
+            self._stats['reused' if reused else 'created'] += 1
+            if waited:
+                self._stats['waits'] += 1
+            self._stats['total_wait_time'] += wait_time
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+            in_use = self._size - len(self._idle)
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], in_use)
+
+    def release(self, db, discard=False):
+        """
+        归还连接
+
+        Args:
+            db: acquire() 借出的数据库实例
+            discard: 为 True 时直接关闭该连接（例如使用过程中发现连接已损坏）
+        """
+        if db is None:
+            return
+        with self._cond:
+            discard = discard or self._shutdown
+            if discard:
+                self._size -= 1
+                self._stats['closed'] += 1
+            else:
+                self._idle.append((db, time.monotonic()))
+            expired = self._evict_idle_locked(time.monotonic())
+            self._cond.notify()
+        if discard:
+            self._close_quietly(db)
+        for old in expired:
+            self._close_quietly(old)
+
+    # 兼容旧接口
     def get_connection(self):
         """获取数据库连接（复用）"""
-        with self._lock:
-            if self._connection is None:
-                print("[DEBUG] Creating new database connection...")
-                self._connection = DatabaseFactory.from_config_file('config.json')
-                if self._connection:
-                    success = self._connection.connect()
-                    if not success:
-                        print("[ERROR] Failed to connect to database")
-                        self._connection = None
-                        return None
-                    print("[DEBUG] Database connection established")
-
-            if self._connection:
-                self._connection_count += 1
-                print(f"[DEBUG] Connection reused (count: {self._connection_count})")
+        return self.acquire()
 
-            return self._connection
-
-    def release_connection(self):
+    def release_connection(self, db=None):
         """释放连接引用"""
-        with self._lock:
-            if self._connection_count > 0:
-                self._connection_count -= 1
-                print(f"[DEBUG] Connection released (count: {self._connection_count})")
-
-            # 可选：当没有使用时关闭连接
-            # if self._connection_count == 0 and self._connection:
-            #     self._connection.close()
-            #     self._connection = None
-            #     print("[DEBUG] Database connection closed")
+        self.release(db)
+
+    def get_stats(self):
+        """返回连接池使用统计"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+        checkouts = stats['created'] + stats['reused']
+        stats['avg_wait_time'] = stats['total_wait_time'] / checkouts if checkouts else 0.0
+        return stats
 
     def close_all(self):
-        """关闭所有连接"""
-        with self._lock:
-            if self._connection:
-                self._connection.close()
-                self._connection = None
-                self._connection_count = 0
-                print("[DEBUG] All database connections closed")
+        """关闭所有空闲连接（借出中的连接归还后按正常流程处理）"""
+        with self._cond:
+            idle = [db for db, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats['closed'] += len(idle)
+            self._cond.notify_all()
+        for db in idle:
+            self._close_quietly(db)
+        if idle:
+            print(f"[DEBUG] Closed {len(idle)} pooled database connections")
+
+    def shutdown(self):
+        """程序退出时调用：关闭所有空闲连接，仍在借出中的连接归还时直接关闭"""
+        with self._cond:
+            self._shutdown = True
+        self.close_all()
 
 
 # 全局连接池实例
 connection_pool = DatabaseConnectionPool()
+atexit.register(connection_pool.shutdown)
 
 
 class DatabaseConnection:
-    """数据库连接上下文管理器"""
+    """数据库连接上下文管理器（无法获取连接时抛出 RuntimeError，不会返回 None）"""
 
-    def __init__(self):
+    def __init__(self, timeout=None):
         self.db = None
+        self.timeout = timeout
 
     def __enter__(self):
-        self.db = connection_pool.get_connection()
+        self.db = connection_pool.acquire(self.timeout)
+        if self.db is None:
+            raise RuntimeError("无法获取数据库连接")
         return self.db
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.db:
-            connection_pool.release_connection()
-        return False
\ No newline at end of file
+            connection_pool.release(self.db)
+        return False
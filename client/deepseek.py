@@ -1,18 +1,56 @@
 from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
+from PyQt5.QtCore import QThread, pyqtSignal, Qt, QTimer
 from PyQt5.QtGui import QTextCursor, QColor, QTextCharFormat, QTextBlockFormat
 from openai import OpenAI
 from qfluentwidgets import PushButton, SwitchButton, TextEdit, TextBrowser, RoundMenu, FluentIcon, Action
+import datetime
 import time
 import markdown
-import json
 
 from client.AI import Ui_ai
-
-# 不再使用本地文件存储聊天历史，改为内存存储
+from server.chat_context import ContextWindow, make_summarizer
+
+# 聊天记录每次加载的条数
+CHAT_HISTORY_PAGE_SIZE = 30
+
+# 流式输出的最短刷新间隔（毫秒），期间到达的片段合并为一次渲染
+STREAM_RENDER_INTERVAL = 16
+
+
+def stable_markdown_prefix(text, start=0):
+    """
+    流式文本中已经完成、可以冻结为 HTML 的前缀长度
+
+    块以围栏代码块之外的空行结束，并且下一块已经从行首开始（缩进的行可能属于
+    上一块的列表或代码），返回下一块的起始位置；start 须为上一次返回的位置。
+    """
+    stable = start
+    in_fence = False
+    blank = False
+    pos = start
+    length = len(text)
+    while pos < length:
+        end = text.find('\n', pos)
+        line = text[pos:] if end < 0 else text[pos:end]
+        stripped = line.strip()
+        if stripped:
+            if blank and not line[0].isspace():
+                stable = pos
+            blank = False
+            if stripped.startswith(('```', '~~~')) and end >= 0:
+                in_fence = not in_fence
+        elif end >= 0:
+            # 代码块中的空行不是块边界
+            blank = not in_fence
+        if end < 0:
+            break
+        pos = end + 1
+    return stable
 
 
 class ChatTextEdit(TextBrowser):
+    scrolledToTop = pyqtSignal()  # 滚动到顶部，用于加载更早的聊天记录
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setStyleSheet("""
@@ -54,20 +92,63 @@ class ChatTextEdit(TextBrowser):
         self.ai_format = self.create_text_format(QColor("#2d2d2d"))
         self.user_format = self.create_text_format(QColor("#0078D4"))
 
+        # 流式消息：已完成的块冻结为 HTML，只重新渲染末尾未完成的块
+        self._stream_start = None   # 消息起始位置（append_temp_message 的返回值）
+        self._stream_text = ''      # 最新的完整回复
+        self._frozen_len = 0        # 已冻结的文本长度
+        self._frozen_pos = 0        # 冻结部分之后（末尾块开始）的文档位置
+        self._stream_timer = QTimer(self)
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.setInterval(STREAM_RENDER_INTERVAL)
+        self._stream_timer.timeout.connect(self._render_stream)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
     def create_text_format(self, color):
         char_format = QTextCharFormat()
         char_format.setForeground(color)
         return char_format
 
-    def append_message(self, text, is_ai=True, render_markdown=True):
+    def append_message(self, text, is_ai=True, render_markdown=True, timestamp=None):
         cursor = self.textCursor()
         cursor.movePosition(QTextCursor.End)
 
         if not self.document().isEmpty():
             cursor.insertHtml("<br>")
 
+        self._insert_message(cursor, text, is_ai, render_markdown, timestamp)
+
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+        return cursor.position()
+
+    def prepend_messages(self, messages):
+        """
+        在顶部插入更早的消息，保持当前可见的内容不动
+
+        Args:
+            messages: [(text, is_ai, timestamp), ...]，按时间正序
+        """
+        if not messages:
+            return
+        bar = self.verticalScrollBar()
+        distance = bar.maximum() - bar.value()
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.Start)
+        cursor.beginEditBlock()
+        for index, (text, is_ai, timestamp) in enumerate(messages):
+            if index:
+                cursor.insertHtml("<br>")
+            self._insert_message(cursor, text, is_ai, is_ai, timestamp)
+        cursor.insertHtml("<br>")
+        cursor.endEditBlock()
+
+        bar.setValue(bar.maximum() - distance)
+
+    def _insert_message(self, cursor, text, is_ai, render_markdown, timestamp):
+        """在 cursor 处插入时间戳和消息内容"""
         # 插入时间戳
-        current_time = QtCore.QDateTime.currentDateTime().toString("HH:mm:ss")
+        current_time = timestamp or QtCore.QDateTime.currentDateTime().toString("HH:mm:ss")
         time_format = QTextCharFormat()
         time_format.setFontPointSize(8)
         time_format.setForeground(QColor("#666666"))
@@ -100,9 +181,16 @@ class ChatTextEdit(TextBrowser):
             cursor.setCharFormat(char_format)
             cursor.insertText(text)
 
-        self.setTextCursor(cursor)
-        self.ensureCursorVisible()
-        return cursor.position()
+    def _on_scrolled(self, value):
+        if value == self.verticalScrollBar().minimum():
+            self.scrolledToTop.emit()
+
+    def wheelEvent(self, event):
+        # 内容不足一屏时没有滚动条，向上滚动也视为到达顶部
+        bar = self.verticalScrollBar()
+        if event.angleDelta().y() > 0 and bar.value() == bar.minimum():
+            self.scrolledToTop.emit()
+        super().wheelEvent(event)
 
     def _markdown_to_html(self, text):
         """将Markdown文本转换为HTML"""
@@ -124,7 +212,15 @@ class ChatTextEdit(TextBrowser):
         return start
 
     def update_streaming_message(self, start_pos, text):
-        """ 更新流式消息（边接收边渲染Markdown） """
+        """ 更新流式消息（合并同一帧内的片段，由 _render_stream 增量渲染） """
+        if start_pos != self._stream_start or len(text) < self._frozen_len:
+            self._reset_stream(start_pos)
+        self._stream_text = text
+        if not self._stream_timer.isActive():
+            self._stream_timer.start()
+
+    def _reset_stream(self, start_pos):
+        """开始新的流式消息：清除临时消息"""
         cursor = self.textCursor()
         cursor.setPosition(start_pos)
         cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
@@ -135,15 +231,45 @@ class ChatTextEdit(TextBrowser):
         block_format.setAlignment(Qt.AlignLeft)
         cursor.setBlockFormat(block_format)
 
-        # 渲染Markdown
-        html_content = self._markdown_to_html(text)
-        cursor.insertHtml(html_content)
+        self._stream_start = start_pos
+        self._frozen_len = 0
+        self._frozen_pos = start_pos
+
+    def _render_stream(self):
+        """冻结新完成的块，并重新渲染末尾未完成的块"""
+        if self._stream_start is None:
+            return
+        text = self._stream_text
+        cursor = self.textCursor()
+        cursor.setPosition(self._frozen_pos)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+        stable = stable_markdown_prefix(text, self._frozen_len)
+        if stable > self._frozen_len:
+            cursor.insertHtml(self._markdown_to_html(text[self._frozen_len:stable]))
+            # 末尾块从新的段落开始，避免与冻结的最后一段合并
+            cursor.insertBlock()
+            self._frozen_len = stable
+            self._frozen_pos = cursor.position()
+
+        tail = text[self._frozen_len:]
+        if tail.strip():
+            cursor.insertHtml(self._markdown_to_html(tail))
 
         self.setTextCursor(cursor)
         self.ensureCursorVisible()
 
+    def _finish_stream(self):
+        """流式消息结束（最终回复会整体重新渲染一次）"""
+        self._stream_timer.stop()
+        self._stream_start = None
+        self._stream_text = ''
+        self._frozen_len = 0
+
     def replace_temp_message(self, start_pos, new_text):
         """ 替换临时消息 """
+        self._finish_stream()
         cursor = self.textCursor()
         cursor.setPosition(start_pos)
         cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
@@ -156,21 +282,26 @@ class AiWorker(QThread):
     error = pyqtSignal(str)
     stream_update = pyqtSignal(str)  # 新增：流式更新信号
 
-    def __init__(self, client, messages, model):
+    def __init__(self, client, messages, model, context=None):
         super().__init__()
         self.client = client
         self.messages = messages
         self.model = model
+        self.context = context  # ContextWindow，None 时发送完整记录
 
     def run(self):
         max_retries = 3
         retry_delay = 5
 
+        # 在工作线程中组装请求（可能需要请求一次摘要）
+        messages = self.context.build(self.messages) if self.context is not None else self.messages
+        print(f"[DEBUG] AI request: {len(messages)} of {len(self.messages)} messages")
+
         for attempt in range(max_retries):
             try:
                 response = self.client.chat.completions.create(
                     model=self.model,
-                    messages=self.messages,
+                    messages=messages,
                     stream=True,  # 启用流式输出
                     timeout=100
                 )
@@ -223,17 +354,23 @@ class Ai_Widget(QtWidgets.QWidget):
 
         self.tab_id = tab_id
 
-        # 从数据库加载聊天历史
-        if user_config and user_config['chat_history']:
-            try:
-                self.messages = json.loads(user_config['chat_history'])
-                if not self.messages:
-                    self.messages = [{"role": "system", "content": "You are a helpful assistant."}]
-            except json.JSONDecodeError as e:
-                print(f"[ERROR] Failed to parse chat history: {e}")
-                self.messages = [{"role": "system", "content": "You are a helpful assistant."}]
-        else:
-            self.messages = [{"role": "system", "content": "You are a helpful assistant."}]
+        # 请求只发送预算内的最近消息，更早的由滚动摘要代替（可在 config.json 的 "ai" 段配置）
+        from server.ai_recommender import resolve_ai_config
+        ai_config = resolve_ai_config('config.json', user_config)
+        self.context_summary = ai_config['context_summary']
+        self.context = ContextWindow(budget=ai_config['context_budget'])
+        self._update_summarizer()
+
+        # 聊天记录逐条保存在 chat_messages 表中，按页加载：启动时只加载最近一页，滚动到顶部时加载更早的
+        self.system_message = {"role": "system", "content": "You are a helpful assistant."}
+        self.messages = [self.system_message]
+        self._oldest_message_id = None  # 已加载的最早消息 id
+        self._has_older = False
+        self._loading_older = False
+        try:
+            self.db.import_legacy_chat_history(User)
+        except Exception as e:
+            print(f"[ERROR] Failed to import legacy chat history: {e}")
 
         self.Prompt_words_English="""你是一位专业的英语学习助手。当我输入一个英文单词时，请提供以下信息：
 1.  ​**核心中文释义：​** 给出最常用、最核心的1-2个中文意思。​**核心日语释义：​** 给出最常用、最核心的1-2个日语意思。
@@ -283,12 +420,9 @@ class Ai_Widget(QtWidgets.QWidget):
         self.current_model = "deepseek-chat"
         self.ui.SwitchButton.checkedChanged.connect(self.on_model_changed)
 
-        # 加载历史消息到界面
-        for msg in self.messages:
-            if msg["role"] == "user":
-                self.ui.TextEdit.append_message(msg["content"], is_ai=False, render_markdown=False)
-            elif msg["role"] == "assistant":
-                self.ui.TextEdit.append_message(msg["content"], is_ai=True, render_markdown=True)
+        # 加载最近一页历史消息到界面
+        self.load_history()
+        self.ui.TextEdit.scrolledToTop.connect(self.load_older_history)
 
         menu = RoundMenu(parent=self.ui.DropDownToolButton)
         menu.addAction(Action(FluentIcon.LANGUAGE,'English', triggered=lambda:self.write_prompt_words('English')))
@@ -301,6 +435,13 @@ class Ai_Widget(QtWidgets.QWidget):
         if not self.api_configured:
             self._show_api_warning()
 
+    def _update_summarizer(self):
+        """客户端变化后重新绑定摘要生成（摘要固定使用标准模型，避免深度模式的延迟）"""
+        if self.context_summary and self.client is not None:
+            self.context.summarizer = make_summarizer(self.client, "deepseek-chat")
+        else:
+            self.context.summarizer = None
+
     def _show_api_warning(self):
         """显示 API 未配置的警告信息"""
         warning_message = """
@@ -342,7 +483,9 @@ class Ai_Widget(QtWidgets.QWidget):
             return
 
         # 添加用户消息
-        self.messages.append({"role": "user", "content": user_input})
+        user_message = {"role": "user", "content": user_input}
+        self.messages.append(user_message)
+        self.save_history(user_message)
         self.ui.TextEdit.append_message(user_input, is_ai=False, render_markdown=False)
         self.ui.TextEdit_2.clear()
         thinking_text = "正在深度思考..." if self.current_model == "deepseek-reasoner" else "正在思考..."
@@ -351,7 +494,7 @@ class Ai_Widget(QtWidgets.QWidget):
         self.ui.PushButton.setEnabled(False)
 
         # 创建并启动工作线程
-        self.worker = AiWorker(self.client, self.messages, self.current_model)
+        self.worker = AiWorker(self.client, list(self.messages), self.current_model, self.context)
         self.worker.finished.connect(self.handle_response)
         self.worker.error.connect(self.handle_error)
         self.worker.stream_update.connect(self.handle_stream_update)  # 连接流式更新信号
@@ -363,9 +506,10 @@ class Ai_Widget(QtWidgets.QWidget):
 
     def handle_response(self, reply):
         self.ui.TextEdit.replace_temp_message(self.temp_msg_pos, reply)
-        self.messages.append({"role": "assistant", "content": reply})
+        reply_message = {"role": "assistant", "content": reply}
+        self.messages.append(reply_message)
         self.ui.PushButton.setEnabled(True)
-        self.save_history()
+        self.save_history(reply_message)
 
     def handle_error(self, error_msg):
         self.ui.TextEdit.replace_temp_message(self.temp_msg_pos, error_msg)
@@ -373,20 +517,53 @@ class Ai_Widget(QtWidgets.QWidget):
         self.ui.PushButton.setEnabled(True)
 
     def load_history(self):
-        """从数据库加载历史（已在 __init__ 中实现）"""
-        pass
-
-    def save_history(self):
-        """保存聊天历史到数据库"""
+        """加载最近一页聊天记录"""
+        page = self._fetch_history_page()
+        self.messages = [self.system_message] + [{"role": m['role'], "content": m['content']} for m in page]
+        for m in page:
+            is_ai = m['role'] == 'assistant'
+            self.ui.TextEdit.append_message(m['content'], is_ai=is_ai, render_markdown=is_ai,
+                                            timestamp=self._format_time(m['created_at']))
+
+    def load_older_history(self):
+        """滚动到顶部时加载更早的一页，插入到界面和消息列表的最前面"""
+        # 回复生成中不插入：会移动正在流式更新的消息的位置
+        if not self._has_older or self._loading_older or not self.ui.PushButton.isEnabled():
+            return
+        self._loading_older = True
+        try:
+            page = self._fetch_history_page(self._oldest_message_id)
+            self.messages[1:1] = [{"role": m['role'], "content": m['content']} for m in page]
+            self.ui.TextEdit.prepend_messages([(m['content'], m['role'] == 'assistant', self._format_time(m['created_at']))
+                                               for m in page])
+        finally:
+            self._loading_older = False
+
+    def _fetch_history_page(self, before_id=None):
+        """读取 before_id 之前的一页消息，并记录是否还有更早的"""
+        try:
+            page = self.db.get_chat_messages(self.Username, before_id=before_id, limit=CHAT_HISTORY_PAGE_SIZE)
+        except Exception as e:
+            print(f"[ERROR] Failed to load chat history: {e}")
+            page = []
+        if page:
+            self._oldest_message_id = page[0]['message_id']
+        self._has_older = len(page) == CHAT_HISTORY_PAGE_SIZE
+        return page
+
+    @staticmethod
+    def _format_time(created_at):
+        """历史消息的时间戳：当天只显示时间"""
+        if created_at is None:
+            return None
+        if created_at.date() == datetime.date.today():
+            return created_at.strftime("%H:%M:%S")
+        return created_at.strftime("%Y-%m-%d %H:%M:%S")
+
+    def save_history(self, *messages):
+        """追加保存新消息到数据库（每条一行，不再整段重写）"""
         try:
-            # 将消息列表转换为 JSON 字符串
-            chat_history_json = json.dumps(self.messages, ensure_ascii=False)
-
-            # 保存到数据库
-            self.db.save_user_config(
-                username=self.Username,
-                chat_history=chat_history_json
-            )
+            self.db.append_chat_messages(self.Username, list(messages))
         except Exception as e:
             print(f"[ERROR] Failed to save chat history: {e}")
 
@@ -417,6 +594,7 @@ class Ai_Widget(QtWidgets.QWidget):
             # 重新创建 OpenAI 客户端
             self.client = OpenAI(api_key=self.cfg.API.value, base_url="https://api.deepseek.com")
             self.api_configured = True
+            self._update_summarizer()
             print(f"[DEBUG] API config reloaded successfully: {self.cfg.API.value[:10]}...")
 
             # 在聊天框中显示成功消息
@@ -13,7 +13,7 @@ from client.Review_training import reviewContainer
 from client.data_view_widget import dataWidget
 from client.setAPI import StrSettingCard
 from client.login import Ui_Dialog
-from client.users_manager_optimized import verify_user, create_user  # 使用优化的方法
+from client.users_manager_optimized import verify_user, create_user, get_session  # 使用优化的方法
 from client.userConfig import UserConfig
 from client.startup_screen import Splash_Screen
 from client.quiz import Ui_quiz
@@ -71,7 +71,7 @@ from client.custom_quiz_widget import CustomQuizWidget
 from client.custom_quiz_widget_network import CustomQuizWidgetNetwork
 from client.custom_bank_view_widget import CustomBankViewWidget
 from client.custom_bank_view_widget_network import CustomBankViewWidgetNetwork
-from server.database_manager import DatabaseFactory
+from client.db_connection_pool import DatabaseConnection
 
 class LoginDialog(QDialog):
 
@@ -171,15 +171,14 @@ class LoginDialog(QDialog):
 
         # 保存用户偏好到数据库
         try:
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-            db.save_user_config(
-                username=self.new_username,
-                main_language=preferences['main_language'],
-                study_language=preferences['study_language'],
-                difficulty=preferences['difficulty'],
-                target_score=preferences['target_score']
-            )
+            with DatabaseConnection() as db:
+                db.save_user_config(
+                    username=self.new_username,
+                    main_language=preferences['main_language'],
+                    study_language=preferences['study_language'],
+                    difficulty=preferences['difficulty'],
+                    target_score=preferences['target_score']
+                )
             print(f"[DEBUG] User preferences saved to database")
         except Exception as e:
             print(f"[ERROR] Failed to save user preferences: {e}")
@@ -211,6 +210,8 @@ class Window(FluentWindow):
         ###设置颜色卡添加部分
         self.cfg = UserConfig()
         self.username = User
+        # 登录时创建的会话（缓存 user_id 和用户配置）
+        self.session = get_session(User)
         # 不再使用本地 JSON 文件存储用户配置，改为使用内存配置
         # 用户配置将在数据库中管理，或者使用默认值
         # 创建设置卡片
@@ -312,12 +313,13 @@ class Window(FluentWindow):
             # 创建网络管理器
             self.networkManager = NetworkBankManager(server_url)
 
-            # 验证用户ID
+            # 验证用户ID（优先使用登录会话中缓存的 user_id）
             try:
-                db = DatabaseFactory.from_config_file('config.json')
-                db.connect()
-                user_id = db._get_user_id(self.username)
-                db.close()
+                if self.session is not None and self.session.user_id:
+                    user_id = self.session.user_id
+                else:
+                    with DatabaseConnection() as db:
+                        user_id = db._get_user_id(self.username)
                 self.network_user_id = user_id
 
                 # 设置网络模式界面的用户ID - 重要！
@@ -388,10 +390,8 @@ class Window(FluentWindow):
     def _load_user_config_from_database(self):
         """从数据库加载用户配置到ConfigItem"""
         try:
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-            user_config = db.get_user_config(self.username)
-            db.close()
+            with DatabaseConnection() as db:
+                user_config = db.get_user_config(self.username)
 
             if user_config:
                 # 映射数据库值到显示文本索引
@@ -424,14 +424,19 @@ class Window(FluentWindow):
             import traceback
             traceback.print_exc()
 
+    def _save_user_config(self, **fields):
+        """通过连接池保存用户配置（不再为每次设置更改重新建立连接）"""
+        try:
+            with DatabaseConnection() as db:
+                return db.save_user_config(username=self.username, **fields)
+        except Exception as e:
+            print(f"[ERROR] Database not available, user config not saved: {e}")
+            return False
+
     def _on_api_changed(self, new_api):
         """API 配置更改时的处理"""
         # 保存到数据库
-        from server.database_manager import DatabaseFactory
-        db = DatabaseFactory.from_config_file('config.json')
-        db.connect()
-        db.save_user_config(username=self.username, api_key=new_api)
-        db.close()
+        self._save_user_config(api_key=new_api)
 
         # 重新加载 AI 界面的配置
         if hasattr(self, 'aiInterface'):
@@ -443,10 +448,7 @@ class Window(FluentWindow):
         print(f"[DEBUG] Main language changed to: {main_language}")
 
         # 保存到数据库
-        db = DatabaseFactory.from_config_file('config.json')
-        db.connect()
-        db.save_user_config(username=self.username, main_language=main_language)
-        db.close()
+        self._save_user_config(main_language=main_language)
 
         # 热重载：更新答题和复习界面的语言设置
         if hasattr(self, 'exam1Interface'):
@@ -460,10 +462,7 @@ class Window(FluentWindow):
         print(f"[DEBUG] Study language changed to: {study_language}")
 
         # 保存到数据库
-        db = DatabaseFactory.from_config_file('config.json')
-        db.connect()
-        db.save_user_config(username=self.username, study_language=study_language)
-        db.close()
+        self._save_user_config(study_language=study_language)
 
         # 热重载：更新答题和复习界面的语言设置
         if hasattr(self, 'exam1Interface'):
@@ -477,10 +476,7 @@ class Window(FluentWindow):
         print(f"[DEBUG] Difficulty changed to: {difficulty}")
 
         # 保存到数据库
-        db = DatabaseFactory.from_config_file('config.json')
-        db.connect()
-        db.save_user_config(username=self.username, difficulty=difficulty)
-        db.close()
+        self._save_user_config(difficulty=difficulty)
 
         # 热重载：更新答题界面的难度设置
         if hasattr(self, 'exam1Interface'):
@@ -492,10 +488,7 @@ class Window(FluentWindow):
         print(f"[DEBUG] Target score changed to: {target_score}")
 
         # 保存到数据库
-        db = DatabaseFactory.from_config_file('config.json')
-        db.connect()
-        db.save_user_config(username=self.username, target_score=target_score)
-        db.close()
+        self._save_user_config(target_score=target_score)
 
         # 热重载：刷新Home界面的进度条
         if hasattr(self, 'homeInterface'):
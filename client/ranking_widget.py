@@ -8,24 +8,34 @@ from PyQt5.QtGui import QColor, QBrush
 from PyQt5.QtWidgets import QWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
 
 from client.ranking import Ui_Form
-from server.database_manager import DatabaseFactory
+from client.db_connection_pool import DatabaseConnection
 
 
 class RankingDataLoader(QThread):
-    """后台加载排行榜数据的线程"""
+    """后台加载排行榜数据的线程（前 TOP_K 名 + 当前用户附近的名次）"""
     dataLoaded = pyqtSignal(list)
     errorOccurred = pyqtSignal(str)
 
-    def __init__(self, username):
+    TOP_K = 50
+    AROUND_RADIUS = 5
+
+    def __init__(self, username, sort_key="total_questions"):
         super().__init__()
         self.username = username
+        self.sort_key = sort_key
 
     def run(self):
         try:
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-            ranking_data = db.get_ranking_data()
-            db.close()
+            with DatabaseConnection() as db:
+                if hasattr(db, 'get_leaderboard_top'):
+                    top = db.get_leaderboard_top(self.sort_key, limit=self.TOP_K)
+                    around = db.get_leaderboard_around(self.username, self.sort_key, radius=self.AROUND_RADIUS)
+                    # 合并去重，按名次排序
+                    merged = {entry['username']: entry for entry in around}
+                    merged.update({entry['username']: entry for entry in top})
+                    ranking_data = sorted(merged.values(), key=lambda x: x['rank'])
+                else:
+                    ranking_data = db.get_ranking_data()
             self.dataLoaded.emit(ranking_data)
         except Exception as e:
             self.errorOccurred.emit(f"加载排行榜数据失败: {str(e)}")
@@ -98,11 +108,12 @@ class RankingWidget(QWidget):
             sort_key, reverse = self.SORT_OPTIONS[text]
             self.current_sort_column = sort_key
             self.current_sort_reverse = reverse
-            self._update_table()
+            # 排序在数据库端完成，切换排序方式需要重新加载
+            self.load_data()
 
     def load_data(self):
         """加载排行榜数据"""
-        self.loader = RankingDataLoader(self.username)
+        self.loader = RankingDataLoader(self.username, self.current_sort_column)
         self.loader.dataLoaded.connect(self._on_data_loaded)
         self.loader.errorOccurred.connect(self._on_error)
         self.loader.start()
@@ -121,12 +132,15 @@ class RankingWidget(QWidget):
         if not self.ranking_data:
             return
 
-        # 排序数据
-        sorted_data = sorted(
-            self.ranking_data,
-            key=lambda x: x.get(self.current_sort_column, 0),
-            reverse=self.current_sort_reverse
-        )
+        # 数据库已按名次返回；旧接口返回的全量数据在本地排序
+        if all(x.get('rank') for x in self.ranking_data):
+            sorted_data = self.ranking_data
+        else:
+            sorted_data = sorted(
+                self.ranking_data,
+                key=lambda x: x.get(self.current_sort_column, 0),
+                reverse=self.current_sort_reverse
+            )
 
         # 清空表格
         self.ui.TableWidget.setRowCount(0)
@@ -162,6 +176,11 @@ class RankingWidget(QWidget):
 
                 self.ui.TableWidget.setItem(row, col, item)
 
+        # 行号显示真实名次（前几名与当前用户附近的名次之间可能不连续）
+        self.ui.TableWidget.setVerticalHeaderLabels(
+            [str(user_data.get('rank') or i) for i, user_data in enumerate(sorted_data, 1)]
+        )
+
         # 滚动到当前用户
         self._scroll_to_current_user(sorted_data)
 
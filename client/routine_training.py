@@ -10,6 +10,8 @@ from qfluentwidgets import FluentWindow, NavigationItemPosition, PrimaryPushButt
 from client.End import Ui_End
 from client.quiz import Ui_quiz
 from client.start import Ui_Form
+from client.db_connection_pool import DatabaseConnection
+from client.chart_loader import ChartLoader
 from server.my_test import VocabularyLearningSystem
 
 
@@ -68,10 +70,6 @@ class StartWidget(QWidget, Ui_Form):
     def _load_user_preferences(self):
         """从数据库加载用户配置"""
         try:
-            from server.database_manager import DatabaseFactory
-            db = DatabaseFactory.from_config_file('config.json')
-            db.connect()
-
             # 获取用户名 - parent是ExamContainer，parent.parent是主窗口
             username = None
             if hasattr(self.parent, 'parent') and self.parent.parent and hasattr(self.parent.parent, 'username'):
@@ -80,7 +78,8 @@ class StartWidget(QWidget, Ui_Form):
                 username = self.parent.username
 
             if username:
-                user_config = db.get_user_config(username)
+                with DatabaseConnection() as db:
+                    user_config = db.get_user_config(username)
                 if user_config:
                     self.level = user_config.get('difficulty', 1)
                     self.mainlanguage = user_config.get('main_language', 'Chinese')
@@ -1161,6 +1160,7 @@ class EndWidget(QWidget, Ui_End):
         self.parent=parent
         self.manager = manager
         self.VLS = VLS
+        self.chart_loader = ChartLoader(self)
         self._init_ui()
 
 
@@ -1189,7 +1189,8 @@ class EndWidget(QWidget, Ui_End):
             self.manager.correct_count / self.manager.current_index * 100)
         self.ProgressRing.setVal(accuracy)
 
-        self.HorizontalFlipView.addImages([self.VLS.plot(),self.VLS.show_day_stats()])
+        # 图表在后台渲染，先显示占位图
+        self.chart_loader.load(self.HorizontalFlipView, [self.VLS.submit_plot(), self.VLS.submit_day_stats()])
         self.HorizontalFlipView.setSpacing(15)
         self.HorizontalFlipView.setBorderRadius(15)
     def _on_restart_clicked(self):
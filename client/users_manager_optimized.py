@@ -4,6 +4,9 @@ import sys
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+from server.database_manager import SQLiteDatabase
+from server.user_session import session_registry
+
 
 class DatabaseManager:
     """数据库连接管理器 - 单例模式"""
@@ -51,9 +54,22 @@ class DatabaseManager:
 db_manager = DatabaseManager()
 
 
+def _open_session(db, username):
+    """登录成功后创建会话（缓存 user_id 和用户配置），失败不影响登录"""
+    try:
+        db.open_session(username)
+    except Exception as e:
+        print(f"[WARNING] Failed to open session for {username}: {e}")
+
+
+def get_session(username: str):
+    """获取已登录用户的会话，未登录时返回 None"""
+    return session_registry.get(username)
+
+
 def verify_user(username: str, password: str) -> Tuple[bool, bool]:
     """
-    一次性验证用户存在性和密码
+    一次性验证用户存在性和密码，密码正确时创建登录会话
     返回: (user_exists, password_correct)
     """
     db = db_manager.get_connection()
@@ -62,12 +78,23 @@ def verify_user(username: str, password: str) -> Tuple[bool, bool]:
         return False, False
 
     try:
-        if hasattr(db, 'conn'):  # OpenGauss
-            query = db.conn.prepare("SELECT password FROM users WHERE username = $1")
+        if isinstance(db, SQLiteDatabase):  # SQLite 本地库
+            result = db._query("SELECT password FROM users WHERE username = ?", (username,))
+            if result:
+                password_correct = result[0]['password'] == password
+                if password_correct:
+                    _open_session(db, username)
+                return True, password_correct
+            return False, False
+        elif hasattr(db, 'conn'):  # OpenGauss
+            query = db._prepare("SELECT password FROM users WHERE username = $1")
             result = query(username)
             if result and len(result) > 0:
                 stored_password = result[0]['password']
-                return True, stored_password == password
+                password_correct = stored_password == password
+                if password_correct:
+                    _open_session(db, username)
+                return True, password_correct
             return False, False
         else:
             # Excel模式下，检查用户文件
@@ -99,14 +126,20 @@ def create_user(username: str, password: str) -> bool:
 
     try:
         # 在数据库中创建用户
-        if hasattr(db, 'conn'):  # OpenGauss
+        if isinstance(db, SQLiteDatabase):  # SQLite 本地库
+            db.conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
+            print(f"[DEBUG] User {username} created in database")
+            _open_session(db, username)
+            return True
+        elif hasattr(db, 'conn'):  # OpenGauss
             # 创建新用户
-            insert_query = db.conn.prepare("""
+            insert_query = db._prepare("""
                 INSERT INTO users (username, password)
                 VALUES ($1, $2)
             """)
             insert_query(username, password)
             print(f"[DEBUG] User {username} created in database")
+            _open_session(db, username)
             return True
         else:
             print("[ERROR] Unsupported database type")
@@ -118,6 +151,7 @@ def create_user(username: str, password: str) -> bool:
 
 def cleanup():
     """清理资源"""
+    session_registry.clear()
     db_manager.close_connection()
 
 
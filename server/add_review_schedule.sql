@@ -0,0 +1,32 @@
+-- 复习本增加间隔重复调度字段（见 server/review_scheduler.py）
+-- next_review_time 为空表示尚未调度（视为已到期），可用 review_scheduler.reschedule_history()
+-- 按历史记录批量推算。由 schema_migrations.py 作为版本 4 执行，可重复执行。
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_review_list' AND column_name='next_review_time') THEN
+        ALTER TABLE user_review_list ADD COLUMN next_review_time TIMESTAMP;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_review_list' AND column_name='interval_days') THEN
+        ALTER TABLE user_review_list ADD COLUMN interval_days DECIMAL(10, 4) DEFAULT 0;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_review_list' AND column_name='ease_factor') THEN
+        ALTER TABLE user_review_list ADD COLUMN ease_factor DECIMAL(6, 4) DEFAULT 2.5;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_review_list' AND column_name='repetitions') THEN
+        ALTER TABLE user_review_list ADD COLUMN repetitions INTEGER DEFAULT 0;
+    END IF;
+
+    -- 按到期时间取单词的索引
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE tablename='user_review_list' AND indexname='idx_review_list_due') THEN
+        CREATE INDEX idx_review_list_due ON user_review_list(user_id, next_review_time);
+    END IF;
+END $$;
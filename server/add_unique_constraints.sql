@@ -0,0 +1,65 @@
+-- 为 upsert 写入路径补齐组合唯一约束
+-- database_manager.OpenGaussDatabase 的 update_user_record / add_to_review_list /
+-- add_bookmark / update_daily_stats 使用 INSERT ... ON CONFLICT，
+-- 依赖 (user_id, vocab_id) 与 (user_id, date) 上的唯一约束。
+-- init_database.sql 新建的库已包含这些约束，本脚本用于旧库升级，可重复执行。
+
+DO $$
+BEGIN
+    -- user_learning_records：去重（保留最新一条）后添加唯一约束
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE tablename='user_learning_records' AND indexname='uq_learning_records_user_vocab')
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint c JOIN pg_class t ON c.conrelid = t.oid
+                       WHERE t.relname='user_learning_records' AND c.contype='u') THEN
+        DELETE FROM user_learning_records a
+        USING user_learning_records b
+        WHERE a.user_id = b.user_id AND a.vocab_id = b.vocab_id AND a.record_id < b.record_id;
+        CREATE UNIQUE INDEX uq_learning_records_user_vocab ON user_learning_records(user_id, vocab_id);
+    END IF;
+
+    -- user_review_list
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE tablename='user_review_list' AND indexname='uq_review_list_user_vocab')
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint c JOIN pg_class t ON c.conrelid = t.oid
+                       WHERE t.relname='user_review_list' AND c.contype='u') THEN
+        DELETE FROM user_review_list a
+        USING user_review_list b
+        WHERE a.user_id = b.user_id AND a.vocab_id = b.vocab_id AND a.review_id < b.review_id;
+        CREATE UNIQUE INDEX uq_review_list_user_vocab ON user_review_list(user_id, vocab_id);
+    END IF;
+
+    -- user_bookmarks
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE tablename='user_bookmarks' AND indexname='uq_bookmarks_user_vocab')
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint c JOIN pg_class t ON c.conrelid = t.oid
+                       WHERE t.relname='user_bookmarks' AND c.contype='u') THEN
+        DELETE FROM user_bookmarks a
+        USING user_bookmarks b
+        WHERE a.user_id = b.user_id AND a.vocab_id = b.vocab_id AND a.bookmark_id < b.bookmark_id;
+        CREATE UNIQUE INDEX uq_bookmarks_user_vocab ON user_bookmarks(user_id, vocab_id);
+    END IF;
+
+    -- user_daily_stats：重复日期的计数合并到保留的那一行
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE tablename='user_daily_stats' AND indexname='uq_daily_stats_user_date')
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint c JOIN pg_class t ON c.conrelid = t.oid
+                       WHERE t.relname='user_daily_stats' AND c.contype='u') THEN
+        UPDATE user_daily_stats s
+        SET total_questions = d.total_questions,
+            correct_answers = d.correct_answers,
+            wrong_answers = d.wrong_answers
+        FROM (SELECT user_id, date, MAX(stat_id) AS keep_id,
+                     SUM(total_questions) AS total_questions,
+                     SUM(correct_answers) AS correct_answers,
+                     SUM(wrong_answers) AS wrong_answers
+              FROM user_daily_stats
+              GROUP BY user_id, date
+              HAVING COUNT(*) > 1) d
+        WHERE s.stat_id = d.keep_id;
+
+        DELETE FROM user_daily_stats a
+        USING user_daily_stats b
+        WHERE a.user_id = b.user_id AND a.date = b.date AND a.stat_id < b.stat_id;
+        CREATE UNIQUE INDEX uq_daily_stats_user_date ON user_daily_stats(user_id, date);
+    END IF;
+END $$;
@@ -0,0 +1,184 @@
+"""
+AI 推荐相关单词（choose_ai_words 使用）
+
+原来 choose_ai_words 在界面线程上依次发出 4 个没有超时的请求，端点和密钥写死在代码中。
+AiRecommender：
+- 多个单词的请求放进有上限的线程池并发发出，每个请求都有超时
+- 结果按 (单词, 学习语言, 模型) 缓存到本地 JSON 文件，重复的会话不再请求
+- 端点 / 密钥 / 模型可配置（OpenAI 兼容的 /chat/completions 接口），
+  测试时可以指向本地的兼容服务
+
+配置的优先级：环境变量 VOCAB_AI_ENDPOINT / VOCAB_AI_API_KEY / VOCAB_AI_MODEL
+> config.json 的 "ai" 段（endpoint / api_key / model）> 用户配置（api_endpoint / api_key / api_model）。
+AI 助手的上下文预算（见 chat_context.py）同样在 "ai" 段配置：context_budget（token 数，
+也可用环境变量 VOCAB_AI_CONTEXT_BUDGET）、context_summary（是否用摘要代替旧消息）。
+"""
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import requests
+
+from server.chat_context import DEFAULT_BUDGET
+
+DEFAULT_ENDPOINT = 'https://api.deepseek.com'
+DEFAULT_MODEL = 'deepseek-chat'
+
+# 行首的编号 / 项目符号："1. " "2、" "- " "• "
+_LIST_MARKER = re.compile(r'^\s*(?:[-*•]|\d+\s*[.、)）])\s*')
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_recommend_cache.json')
+
+
+def resolve_ai_config(config_path=None, user_config=None):
+    """
+    合并各处的 AI 配置
+
+    Returns:
+        {'endpoint', 'api_key', 'model', 'context_budget', 'context_summary'}
+    """
+    file_config = {}
+    if config_path and os.path.exists(config_path):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                file_config = json.load(f).get('ai') or {}
+        except Exception as e:
+            print(f"[WARNING] Failed to read AI config from {config_path}: {e}")
+    user_config = user_config or {}
+    return {
+        'endpoint': (os.environ.get('VOCAB_AI_ENDPOINT') or file_config.get('endpoint')
+                     or user_config.get('api_endpoint') or DEFAULT_ENDPOINT),
+        'api_key': (os.environ.get('VOCAB_AI_API_KEY') or file_config.get('api_key')
+                    or user_config.get('api_key') or ''),
+        'model': (os.environ.get('VOCAB_AI_MODEL') or file_config.get('model')
+                  or user_config.get('api_model') or DEFAULT_MODEL),
+        'context_budget': int(os.environ.get('VOCAB_AI_CONTEXT_BUDGET') or file_config.get('context_budget')
+                              or DEFAULT_BUDGET),
+        'context_summary': bool(file_config.get('context_summary', True)),
+    }
+
+
+class RecommendCache:
+    """(单词, 学习语言, 模型) -> 推荐词列表，保存在 JSON 文件中"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._lock = Lock()
+        self._data = None
+
+    @staticmethod
+    def key(word, language, model):
+        return f"{model}\t{language}\t{word}"
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._data = json.load(f)
+                except Exception as e:
+                    print(f"[WARNING] Failed to load AI recommend cache: {e}")
+        return self._data
+
+    def get(self, word, language, model):
+        with self._lock:
+            return self._load().get(self.key(word, language, model))
+
+    def update(self, entries):
+        """写入 {(单词, 语言, 模型): 推荐词列表} 并落盘（先写临时文件再替换）"""
+        if not entries:
+            return
+        with self._lock:
+            data = self._load()
+            for (word, language, model), words in entries.items():
+                data[self.key(word, language, model)] = list(words)
+            try:
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"[WARNING] Failed to save AI recommend cache: {e}")
+
+
+def parse_word_list(content):
+    """模型回复 → 单词列表（每行一个，去掉编号和项目符号）"""
+    words = []
+    for line in content.splitlines():
+        word = _LIST_MARKER.sub('', line).strip()
+        if word:
+            words.append(word)
+    return words
+
+
+class AiRecommender:
+    """并发请求 + 持久缓存的相关单词推荐"""
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, api_key='', model=DEFAULT_MODEL,
+                 cache=None, timeout=20.0, max_workers=4, count=4):
+        self.endpoint = endpoint.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache if cache is not None else RecommendCache()
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.count = count
+
+    def _request(self, main_word, study_word, language):
+        """请求一个单词的推荐词，失败时返回 None（不写入缓存）"""
+        prompt = (f"请推荐{self.count}个与'{main_word}({study_word})'相关的{language}单词，"
+                  "按推荐强度排序，只返回单词列表，不要任何解释或额外信息，每行一个")
+        try:
+            response = requests.post(
+                f"{self.endpoint}/chat/completions",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json={
+                    "model": self.model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.7,
+                    "max_tokens": 100
+                },
+                timeout=self.timeout
+            )
+            if response.status_code != 200:
+                print(f"[WARNING] AI recommend request failed: HTTP {response.status_code}")
+                return None
+            content = response.json()["choices"][0]["message"]["content"]
+            return parse_word_list(content)[:self.count]
+        except Exception as e:
+            print(f"AI推荐出错: {e}")
+            return None
+
+    def recommend(self, words, language):
+        """
+        为多个单词获取推荐词
+
+        Args:
+            words: [(母语释义, 学习语言单词), ...]
+            language: 学习语言列名
+
+        Returns:
+            {学习语言单词: 推荐词列表}，请求失败的单词不在结果中
+        """
+        results = {}
+        missing = {}  # 学习语言单词 -> 母语释义
+        for main_word, study_word in words:
+            cached = self.cache.get(study_word, language, self.model)
+            if cached is not None:
+                results[study_word] = cached
+            else:
+                missing.setdefault(study_word, main_word)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                futures = {study_word: pool.submit(self._request, main_word, study_word, language)
+                           for study_word, main_word in missing.items()}
+            fetched = {study_word: future.result() for study_word, future in futures.items()}
+            fetched = {study_word: value for study_word, value in fetched.items() if value is not None}
+            self.cache.update({(study_word, language, self.model): value for study_word, value in fetched.items()})
+            results.update(fetched)
+        print(f"[DEBUG] AI recommend: {len(words)} words, {len(missing)} requested")
+        return results
@@ -0,0 +1,182 @@
+"""
+统计图表的后台渲染与缓存
+
+show_day_stats / plot 原来在界面线程上创建 matplotlib Figure、保存为 PNG
+再解码成 QImage，HomeWidget.flush() 和 EndWidget.update_data() 每次都要等它完成。
+ChartService 把渲染放到单独的工作线程：
+
+- 输入是可 JSON 序列化的数据（日期字符串、数值列表），按其哈希缓存渲染结果（PNG 字节），
+  数据没有变化时直接返回缓存，不再重新绘制
+- submit() 立即返回 Future，界面先显示占位图，渲染完成后再替换
+- 只用一个工作线程：matplotlib 的面向对象接口可以在非界面线程中使用，
+  但多个线程同时绘图并不安全
+- 结果是 PNG 字节而不是 QImage，本模块不依赖 Qt，由调用方在界面线程解码
+"""
+import datetime
+import hashlib
+import io
+import json
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from matplotlib.figure import Figure
+
+
+def render_day_stats(series):
+    """每日答题统计折线图，series = {'dates': ['YYYY-MM-DD', ...], 'ac': [...], 'wa': [...]}"""
+    fig = Figure(figsize=(10, 5))
+    ax = fig.add_subplot(111)
+
+    if not series['dates']:
+        # 创建空图表，显示提示信息
+        ax.text(0.5, 0.5, '暂无数据\n开始练习后即可看到统计图表',
+                horizontalalignment='center',
+                verticalalignment='center',
+                transform=ax.transAxes,
+                fontsize=16,
+                color='gray')
+        ax.set_xlabel('日期')
+        ax.set_ylabel('题目数')
+        ax.set_title('每日答题统计')
+        ax.grid(True, alpha=0.3)
+    else:
+        dates = [datetime.date.fromisoformat(d) for d in series['dates']]
+        ac = series['ac']
+        wa = series['wa']
+        total = [a + w for a, w in zip(ac, wa)]
+
+        # 绘制三条折线
+        ax.plot(dates, ac, marker='o', label='正确(ac)')
+        ax.plot(dates, wa, marker='o', label='错误(wa)')
+        ax.plot(dates, total, marker='o', label='总答题数')
+
+        ax.set_xlabel('日期')
+        ax.set_ylabel('题目数')
+        ax.set_title('每日答题统计')
+        ax.legend()
+        ax.grid(True)
+
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def render_answer_times(series):
+    """每题用时散点 + 折线图，series = {'times': [...], 'correct': [True/False, ...]}"""
+    y = series['times']
+    is_correct = series['correct']
+    x = list(range(1, len(y) + 1))
+
+    fig = Figure(figsize=(8, 4))
+    ax = fig.add_subplot(111)
+
+    # 正确题目
+    x_ac = [i + 1 for i, c in enumerate(is_correct) if c]
+    y_ac = [y[i] for i, c in enumerate(is_correct) if c]
+    ax.scatter(x_ac, y_ac, color='green', label='正确', zorder=3)
+
+    # 错误题目
+    x_wa = [i + 1 for i, c in enumerate(is_correct) if not c]
+    y_wa = [y[i] for i, c in enumerate(is_correct) if not c]
+    ax.scatter(x_wa, y_wa, color='red', label='错误', zorder=3)
+
+    # 折线
+    ax.plot(x, y, color='blue', alpha=0.5, zorder=2)
+
+    ax.set_xlabel('题目序号')
+    ax.set_ylabel('用时（秒）')
+    ax.set_title('每题用时折线图')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+# 图表类型 -> 渲染函数
+RENDERERS = {
+    'day_stats': render_day_stats,
+    'answer_times': render_answer_times,
+}
+
+
+def chart_key(kind, series):
+    """缓存键：图表类型 + 输入数据的哈希"""
+    payload = json.dumps(series, sort_keys=True, default=str, separators=(',', ':'))
+    return kind + ':' + hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ChartService:
+    """单工作线程的图表渲染服务，按输入数据缓存 PNG"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._cache = OrderedDict()  # 缓存键 -> PNG 字节（LRU）
+        self._running = {}           # 缓存键 -> 渲染中的 Future（相同请求复用）
+        self._executor = None
+        self.stats = {'hits': 0, 'renders': 0}
+
+    def cached(self, kind, series):
+        """已缓存的 PNG，没有时返回 None"""
+        key = chart_key(kind, series)
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+            return png
+
+    def render(self, kind, series):
+        """同步渲染（有缓存时直接返回），返回 PNG 字节"""
+        return self.submit(kind, series).result()
+
+    def submit(self, kind, series):
+        """
+        提交渲染请求
+
+        Returns:
+            Future，结果为 PNG 字节；命中缓存时返回已完成的 Future
+        """
+        key = chart_key(kind, series)
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                future = Future()
+                future.set_result(png)
+                return future
+            future = self._running.get(key)
+            if future is not None:
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-render')
+            future = self._executor.submit(self._render, key, kind, series)
+            self._running[key] = future
+            return future
+
+    def _render(self, key, kind, series):
+        try:
+            png = RENDERERS[kind](series)
+        except Exception as e:
+            print(f"[ERROR] Failed to render {kind} chart: {e}")
+            with self._lock:
+                self._running.pop(key, None)
+            raise
+        with self._lock:
+            self._running.pop(key, None)
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            self.stats['renders'] += 1
+        return png
+
+
+# 进程内共享的图表服务
+chart_service = ChartService()
@@ -0,0 +1,181 @@
+"""
+AI 助手请求的上下文窗口（AiWorker 使用）
+
+原来 AiWorker 每次请求都发送完整的对话记录，请求大小、费用和首字延迟随对话长度无限增长。
+ContextWindow.build() 在 token 预算内组装请求：
+
+- 系统提示始终保留
+- 从最新的消息往前保留尽可能多的消息，窗口总是从用户消息开始（不留下没有提问的回答）
+- 可选：窗口之外的旧消息由摘要代替。摘要滚动更新（旧摘要 + 新移出窗口的消息 → 新摘要），
+  更新时窗口收缩到预算的 SUMMARY_LOW_WATER，之后几轮不需要再生成摘要
+
+token 数按字符数粗略估计（不依赖分词器），每条消息的估计值按内容缓存。
+"""
+import re
+from collections import OrderedDict
+from threading import Lock
+
+DEFAULT_BUDGET = 8000
+# 摘要的最大 token 数（同时作为组装请求时为摘要预留的预算）
+SUMMARY_TOKENS = 500
+# 生成摘要后窗口只占剩余预算的比例，留出余量给之后几轮对话
+SUMMARY_LOW_WATER = 0.6
+# 每条消息的固定开销（角色、分隔符）
+MESSAGE_OVERHEAD = 4
+# 送去生成摘要时每条消息最多保留的字符数
+SUMMARY_INPUT_CHARS = 2000
+
+SUMMARY_PROMPT = ("你负责压缩对话记录。请把已有摘要和新的对话合并为一段简洁的中文摘要，"
+                  "保留用户的问题、学习目标、涉及的单词和重要结论，省略寒暄和格式，只输出摘要本身。")
+
+# 中日韩字符：大约一个字一个 token；其余文本大约 4 个字符一个 token
+_CJK = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """粗略估计一条消息的 token 数"""
+    text = text or ''
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4 + MESSAGE_OVERHEAD
+
+
+def _fingerprint(message):
+    return message.get('role'), hash(message.get('content') or '')
+
+
+class ContextWindow:
+    """按 token 预算裁剪对话记录，可选用滚动摘要代替旧消息"""
+
+    def __init__(self, budget=DEFAULT_BUDGET, summarizer=None, summary_tokens=SUMMARY_TOKENS,
+                 low_water=SUMMARY_LOW_WATER, cache_size=4096):
+        """
+        Args:
+            budget: 请求中对话记录（含系统提示和摘要）的 token 上限
+            summarizer: callable(旧摘要或 None, 移出窗口的消息列表) -> 新摘要；None 时直接丢弃旧消息
+        """
+        self.budget = budget
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens
+        self.low_water = low_water
+        self.cache_size = cache_size
+        self._tokens = OrderedDict()  # 消息内容 -> 估计的 token 数（LRU）
+        self._summary = None          # (摘要, 摘要覆盖的最后一条消息的指纹)
+        self._lock = Lock()
+
+    def count(self, message):
+        """一条消息的估计 token 数（按内容缓存）"""
+        content = message.get('content') or ''
+        with self._lock:
+            tokens = self._tokens.get(content)
+            if tokens is not None:
+                self._tokens.move_to_end(content)
+                return tokens
+        tokens = estimate_tokens(content)
+        with self._lock:
+            self._tokens[content] = tokens
+            while len(self._tokens) > self.cache_size:
+                self._tokens.popitem(last=False)
+        return tokens
+
+    def build(self, messages):
+        """
+        组装一次请求的消息列表
+
+        Args:
+            messages: 完整的对话记录（系统提示 + 按时间排列的 user / assistant 消息）
+
+        Returns:
+            系统提示 + [摘要] + 最近的消息，总估计 token 数不超过预算（最新一条消息总是保留）
+        """
+        system = [m for m in messages if m['role'] == 'system']
+        history = [m for m in messages if m['role'] != 'system']
+        available = self.budget - sum(self.count(m) for m in system)
+
+        summary = None
+        start = 0
+        if self.summarizer is not None:
+            start = self._summary_start(history)
+            if start:
+                summary = self._summary[0]
+        window = history[start:]
+
+        summary_cost = estimate_tokens(summary) if summary else 0
+        if self.summarizer is not None and sum(self.count(m) for m in window) + summary_cost > available:
+            reserve = min(self.summary_tokens, available // 4)
+            keep = self._fit(window, int((available - reserve) * self.low_water))
+            dropped = window[:len(window) - len(keep)]
+            updated = self._update_summary(summary, dropped) if dropped else None
+            if updated:
+                summary, window = updated, keep
+                summary_cost = estimate_tokens(summary)
+
+        # 没有摘要、摘要失败或摘要超出预留时，直接丢弃最旧的消息
+        remaining = available - summary_cost
+        if sum(self.count(m) for m in window) > remaining:
+            window = self._fit(window, remaining)
+
+        payload = list(system)
+        if summary:
+            payload.append({"role": "system", "content": f"以下是之前对话的摘要：\n{summary}"})
+        payload.extend(window)
+        return payload
+
+    def _fit(self, window, limit):
+        """从最新的消息往前保留不超过 limit 的消息（至少保留最后一条），并从用户消息开始"""
+        total = 0
+        start = len(window)
+        while start > 0:
+            tokens = self.count(window[start - 1])
+            if total + tokens > limit and start < len(window):
+                break
+            total += tokens
+            start -= 1
+        while start < len(window) - 1 and window[start]['role'] != 'user':
+            start += 1
+        return window[start:]
+
+    def _summary_start(self, history):
+        """已有摘要覆盖到 history 的哪个位置（之后的消息还没有进入摘要）"""
+        if self._summary is None:
+            return 0
+        fingerprint = self._summary[1]
+        for index in range(len(history) - 1, -1, -1):
+            if _fingerprint(history[index]) == fingerprint:
+                return index + 1
+        # 对话记录中已找不到摘要覆盖的消息（例如换了用户），摘要作废
+        self._summary = None
+        return 0
+
+    def _update_summary(self, summary, dropped):
+        """把移出窗口的消息合并进摘要，返回新摘要；失败时返回 None（保留旧摘要，下次请求重试）"""
+        try:
+            text = self.summarizer(summary, dropped)
+        except Exception as e:
+            print(f"[WARNING] Failed to summarize chat context: {e}")
+            return None
+        if not text:
+            return None
+        self._summary = (text, _fingerprint(dropped[-1]))
+        print(f"[DEBUG] Chat context summary updated: {len(dropped)} messages folded in")
+        return text
+
+
+def make_summarizer(client, model, max_tokens=SUMMARY_TOKENS, timeout=60):
+    """用 OpenAI 兼容客户端生成滚动摘要的 summarizer"""
+    def summarize(previous, messages):
+        lines = []
+        if previous:
+            lines.append(f"已有摘要：\n{previous}\n")
+        lines.append("新的对话：")
+        for m in messages:
+            speaker = "用户" if m['role'] == 'user' else "助手"
+            lines.append(f"{speaker}：{m['content'][:SUMMARY_INPUT_CHARS]}")
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": SUMMARY_PROMPT},
+                      {"role": "user", "content": "\n".join(lines)}],
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+        return (response.choices[0].message.content or '').strip()
+    return summarize
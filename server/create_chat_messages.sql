@@ -0,0 +1,21 @@
+-- AI 助手聊天记录表（每条消息一行，只追加；见 client/deepseek.py）
+-- 原来整段对话以 JSON 存在 user_config.deepseek_chat_history 中，每次回复后整体重写；
+-- 旧数据在用户第一次打开 AI 助手时导入本表。
+-- 由 schema_migrations.py 作为版本 5 执行，可重复执行。
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    message_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,  -- user / assistant
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 按 message_id 倒序分页读取
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_indexes
+                   WHERE tablename='chat_messages' AND indexname='idx_chat_messages_user') THEN
+        CREATE INDEX idx_chat_messages_user ON chat_messages(user_id, message_id DESC);
+    END IF;
+END $$;
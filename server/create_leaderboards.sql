@@ -0,0 +1,99 @@
+-- 排行榜表（每个用户一行，由客户端写入路径增量维护，见 server/leaderboard.py）
+-- 由 schema_migrations.py 作为版本 3 执行，可重复执行；首次执行时从明细表回填。
+
+CREATE TABLE IF NOT EXISTS leaderboards (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    username VARCHAR(50) NOT NULL,
+    score DECIMAL(12, 2) NOT NULL DEFAULT 0,  -- 总积分（user_config.total_score）
+    accuracy DECIMAL(5, 2) DEFAULT 0,  -- 历史总正确率
+    completed_count INTEGER DEFAULT 0,  -- 历史总答题数
+    correct_count INTEGER DEFAULT 0,  -- 历史总答对数
+    today_date DATE,  -- today_* 字段对应的日期（最近一次答题日期）
+    today_questions INTEGER DEFAULT 0,
+    today_correct INTEGER DEFAULT 0,
+    today_accuracy DECIMAL(5, 2) DEFAULT 0,
+    study_days INTEGER DEFAULT 0,  -- 有答题记录的天数
+    words_learned INTEGER DEFAULT 0,  -- 学过的单词数
+    daily_score BIGINT DEFAULT 0,
+    weekly_score BIGINT DEFAULT 0,
+    monthly_score BIGINT DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 按 README 手工创建过的旧表：补齐字段
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='correct_count') THEN
+        ALTER TABLE leaderboards ADD COLUMN correct_count INTEGER DEFAULT 0;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='today_date') THEN
+        ALTER TABLE leaderboards ADD COLUMN today_date DATE;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='today_questions') THEN
+        ALTER TABLE leaderboards ADD COLUMN today_questions INTEGER DEFAULT 0;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='today_correct') THEN
+        ALTER TABLE leaderboards ADD COLUMN today_correct INTEGER DEFAULT 0;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='today_accuracy') THEN
+        ALTER TABLE leaderboards ADD COLUMN today_accuracy DECIMAL(5, 2) DEFAULT 0;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='study_days') THEN
+        ALTER TABLE leaderboards ADD COLUMN study_days INTEGER DEFAULT 0;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='leaderboards' AND column_name='words_learned') THEN
+        ALTER TABLE leaderboards ADD COLUMN words_learned INTEGER DEFAULT 0;
+    END IF;
+END $$;
+
+-- 从明细表重建（与 leaderboard.REBUILD_SQL 一致）
+DELETE FROM leaderboards;
+INSERT INTO leaderboards (user_id, username, score, completed_count, correct_count, accuracy,
+                          today_date, today_questions, today_correct, today_accuracy,
+                          study_days, words_learned)
+SELECT u.user_id, u.username,
+       COALESCE(c.total_score, 0),
+       COALESCE(t.total_questions, 0),
+       COALESCE(t.correct_answers, 0),
+       CASE WHEN t.total_questions > 0 THEN t.correct_answers * 100.0 / t.total_questions ELSE 0 END,
+       t.last_date,
+       COALESCE(d.total_questions, 0),
+       COALESCE(d.correct_answers, 0),
+       CASE WHEN d.total_questions > 0 THEN d.correct_answers * 100.0 / d.total_questions ELSE 0 END,
+       COALESCE(t.study_days, 0),
+       COALESCE(w.words_learned, 0)
+FROM users u
+LEFT JOIN (
+    SELECT user_id,
+           SUM(total_questions) AS total_questions,
+           SUM(correct_answers) AS correct_answers,
+           MAX(date) AS last_date,
+           SUM(CASE WHEN total_questions > 0 THEN 1 ELSE 0 END) AS study_days
+    FROM user_daily_stats
+    GROUP BY user_id
+) t ON u.user_id = t.user_id
+LEFT JOIN user_daily_stats d ON d.user_id = u.user_id AND d.date = t.last_date
+LEFT JOIN (
+    SELECT user_id, COUNT(*) AS words_learned
+    FROM user_learning_records
+    GROUP BY user_id
+) w ON u.user_id = w.user_id
+LEFT JOIN user_config c ON c.user_id = u.user_id;
+
+-- upsert 依赖 user_id 唯一；排序索引带 user_id 作为 keyset 分页的决胜字段
+CREATE UNIQUE INDEX IF NOT EXISTS uq_leaderboards_user ON leaderboards(user_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_score ON leaderboards(score DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_total ON leaderboards(completed_count DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_accuracy ON leaderboards(accuracy DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_days ON leaderboards(study_days DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_words ON leaderboards(words_learned DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_today ON leaderboards(today_date, today_questions DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_today_acc ON leaderboards(today_date, today_accuracy DESC, user_id DESC);
@@ -3,13 +3,32 @@
 数据库管理模块 - 支持多种数据库后端
 """
 import os
+import re
 import json
+import datetime
+import tempfile
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from collections import OrderedDict
 import pandas as pd
 
+from server.leaderboard import LeaderboardMixin
+from server.review_scheduler import to_datetime
+from server.user_session import UserSession, session_registry, session_username
+
+# AI 助手聊天记录默认每页的条数
+CHAT_PAGE_SIZE = 30
+
 
 class DatabaseInterface(ABC):
-    """数据库接口抽象类"""
+    """
+    数据库接口抽象类
+
+    所有 username 参数既可以是用户名，也可以是登录时 open_session() 返回的 UserSession
+    """
+
+    # 数据只保存在实例内存中（每个实例各自加载一份），同一进程的写入必须经过同一实例
+    in_memory = False
 
     @abstractmethod
     def connect(self):
@@ -71,47 +90,268 @@ class DatabaseInterface(ABC):
         """更新每日统计"""
         pass
 
+    def ping(self):
+        """检查连接是否可用（连接池借出前的健康检查）"""
+        return True
+
+    def open_session(self, username):
+        """登录时创建并登记会话（数据库实现会解析 user_id 并预取配置）"""
+        return session_registry.register(UserSession(username))
+
+    def get_vocabulary_version(self):
+        """词汇表版本 (行数, 最大 created_at)，用于检测词汇表是否变化"""
+        return (len(self.get_vocabulary()), None)
+
+    def get_user_data_version(self, username):
+        """
+        用户各表的版本 {'records'|'review'|'bookmarks'|'daily': 版本元组}
+
+        版本不变说明该表没有被修改，调用方可以跳过重新加载；
+        返回 None 表示后端不支持，调用方应全部重新加载。
+        """
+        return None
+
+    @abstractmethod
+    def update_review_schedule(self, username, vocab_id, schedule):
+        """更新复习调度（schedule 为 ReviewSchedule.to_dict() 的字段）"""
+        pass
+
+    def update_review_schedules(self, username, schedules):
+        """批量更新复习调度 {vocab_id: schedule}"""
+        for vocab_id, schedule in schedules.items():
+            self.update_review_schedule(username, vocab_id, schedule)
+
+    def update_user_records(self, username, stars):
+        """批量更新学习记录 {vocab_id: star}"""
+        for vocab_id, star in stars.items():
+            self.update_user_record(username, vocab_id, star)
+
+    def update_review_weights(self, username, weights):
+        """批量更新复习权重 {vocab_id: weight}"""
+        for vocab_id, weight in weights.items():
+            self.update_review_weight(username, vocab_id, weight)
+
+    def get_due_reviews(self, username, now=None, limit=50):
+        """已到期的复习单词（尚未调度的在前，其余按到期时间排序）"""
+        df = self.get_review_list(username)
+        if df.empty or 'next_review_time' not in df.columns:
+            return df.head(limit)
+        due = pd.to_datetime(df['next_review_time'], errors='coerce')
+        now = pd.Timestamp(now or datetime.datetime.now())
+        df = df[due.isna() | (due <= now)]
+        return df.assign(_due=due).sort_values('_due', na_position='first').drop(columns='_due').head(limit)
+
+    @abstractmethod
+    def append_chat_messages(self, username, messages):
+        """追加 AI 助手聊天消息 [{'role', 'content'}, ...]，返回新消息的 message_id 列表"""
+        pass
+
+    @abstractmethod
+    def get_chat_messages(self, username, before_id=None, limit=CHAT_PAGE_SIZE):
+        """
+        分页读取聊天消息
+
+        Args:
+            before_id: 只返回 message_id 小于它的消息（上一页最早的 id），None 表示最新一页
+            limit: 每页条数
+
+        Returns:
+            [{'message_id', 'role', 'content', 'created_at'}, ...]，按时间正序
+        """
+        pass
+
+    def import_legacy_chat_history(self, username):
+        """
+        把 user_config.deepseek_chat_history 中整段保存的旧聊天记录逐条导入 chat_messages
+
+        该用户已有逐条保存的消息时不再导入；导入后清空旧字段，之后打开 AI 助手不再解析。
+
+        Returns:
+            导入的消息数
+        """
+        config = self.get_user_config(username) or {}
+        try:
+            history = json.loads(config.get('chat_history') or '[]')
+        except ValueError as e:
+            print(f"[WARNING] Failed to parse legacy chat history for {username}: {e}")
+            return 0
+        messages = [{'role': m['role'], 'content': m['content']} for m in history
+                    if isinstance(m, dict) and m.get('role') in ('user', 'assistant') and m.get('content')]
+        if not messages:
+            return 0
+
+        imported = 0
+        if not self.get_chat_messages(username, limit=1):
+            self.append_chat_messages(username, messages)
+            imported = len(messages)
+        self.save_user_config(username, chat_history='[]')
+        print(f"[DEBUG] Imported {imported} legacy chat messages for {username}")
+        return imported
 
-class ExcelDatabase(DatabaseInterface):
-    """Excel 文件数据库实现（兼容现有系统）"""
 
-    def __init__(self, data_dir='server'):
+class ExcelDatabase(DatabaseInterface):
+    """
+    Excel 文件数据库实现（兼容现有系统）
+
+    - 每张表单独记录是否修改，保存时只写修改过的表；写入先落到临时文件再原子替换
+    - 安装了 pyarrow 时默认使用 Parquet（或 Feather）作为工作存储，毫秒级保存；
+      .xlsx 只作为导入/导出格式：xlsx 比工作存储新（被外部编辑过）时重新导入，
+      close() 时把本次修改过的表导出回 .xlsx
+    """
+
+    # 属性名 -> 文件名（不含扩展名）
+    TABLES = {
+        'df_vocab': 'data',
+        'df_records': 'record',
+        'df_review': 'review',
+        'df_bookmarks': 'book',
+        'df_daily': 'day_record',
+    }
+    COLUMNAR_FORMATS = ('parquet', 'feather')
+    in_memory = True
+
+    def __init__(self, data_dir='server', storage_format='auto', export_on_close=True):
+        """
+        Args:
+            data_dir: 数据目录（相对项目根目录）
+            storage_format: 'auto'（有 pyarrow 用 parquet，否则 xlsx）/'parquet'/'feather'/'xlsx'
+            export_on_close: close() 时是否把修改过的表导出为 .xlsx
+        """
         self.data_dir = data_dir
         self.root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.server_dir = os.path.join(self.root_dir, data_dir)
+        self.storage_format = self._resolve_format(storage_format)
+        self.export_on_close = export_on_close
         self.df_vocab = None
         self.df_records = None
         self.df_review = None
         self.df_bookmarks = None
         self.df_daily = None
+        self._dirty = set()  # 需要写入工作存储的表
+        self._unexported = set()  # 工作存储已更新、尚未导出到 xlsx 的表
+
+    @staticmethod
+    def _resolve_format(storage_format):
+        """确定工作存储格式（pyarrow 为可选依赖）"""
+        if storage_format == 'xlsx':
+            return 'xlsx'
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            if storage_format != 'auto':
+                print(f"[WARNING] pyarrow 未安装，无法使用 {storage_format}，改用 xlsx")
+            return 'xlsx'
+        return 'parquet' if storage_format == 'auto' else storage_format
+
+    def _path(self, attr, ext):
+        return os.path.join(self.server_dir, f"{self.TABLES[attr]}.{ext}")
 
     def connect(self):
-        """加载 Excel 文件"""
+        """加载数据（优先读取工作存储，xlsx 更新时重新导入）"""
         try:
-            self.df_vocab = pd.read_excel(os.path.join(self.server_dir, 'data.xlsx'), index_col=0)
-            self.df_records = pd.read_excel(os.path.join(self.server_dir, 'record.xlsx'), index_col=0, sheet_name='Sheet1')
-            self.df_review = pd.read_excel(os.path.join(self.server_dir, 'review.xlsx'), index_col=0, sheet_name='Sheet1')
-            self.df_bookmarks = pd.read_excel(os.path.join(self.server_dir, 'book.xlsx'), index_col=0, sheet_name='Sheet1')
-            self.df_daily = pd.read_excel(os.path.join(self.server_dir, 'day_record.xlsx'), index_col=0, sheet_name='Sheet1')
+            for attr in self.TABLES:
+                setattr(self, attr, self._load_table(attr))
             return True
         except Exception as e:
             print(f"Excel 数据加载失败: {e}")
             return False
 
+    def _load_table(self, attr):
+        xlsx_path = self._path(attr, 'xlsx')
+        if self.storage_format in self.COLUMNAR_FORMATS:
+            store_path = self._path(attr, self.storage_format)
+            if os.path.exists(store_path) and (
+                    not os.path.exists(xlsx_path) or os.path.getmtime(store_path) >= os.path.getmtime(xlsx_path)):
+                return self._read_columnar(store_path)
+            # 首次使用或 xlsx 被外部修改：从 xlsx 导入，下次保存时写入工作存储
+            self._dirty.add(attr)
+
+        if attr == 'df_vocab':
+            return pd.read_excel(xlsx_path, index_col=0)
+        return pd.read_excel(xlsx_path, index_col=0, sheet_name='Sheet1')
+
+    def _read_columnar(self, path):
+        if self.storage_format == 'parquet':
+            return pd.read_parquet(path)
+        # feather 不保存索引，写入时把索引存为首列
+        df = pd.read_feather(path)
+        index_col = df.columns[0]
+        df = df.set_index(index_col)
+        if index_col == '__index__':
+            df.index.name = None
+        return df
+
+    def _atomic_write(self, path, write):
+        """写入同目录下的临时文件后原子替换，避免中途崩溃留下损坏的文件"""
+        base, ext = os.path.splitext(path)
+        # 临时文件名唯一：多个实例同时保存同一张表时不会互相覆盖临时文件
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(base) + '.', suffix='.tmp' + ext,
+                                        dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _write_table(self, attr):
+        df = getattr(self, attr)
+        if self.storage_format == 'parquet':
+            self._atomic_write(self._path(attr, 'parquet'), lambda p: df.to_parquet(p, index=True))
+        elif self.storage_format == 'feather':
+            out = df.reset_index()
+            if df.index.name is None:
+                out = out.rename(columns={out.columns[0]: '__index__'})
+            self._atomic_write(self._path(attr, 'feather'), lambda p: out.to_feather(p))
+        else:
+            self._atomic_write(self._path(attr, 'xlsx'), lambda p: df.to_excel(p, index=True))
+
+    def _mark_dirty(self, attr):
+        self._dirty.add(attr)
+
     def close(self):
         """保存所有更改"""
         self._save_all()
+        if self.export_on_close:
+            self.export_excel()
 
     def _save_all(self):
-        """保存所有 Excel 文件"""
-        try:
-            self.df_vocab.to_excel(os.path.join(self.server_dir, 'data.xlsx'), index=True)
-            self.df_records.to_excel(os.path.join(self.server_dir, 'record.xlsx'), index=True)
-            self.df_review.to_excel(os.path.join(self.server_dir, 'review.xlsx'), index=True)
-            self.df_bookmarks.to_excel(os.path.join(self.server_dir, 'book.xlsx'), index=True)
-            self.df_daily.to_excel(os.path.join(self.server_dir, 'day_record.xlsx'), index=True)
-        except Exception as e:
-            print(f"Excel 数据保存失败: {e}")
+        """只保存修改过的表"""
+        for attr in list(self._dirty):
+            try:
+                self._write_table(attr)
+            except Exception as e:
+                if self.storage_format in self.COLUMNAR_FORMATS:
+                    # 列式格式写入失败（例如混合类型的列）时退回 xlsx
+                    print(f"[WARNING] {self.storage_format} 保存失败，改用 xlsx: {e}")
+                    self.storage_format = 'xlsx'
+                    self._dirty |= self._unexported
+                    self._unexported.clear()
+                    return self._save_all()
+                print(f"Excel 数据保存失败: {e}")
+                continue
+            self._dirty.discard(attr)
+            if self.storage_format in self.COLUMNAR_FORMATS:
+                self._unexported.add(attr)
+
+    def export_excel(self, tables=None):
+        """
+        把工作存储导出为 .xlsx
+
+        Args:
+            tables: 要导出的属性名列表，默认导出本次修改过的表
+        """
+        if self.storage_format not in self.COLUMNAR_FORMATS:
+            return
+        for attr in list(tables or self._unexported):
+            try:
+                self._atomic_write(self._path(attr, 'xlsx'), lambda p: getattr(self, attr).to_excel(p, index=True))
+                # 让工作存储不早于 xlsx，下次启动不会把刚导出的 xlsx 当成外部修改
+                os.utime(self._path(attr, self.storage_format))
+                self._unexported.discard(attr)
+            except Exception as e:
+                print(f"Excel 数据导出失败: {e}")
 
     def get_vocabulary(self, level=None):
         """获取词汇数据"""
@@ -139,6 +379,7 @@ class ExcelDatabase(DatabaseInterface):
         """更新用户学习记录"""
         if vocab_id in self.df_records.index:
             self.df_records.loc[vocab_id, 'star'] = star
+            self._mark_dirty('df_records')
             self._save_all()
 
     def add_to_review_list(self, username, vocab_id, weight=10.0):
@@ -147,12 +388,38 @@ class ExcelDatabase(DatabaseInterface):
             new_row = self.df_vocab.loc[[vocab_id]]
             self.df_review = pd.concat([self.df_review, new_row])
             self.df_review.loc[vocab_id, 'weight'] = weight
+            self._mark_dirty('df_review')
             self._save_all()
 
     def update_review_weight(self, username, vocab_id, weight):
         """更新复习权重"""
         if vocab_id in self.df_review.index:
             self.df_review.loc[vocab_id, 'weight'] = weight
+            self._mark_dirty('df_review')
+            self._save_all()
+
+    def update_user_records(self, username, stars):
+        """批量更新学习记录（只保存一次）"""
+        keys = [k for k in stars if k in self.df_records.index]
+        if keys:
+            self.df_records.loc[keys, 'star'] = [stars[k] for k in keys]
+            self._mark_dirty('df_records')
+            self._save_all()
+
+    def update_review_weights(self, username, weights):
+        """批量更新复习权重（只保存一次）"""
+        keys = [k for k in weights if k in self.df_review.index]
+        if keys:
+            self.df_review.loc[keys, 'weight'] = [weights[k] for k in keys]
+            self._mark_dirty('df_review')
+            self._save_all()
+
+    def update_review_schedule(self, username, vocab_id, schedule):
+        """更新复习调度"""
+        if vocab_id in self.df_review.index:
+            for column, value in schedule.items():
+                self.df_review.loc[vocab_id, column] = value
+            self._mark_dirty('df_review')
             self._save_all()
 
     def add_bookmark(self, username, vocab_id):
@@ -163,6 +430,7 @@ class ExcelDatabase(DatabaseInterface):
                 self.df_bookmarks = new_row
             else:
                 self.df_bookmarks = pd.concat([self.df_bookmarks, new_row])
+            self._mark_dirty('df_bookmarks')
             self._save_all()
 
     def update_daily_stats(self, username, date, total, correct, wrong):
@@ -173,10 +441,168 @@ class ExcelDatabase(DatabaseInterface):
             self.df_daily.loc[date, 'total'] += total
             self.df_daily.loc[date, 'ac'] += correct
             self.df_daily.loc[date, 'wa'] += wrong
+        self._mark_dirty('df_daily')
         self._save_all()
 
+    # Excel 模式没有用户配置和聊天记录表：AI 助手的聊天记录只保存在内存中
+    def append_chat_messages(self, username, messages):
+        """Excel 模式不保存聊天记录"""
+        return []
+
+    def get_chat_messages(self, username, before_id=None, limit=CHAT_PAGE_SIZE):
+        """Excel 模式没有聊天记录"""
+        return []
+
+    def import_legacy_chat_history(self, username):
+        """Excel 模式没有旧聊天记录字段"""
+        return 0
+
+
+# get_review_list / get_due_reviews 返回的列
+REVIEW_LIST_COLUMNS = ['review_id', 'user_id', 'vocab_id', 'weight', 'added_at', 'last_reviewed',
+                       'next_review_time', 'interval_days', 'ease_factor', 'repetitions',
+                       'english', 'chinese', 'japanese', 'level']
+
+# 旧版 SQLite 库缺少的字段：表名 -> [(字段, 定义)]
+SQLITE_ADDED_COLUMNS = {
+    'user_review_list': [
+        ('next_review_time', 'TIMESTAMP'),
+        ('interval_days', 'DECIMAL(10, 4) DEFAULT 0'),
+        ('ease_factor', 'DECIMAL(6, 4) DEFAULT 2.5'),
+        ('repetitions', 'INTEGER DEFAULT 0'),
+    ],
+}
+
+
+# 用户各表的版本：按 user_id 索引聚合，只返回一行，用来判断是否需要重新加载整张表
+USER_DATA_VERSION_TABLES = ('records', 'review', 'bookmarks', 'daily')
+USER_DATA_VERSION_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM user_learning_records WHERE user_id = $1) AS records_count,
+        (SELECT SUM(star) FROM user_learning_records WHERE user_id = $1) AS records_star,
+        (SELECT SUM(review_count) FROM user_learning_records WHERE user_id = $1) AS records_reviews,
+        (SELECT COUNT(*) FROM user_review_list WHERE user_id = $1) AS review_count,
+        (SELECT SUM(weight) FROM user_review_list WHERE user_id = $1) AS review_weight,
+        (SELECT MAX(next_review_time) FROM user_review_list WHERE user_id = $1) AS review_due,
+        (SELECT COUNT(*) FROM user_bookmarks WHERE user_id = $1) AS bookmarks_count,
+        (SELECT MAX(bookmark_id) FROM user_bookmarks WHERE user_id = $1) AS bookmarks_latest,
+        (SELECT COUNT(*) FROM user_daily_stats WHERE user_id = $1) AS daily_count,
+        (SELECT SUM(total_questions) FROM user_daily_stats WHERE user_id = $1) AS daily_total,
+        (SELECT MAX(date) FROM user_daily_stats WHERE user_id = $1) AS daily_latest
+"""
+
 
-class OpenGaussDatabase(DatabaseInterface):
+def _user_data_version(row):
+    """版本查询结果 → {表: 版本元组}（数值统一转为 str，避免 Decimal/float 比较误差）"""
+    values = [None if v is None else str(v) for v in row]
+    return {'records': tuple(values[0:3]), 'review': tuple(values[3:6]),
+            'bookmarks': tuple(values[6:8]), 'daily': tuple(values[8:11])}
+
+
+# 学习记录 upsert / 复习权重更新（单条和批量写入共用，$n 占位符，SQLite 转换为 ?n）
+UPSERT_RECORD_SQL = """
+    INSERT INTO user_learning_records (user_id, vocab_id, star, last_reviewed, review_count)
+    VALUES ($1, $2, $3, CURRENT_TIMESTAMP, 1)
+    ON CONFLICT (user_id, vocab_id) DO UPDATE
+    SET star = EXCLUDED.star,
+        last_reviewed = CURRENT_TIMESTAMP,
+        review_count = user_learning_records.review_count + 1
+"""
+UPDATE_WEIGHT_SQL = """
+    UPDATE user_review_list
+    SET weight = $1, last_reviewed = CURRENT_TIMESTAMP
+    WHERE user_id = $2 AND vocab_id = $3
+"""
+
+
+# AI 助手聊天记录：按 message_id 倒序取一页（键集分页，$2 为上一页最早的 id）
+CHAT_PAGE_SQL = """
+    SELECT message_id, role, content, created_at
+    FROM chat_messages
+    WHERE user_id = $1 AND message_id < $2
+    ORDER BY message_id DESC
+    LIMIT $3
+"""
+# 不指定 before_id 时的上界（SERIAL 的最大值）
+MAX_CHAT_MESSAGE_ID = 2 ** 31 - 1
+
+
+def _chat_page(rows):
+    """倒序查询结果 → 按时间正序的消息列表"""
+    return [{'message_id': row['message_id'], 'role': row['role'], 'content': row['content'],
+             'created_at': to_datetime(row['created_at'])} for row in reversed(rows)]
+
+
+def _sqlite_sql(sql):
+    """$n 占位符 → SQLite 的 ?n"""
+    return re.sub(r'\$(\d+)', r'?\1', sql)
+
+
+def _schedule_rows(user_id, schedules, convert_time):
+    """{vocab_id: schedule 字段} → UPDATE 参数行"""
+    return [(float(s['interval_days']), float(s['ease_factor']), int(s['repetitions']),
+             convert_time(s['next_review_time']), user_id, int(vocab_id))
+            for vocab_id, s in schedules.items()]
+
+
+def _to_date(value):
+    """把 date/datetime/Timestamp/'YYYY-MM-DD' 统一转换为 datetime.date"""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if hasattr(value, 'date'):
+        return value.date()
+    return datetime.datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class PreparedStatementCache:
+    """
+    预编译语句缓存 - 每个数据库连接一份
+
+    同一 SQL 文本只在该连接上 prepare 一次，之后直接复用，
+    省去每次调用的解析/计划往返。连接重建时必须 clear()，
+    因为预编译语句只在创建它的会话内有效。
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conn, sql):
+        """返回 sql 对应的预编译语句，不存在时在 conn 上创建"""
+        statement = self._statements.get(sql)
+        if statement is not None:
+            self.hits += 1
+            self._statements.move_to_end(sql)
+            return statement
+
+        self.misses += 1
+        statement = conn.prepare(sql)
+        self._statements[sql] = statement
+        if len(self._statements) > self.max_size:
+            # 淘汰最久未使用的语句（动态拼接的 SQL 不会无限增长）
+            self._statements.popitem(last=False)
+        return statement
+
+    def clear(self):
+        """清空缓存（连接关闭或重连时调用）"""
+        self._statements.clear()
+
+    def stats(self):
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._statements),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class OpenGaussDatabase(LeaderboardMixin, DatabaseInterface):
     """openGauss 数据库实现"""
 
     def __init__(self, host='localhost', port=5432, database='vocabulary_db',
@@ -187,15 +613,40 @@ class OpenGaussDatabase(DatabaseInterface):
         self.user = user
         self.password = password
         self.conn = None
+        self.statement_cache = PreparedStatementCache()
+        self.schema_version = None
+        self._config_columns = None
+
+    def _prepare(self, sql):
+        """获取预编译语句（按 SQL 文本在当前连接上缓存）"""
+        return self.statement_cache.get(self.conn, sql)
+
+    def _lb_execute(self, sql, params):
+        self._prepare(sql)(*params)
+
+    def _lb_query(self, sql, params):
+        return self._prepare(sql)(*params)
+
+    def _lb_date(self, value):
+        return _to_date(value)
+
+    def _transaction(self):
+        return self.conn.xact()
 
     def connect(self):
         """连接到 openGauss 数据库"""
         try:
             import py_opengauss
 
+            # 旧连接上的预编译语句在新会话中无效
+            if self.conn is not None:
+                self.close()
+            self.statement_cache.clear()
+
             # 构建连接字符串
             conn_str = f'opengauss://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}'
             self.conn = py_opengauss.open(conn_str)
+            self._ensure_schema()
             return True
         except ImportError:
             print("错误: 请安装 py_opengauss 库")
@@ -206,141 +657,239 @@ class OpenGaussDatabase(DatabaseInterface):
 
     def close(self):
         """关闭数据库连接"""
+        self.statement_cache.clear()
+        self.schema_version = None
+        self._config_columns = None
         if self.conn:
-            self.conn.close()
+            try:
+                self.conn.close()
+            finally:
+                self.conn = None
+
+    def _ensure_schema(self):
+        """执行尚未执行的表结构迁移，记录当前版本（失败时退回按需探测字段）"""
+        from server.schema_migrations import migrate
+        try:
+            self.schema_version = migrate(self.conn)
+        except Exception as e:
+            print(f"[WARNING] Schema migration failed, falling back to column probing: {e}")
+            self.schema_version = None
+
+    def _user_config_columns(self):
+        """user_config 的字段集合（每个连接只计算一次）"""
+        if self._config_columns is None:
+            from server.schema_migrations import USER_CONFIG_COLUMNS, USER_CONFIG_COLUMNS_VERSION
+            if self.schema_version is not None and self.schema_version >= USER_CONFIG_COLUMNS_VERSION:
+                self._config_columns = USER_CONFIG_COLUMNS
+            else:
+                result = self._prepare("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name = 'user_config'
+                """)()
+                self._config_columns = frozenset(r['column_name'] for r in result)
+        return self._config_columns
+
+    def ping(self):
+        """检查连接是否可用"""
+        if self.conn is None:
+            return False
+        try:
+            self._prepare("SELECT 1")()
+            return True
+        except Exception:
+            return False
 
     def get_vocabulary(self, level=None):
         """获取词汇数据"""
         if level:
-            query = self.conn.prepare("SELECT vocab_id, english, chinese, japanese, level, created_at FROM vocabulary WHERE level = $1")
+            query = self._prepare("SELECT vocab_id, english, chinese, japanese, level, created_at FROM vocabulary WHERE level = $1")
             results = query(level)
         else:
-            query = self.conn.prepare("SELECT vocab_id, english, chinese, japanese, level, created_at FROM vocabulary")
+            query = self._prepare("SELECT vocab_id, english, chinese, japanese, level, created_at FROM vocabulary")
             results = query()
 
         # 转换为DataFrame并设置列名
         df = pd.DataFrame(results, columns=['vocab_id', 'english', 'chinese', 'japanese', 'level', 'created_at'])
         return df
 
+    def get_vocabulary_version(self):
+        """词汇表版本 (行数, 最大 created_at)"""
+        query = self._prepare("SELECT COUNT(*) AS total, MAX(created_at) AS latest FROM vocabulary")
+        row = query()[0]
+        return (int(row['total']), row['latest'])
+
+    def get_user_data_version(self, username):
+        """用户各表的版本（一次查询）"""
+        query = self._prepare(USER_DATA_VERSION_SQL)
+        row = query(self._get_user_id(username))[0]
+        return _user_data_version(tuple(row))
+
     def get_user_records(self, username):
         """获取用户学习记录"""
-        query = self.conn.prepare("""
+        query = self._prepare("""
             SELECT lr.record_id, lr.user_id, lr.vocab_id, lr.star, lr.last_reviewed, lr.review_count,
                    v.english, v.chinese, v.japanese, v.level
             FROM user_learning_records lr
-            JOIN users u ON lr.user_id = u.user_id
             JOIN vocabulary v ON lr.vocab_id = v.vocab_id
-            WHERE u.username = $1
+            WHERE lr.user_id = $1
         """)
-        results = query(username)
+        results = query(self._get_user_id(username))
         df = pd.DataFrame(results, columns=['record_id', 'user_id', 'vocab_id', 'star', 'last_reviewed', 'review_count',
                                              'english', 'chinese', 'japanese', 'level'])
         return df
 
     def get_review_list(self, username):
         """获取用户复习本"""
-        query = self.conn.prepare("""
+        query = self._prepare("""
             SELECT rl.review_id, rl.user_id, rl.vocab_id, rl.weight, rl.added_at, rl.last_reviewed,
+                   rl.next_review_time, rl.interval_days, rl.ease_factor, rl.repetitions,
                    v.english, v.chinese, v.japanese, v.level
             FROM user_review_list rl
-            JOIN users u ON rl.user_id = u.user_id
             JOIN vocabulary v ON rl.vocab_id = v.vocab_id
-            WHERE u.username = $1
+            WHERE rl.user_id = $1
         """)
-        results = query(username)
-        df = pd.DataFrame(results, columns=['review_id', 'user_id', 'vocab_id', 'weight', 'added_at', 'last_reviewed',
-                                             'english', 'chinese', 'japanese', 'level'])
+        results = query(self._get_user_id(username))
+        df = pd.DataFrame(results, columns=REVIEW_LIST_COLUMNS)
         return df
 
+    def get_due_reviews(self, username, now=None, limit=50):
+        """已到期的复习单词（走 (user_id, next_review_time) 索引）"""
+        query = self._prepare("""
+            SELECT rl.review_id, rl.user_id, rl.vocab_id, rl.weight, rl.added_at, rl.last_reviewed,
+                   rl.next_review_time, rl.interval_days, rl.ease_factor, rl.repetitions,
+                   v.english, v.chinese, v.japanese, v.level
+            FROM user_review_list rl
+            JOIN vocabulary v ON rl.vocab_id = v.vocab_id
+            WHERE rl.user_id = $1 AND (rl.next_review_time IS NULL OR rl.next_review_time <= $2)
+            ORDER BY rl.next_review_time NULLS FIRST
+            LIMIT $3
+        """)
+        results = query(self._get_user_id(username), now or datetime.datetime.now(), limit)
+        return pd.DataFrame(results, columns=REVIEW_LIST_COLUMNS)
+
     def get_bookmarks(self, username):
         """获取用户收藏本"""
-        query = self.conn.prepare("""
+        query = self._prepare("""
             SELECT b.bookmark_id, b.user_id, b.vocab_id, b.added_at, b.note,
                    v.english, v.chinese, v.japanese, v.level
             FROM user_bookmarks b
-            JOIN users u ON b.user_id = u.user_id
             JOIN vocabulary v ON b.vocab_id = v.vocab_id
-            WHERE u.username = $1
+            WHERE b.user_id = $1
         """)
-        results = query(username)
+        results = query(self._get_user_id(username))
         df = pd.DataFrame(results, columns=['bookmark_id', 'user_id', 'vocab_id', 'added_at', 'note',
                                              'english', 'chinese', 'japanese', 'level'])
         return df
 
     def get_daily_stats(self, username):
         """获取用户每日统计"""
-        query = self.conn.prepare("""
+        query = self._prepare("""
             SELECT ds.stat_id, ds.user_id, ds.date, ds.total_questions, ds.correct_answers, ds.wrong_answers
             FROM user_daily_stats ds
-            JOIN users u ON ds.user_id = u.user_id
-            WHERE u.username = $1
+            WHERE ds.user_id = $1
             ORDER BY ds.date
         """)
-        results = query(username)
+        results = query(self._get_user_id(username))
         df = pd.DataFrame(results, columns=['stat_id', 'user_id', 'date', 'total_questions', 'correct_answers', 'wrong_answers'])
         return df
 
     def _get_user_id(self, username):
-        """获取用户 ID"""
-        query = self.conn.prepare("SELECT user_id FROM users WHERE username = $1")
-        result = query(username)
+        """获取用户 ID（已登录用户直接使用会话缓存）"""
+        session = session_registry.resolve(username)
+        if session is not None and session.user_id:
+            return session.user_id
+        query = self._prepare("SELECT user_id FROM users WHERE username = $1")
+        result = query(session_username(username))
         return result[0]['user_id'] if result else None
 
+    def open_session(self, username):
+        """登录时创建会话：解析一次 user_id 并预取用户配置"""
+        session = UserSession(username)
+        session.user_id = self._get_user_id(username)
+        if session.user_id:
+            session.config = self._load_user_config(session.user_id)
+        return session_registry.register(session)
+
+    def delete_user(self, username):
+        """删除用户（关联数据由外键级联删除），并使其会话失效"""
+        try:
+            query = self._prepare("DELETE FROM users WHERE username = $1")
+            query(session_username(username))
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to delete user {username}: {e}")
+            return False
+        finally:
+            session_registry.invalidate(session_username(username))
+
+    def rename_user(self, old_username, new_username):
+        """重命名用户，并把会话改挂到新用户名下"""
+        try:
+            user_id = self._get_user_id(old_username)
+            query = self._prepare("UPDATE users SET username = $1 WHERE username = $2")
+            query(new_username, old_username)
+            session_registry.rename(old_username, new_username)
+            if user_id:
+                self._leaderboard_rename(user_id, new_username)
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to rename user {old_username}: {e}")
+            return False
+
     def _create_user(self, username, password):
         """创建新用户"""
         try:
-            insert_query = self.conn.prepare("""
+            insert_query = self._prepare("""
                 INSERT INTO users (username, password)
                 VALUES ($1, $2)
+                RETURNING user_id
             """)
-            insert_query(username, password)
+            with self.conn.xact():
+                user_id = insert_query(username, password)[0]['user_id']
+                self._leaderboard_ensure(user_id, username)
             print(f"[DEBUG] User {username} created successfully")
         except Exception as e:
             print(f"[ERROR] Failed to create user {username}: {e}")
 
     def update_user_record(self, username, vocab_id, star):
-        """更新用户学习记录"""
+        """更新用户学习记录（单条 upsert，依赖 UNIQUE(user_id, vocab_id)）"""
         user_id = self._get_user_id(username)
         if not user_id:
             return
 
-        # 先检查是否存在
-        check_query = self.conn.prepare("SELECT record_id FROM user_learning_records WHERE user_id = $1 AND vocab_id = $2")
-        existing = check_query(user_id, vocab_id)
+        query = self._prepare(UPSERT_RECORD_SQL)
+        with self.conn.xact():
+            self._leaderboard_record_word(user_id, session_username(username), vocab_id)
+            query(user_id, vocab_id, star)
 
-        if existing:
-            # 更新
-            update_query = self.conn.prepare("""
-                UPDATE user_learning_records
-                SET star = $1, last_reviewed = CURRENT_TIMESTAMP, review_count = review_count + 1
-                WHERE user_id = $2 AND vocab_id = $3
-            """)
-            update_query(star, user_id, vocab_id)
-        else:
-            # 插入
-            insert_query = self.conn.prepare("""
-                INSERT INTO user_learning_records (user_id, vocab_id, star, last_reviewed, review_count)
-                VALUES ($1, $2, $3, CURRENT_TIMESTAMP, 1)
-            """)
-            insert_query(user_id, vocab_id, star)
+    def update_user_records(self, username, stars):
+        """批量更新学习记录（一个事务；新增的单词数一次计入排行榜）"""
+        user_id = self._get_user_id(username)
+        if not user_id or not stars:
+            return
+
+        count = self._prepare("SELECT COUNT(*) AS total FROM user_learning_records WHERE user_id = $1")
+        query = self._prepare(UPSERT_RECORD_SQL)
+        with self.conn.xact():
+            before = count(user_id)[0]['total']
+            query.load_rows([(user_id, int(vocab_id), int(star)) for vocab_id, star in stars.items()])
+            added = count(user_id)[0]['total'] - before
+            if added:
+                self._leaderboard_add_words(user_id, session_username(username), int(added))
 
     def add_to_review_list(self, username, vocab_id, weight=10.0):
-        """添加到复习本"""
+        """添加到复习本（已存在则保持原权重）"""
         user_id = self._get_user_id(username)
         if not user_id:
             return
 
-        # 先检查是否存在
-        check_query = self.conn.prepare("SELECT review_id FROM user_review_list WHERE user_id = $1 AND vocab_id = $2")
-        existing = check_query(user_id, vocab_id)
-
-        if not existing:
-            # 不存在才插入
-            insert_query = self.conn.prepare("""
-                INSERT INTO user_review_list (user_id, vocab_id, weight)
-                VALUES ($1, $2, $3)
-            """)
-            insert_query(user_id, vocab_id, weight)
+        query = self._prepare("""
+            INSERT INTO user_review_list (user_id, vocab_id, weight)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (user_id, vocab_id) DO NOTHING
+        """)
+        query(user_id, vocab_id, weight)
 
     def update_review_weight(self, username, vocab_id, weight):
         """更新复习权重"""
@@ -348,186 +897,118 @@ class OpenGaussDatabase(DatabaseInterface):
         if not user_id:
             return
 
-        query = self.conn.prepare("""
+        query = self._prepare(UPDATE_WEIGHT_SQL)
+        query(weight, user_id, vocab_id)
+
+    def update_review_weights(self, username, weights):
+        """批量更新复习权重（一个事务）"""
+        user_id = self._get_user_id(username)
+        if not user_id or not weights:
+            return
+
+        query = self._prepare(UPDATE_WEIGHT_SQL)
+        with self.conn.xact():
+            query.load_rows([(float(weight), user_id, int(vocab_id)) for vocab_id, weight in weights.items()])
+
+    def update_review_schedule(self, username, vocab_id, schedule):
+        """更新复习调度"""
+        self.update_review_schedules(username, {vocab_id: schedule})
+
+    def update_review_schedules(self, username, schedules):
+        """批量更新复习调度（一个事务）"""
+        user_id = self._get_user_id(username)
+        if not user_id or not schedules:
+            return
+
+        query = self._prepare("""
             UPDATE user_review_list
-            SET weight = $1, last_reviewed = CURRENT_TIMESTAMP
-            WHERE user_id = $2 AND vocab_id = $3
+            SET interval_days = $1, ease_factor = $2, repetitions = $3, next_review_time = $4
+            WHERE user_id = $5 AND vocab_id = $6
         """)
-        query(weight, user_id, vocab_id)
+        with self.conn.xact():
+            query.load_rows(_schedule_rows(user_id, schedules, to_datetime))
 
     def add_bookmark(self, username, vocab_id):
-        """添加收藏"""
+        """添加收藏（已存在则忽略）"""
         user_id = self._get_user_id(username)
         if not user_id:
             return
 
-        # 先检查是否存在
-        check_query = self.conn.prepare("SELECT bookmark_id FROM user_bookmarks WHERE user_id = $1 AND vocab_id = $2")
-        existing = check_query(user_id, vocab_id)
-
-        if not existing:
-            # 不存在才插入
-            insert_query = self.conn.prepare("""
-                INSERT INTO user_bookmarks (user_id, vocab_id)
-                VALUES ($1, $2)
-            """)
-            insert_query(user_id, vocab_id)
+        query = self._prepare("""
+            INSERT INTO user_bookmarks (user_id, vocab_id)
+            VALUES ($1, $2)
+            ON CONFLICT (user_id, vocab_id) DO NOTHING
+        """)
+        query(user_id, vocab_id)
 
     def update_daily_stats(self, username, date, total, correct, wrong):
-        """更新每日统计"""
+        """更新每日统计（单条 upsert 累加，依赖 UNIQUE(user_id, date)）"""
         user_id = self._get_user_id(username)
         if not user_id:
             # 用户不存在，先创建用户
             print(f"[DEBUG] User {username} not found in database, creating...")
-            self._create_user(username, "default_password")  # 使用默认密码
+            self._create_user(session_username(username), "default_password")  # 使用默认密码
             user_id = self._get_user_id(username)
             if not user_id:
                 print(f"[ERROR] Failed to create user {username}")
                 return
 
-        # 确保日期是字符串格式 'YYYY-MM-DD'
-        if hasattr(date, 'strftime'):
-            date_str = date.strftime('%Y-%m-%d')
-        else:
-            date_str = str(date)
-
-        # 先检查是否存在 - 直接在SQL中嵌入日期字符串
-        check_sql = f"SELECT stat_id FROM user_daily_stats WHERE user_id = $1 AND date = '{date_str}'"
-        check_query = self.conn.prepare(check_sql)
-        existing = check_query(user_id)
-
-        if existing:
-            # 更新（累加）
-            update_sql = f"""
-                UPDATE user_daily_stats
-                SET total_questions = total_questions + $1,
-                    correct_answers = correct_answers + $2,
-                    wrong_answers = wrong_answers + $3
-                WHERE user_id = $4 AND date = '{date_str}'
-            """
-            update_query = self.conn.prepare(update_sql)
-            update_query(total, correct, wrong, user_id)
-        else:
-            # 插入
-            insert_sql = f"""
-                INSERT INTO user_daily_stats (user_id, date, total_questions, correct_answers, wrong_answers)
-                VALUES ($1, '{date_str}', $2, $3, $4)
-            """
-            insert_query = self.conn.prepare(insert_sql)
-            insert_query(user_id, total, correct, wrong)
-
-    def get_ranking_data(self):
-        """获取所有用户的排行榜数据"""
-        try:
-            query = self.conn.prepare("""
-                SELECT
-                    u.username,
-
-                    -- 今日数据
-                    COALESCE(today.total_questions, 0) as today_questions,
-                    COALESCE(today.accuracy, 0) as today_accuracy,
-
-                    -- 历史总数据
-                    COALESCE(total.total_questions, 0) as total_questions,
-                    COALESCE(total.avg_accuracy, 0) as total_accuracy,
-
-                    -- 学习单词数
-                    COALESCE(words.words_learned, 0) as words_learned,
-
-                    -- 总积分
-                    COALESCE(config.total_score, 0) as total_score,
-
-                    -- 学习天数
-                    COALESCE(days.study_days, 0) as study_days
-
-                FROM users u
-
-                -- 今日统计
-                LEFT JOIN (
-                    SELECT user_id, total_questions,
-                           CASE WHEN total_questions > 0
-                                THEN (correct_answers::float / total_questions * 100)
-                                ELSE 0
-                           END as accuracy
-                    FROM user_daily_stats
-                    WHERE date = CURRENT_DATE
-                ) today ON u.user_id = today.user_id
-
-                -- 历史总统计
-                LEFT JOIN (
-                    SELECT user_id,
-                           SUM(total_questions) as total_questions,
-                           CASE WHEN SUM(total_questions) > 0
-                                THEN (SUM(correct_answers)::float / SUM(total_questions) * 100)
-                                ELSE 0
-                           END as avg_accuracy
-                    FROM user_daily_stats
-                    GROUP BY user_id
-                ) total ON u.user_id = total.user_id
-
-                -- 学习单词统计
-                LEFT JOIN (
-                    SELECT user_id,
-                           COUNT(DISTINCT vocab_id) as words_learned
-                    FROM user_learning_records
-                    GROUP BY user_id
-                ) words ON u.user_id = words.user_id
-
-                -- 总积分
-                LEFT JOIN (
-                    SELECT user_id, total_score
-                    FROM user_config
-                ) config ON u.user_id = config.user_id
-
-                -- 学习天数统计
-                LEFT JOIN (
-                    SELECT user_id,
-                           COUNT(DISTINCT date) as study_days
-                    FROM user_daily_stats
-                    WHERE total_questions > 0
-                    GROUP BY user_id
-                ) days ON u.user_id = days.user_id
-
-                ORDER BY u.username
-            """)
+        # 日期作为参数传入，SQL 文本固定，预编译语句可跨天复用
+        query = self._prepare("""
+            INSERT INTO user_daily_stats (user_id, date, total_questions, correct_answers, wrong_answers)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (user_id, date) DO UPDATE
+            SET total_questions = user_daily_stats.total_questions + EXCLUDED.total_questions,
+                correct_answers = user_daily_stats.correct_answers + EXCLUDED.correct_answers,
+                wrong_answers = user_daily_stats.wrong_answers + EXCLUDED.wrong_answers
+        """)
+        with self.conn.xact():
+            # 排行榜需要用写入前的数据判断是否新增学习天数
+            self._leaderboard_add_daily(user_id, session_username(username), date, total, correct)
+            query(user_id, _to_date(date), total, correct, wrong)
 
-            result = query()
-            ranking_list = []
-
-            for row in result:
-                user_stats = {
-                    'username': row['username'],
-                    'today_questions': int(row['today_questions']) if row['today_questions'] else 0,
-                    'today_accuracy': float(row['today_accuracy']) if row['today_accuracy'] else 0.0,
-                    'total_questions': int(row['total_questions']) if row['total_questions'] else 0,
-                    'total_accuracy': float(row['total_accuracy']) if row['total_accuracy'] else 0.0,
-                    'words_learned': int(row['words_learned']) if row['words_learned'] else 0,
-                    'total_score': float(row['total_score']) if row['total_score'] else 0.0,
-                    'study_days': int(row['study_days']) if row['study_days'] else 0,
-                }
-                ranking_list.append(user_stats)
+    def append_chat_messages(self, username, messages):
+        """追加聊天消息（一个事务），返回新消息的 message_id 列表"""
+        user_id = self._get_user_id(username)
+        if not user_id or not messages:
+            return []
 
-            return ranking_list
+        query = self._prepare("""
+            INSERT INTO chat_messages (user_id, role, content)
+            VALUES ($1, $2, $3)
+            RETURNING message_id
+        """)
+        with self.conn.xact():
+            return [query(user_id, m['role'], m['content'])[0]['message_id'] for m in messages]
 
-        except Exception as e:
-            print(f"[ERROR] Failed to get ranking data: {e}")
+    def get_chat_messages(self, username, before_id=None, limit=CHAT_PAGE_SIZE):
+        """按 message_id 倒序取一页聊天消息（走 (user_id, message_id) 索引），返回时按时间正序"""
+        user_id = self._get_user_id(username)
+        if not user_id:
             return []
 
+        query = self._prepare(CHAT_PAGE_SQL)
+        return _chat_page(query(user_id, before_id or MAX_CHAT_MESSAGE_ID, limit))
+
     def get_user_config(self, username):
-        """获取用户配置"""
+        """获取用户配置（已登录用户优先使用会话缓存）"""
+        session = session_registry.resolve(username)
+        if session is not None and session.config is not None:
+            return dict(session.config)
+
         user_id = self._get_user_id(username)
         if not user_id:
             return None
 
-        # 先检查哪些字段存在
+        config = self._load_user_config(user_id)
+        if session is not None and config is not None:
+            session.config = dict(config)
+        return config
+
+    def _load_user_config(self, user_id):
+        """从 user_config 表读取配置"""
         try:
-            check_columns = self.conn.prepare("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'user_config'
-            """)
-            result = check_columns()
-            existing_columns = [r['column_name'] for r in result]
+            existing_columns = self._user_config_columns()
 
             # 构建查询语句，只查询存在的字段
             select_fields = ['api_key']  # api_key 是必须的
@@ -552,7 +1033,7 @@ class OpenGaussDatabase(DatabaseInterface):
                 FROM user_config
                 WHERE user_id = $1
             """
-            query = self.conn.prepare(query_sql)
+            query = self._prepare(query_sql)
             result = query(user_id)
 
             if result and len(result) > 0:
@@ -587,17 +1068,10 @@ class OpenGaussDatabase(DatabaseInterface):
             return False
 
         try:
-            # 先检查哪些字段存在
-            check_columns = self.conn.prepare("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'user_config'
-            """)
-            result = check_columns()
-            existing_columns = [r['column_name'] for r in result]
+            existing_columns = self._user_config_columns()
 
             # 检查是否已存在配置
-            check_query = self.conn.prepare("SELECT user_id FROM user_config WHERE user_id = $1")
+            check_query = self._prepare("SELECT user_id FROM user_config WHERE user_id = $1")
             existing = check_query(user_id)
 
             if existing:
@@ -671,7 +1145,7 @@ class OpenGaussDatabase(DatabaseInterface):
                         SET {', '.join(update_parts)}
                         WHERE user_id = ${param_count}
                     """
-                    update_query = self.conn.prepare(update_sql)
+                    update_query = self._prepare(update_sql)
                     update_query(*params)
             else:
                 # 插入新配置 - 只插入存在的字段
@@ -750,9 +1224,499 @@ class OpenGaussDatabase(DatabaseInterface):
                     INSERT INTO user_config ({', '.join(insert_fields)})
                     VALUES ({', '.join(insert_values)})
                 """
-                insert_query = self.conn.prepare(insert_sql)
+                insert_query = self._prepare(insert_sql)
                 insert_query(*insert_params)
 
+            session_registry.update_config(username, {
+                'api_key': api_key, 'api_endpoint': api_endpoint, 'api_model': api_model,
+                'chat_history': chat_history, 'total_score': total_score, 'primary_color': primary_color,
+                'theme': theme, 'main_language': main_language, 'study_language': study_language,
+                'difficulty': difficulty, 'target_score': target_score,
+            })
+            if total_score is not None:
+                self._leaderboard_set_score(user_id, session_username(username), total_score)
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to save user config: {e}")
+            return False
+
+
+class SQLiteDatabase(LeaderboardMixin, DatabaseInterface):
+    """SQLite 本地数据库实现（表结构与 openGauss 一致，用于单机存储、基准测试和压测）"""
+
+    # user_config 中可由 save_user_config 更新的字段：参数名 -> (列名, 插入时的默认值)
+    USER_CONFIG_FIELDS = {
+        'api_key': ('api_key', ''),
+        'api_endpoint': ('api_endpoint', 'https://api.deepseek.com'),
+        'api_model': ('api_model', 'deepseek-chat'),
+        'chat_history': ('deepseek_chat_history', '[]'),
+        'total_score': ('total_score', 0.0),
+        'primary_color': ('primary_color', '#4080FF'),
+        'theme': ('theme', 'light'),
+        'main_language': ('main_language', 'Chinese'),
+        'study_language': ('study_language', 'English'),
+        'difficulty': ('difficulty', 1),
+        'target_score': ('target_score', 10000),
+    }
+
+    def __init__(self, db_path=None, schema_path=None):
+        self.root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server_dir = os.path.join(self.root_dir, 'server')
+        self.db_path = db_path or os.path.join(server_dir, 'vocabulary.db')
+        self.schema_path = schema_path or os.path.join(server_dir, 'init_sqlite_database.sql')
+        self.conn = None
+
+    def connect(self):
+        """打开 SQLite 数据库（WAL 模式），并按需初始化表结构"""
+        try:
+            import sqlite3
+
+            if self.db_path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+            # isolation_level=None: 与 py_opengauss 一致，每条语句自动提交
+            # check_same_thread=False: 连接可能被 QThread 使用（同一时刻只有一个使用者）
+            self.conn = sqlite3.connect(
+                self.db_path,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.execute("PRAGMA foreign_keys = ON")
+            self.conn.execute("PRAGMA busy_timeout = 5000")
+
+            with open(self.schema_path, 'r', encoding='utf-8') as f:
+                self.conn.executescript(f.read())
+            self._upgrade_schema()
+            return True
+        except Exception as e:
+            print(f"SQLite 数据库打开失败: {e}")
+            self.conn = None
+            return False
+
+    def _upgrade_schema(self):
+        """为旧版本地库补齐后来新增的字段（CREATE TABLE IF NOT EXISTS 不会修改已有的表）"""
+        for table, columns in SQLITE_ADDED_COLUMNS.items():
+            existing = {row['name'] for row in self._query(f"PRAGMA table_info({table})")}
+            for column, definition in columns:
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def ping(self):
+        """检查连接是否可用"""
+        if self.conn is None:
+            return False
+        try:
+            self.conn.execute("SELECT 1").fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _query(self, sql, params=()):
+        """执行查询并返回所有行"""
+        return self.conn.execute(sql, params).fetchall()
+
+    def _lb_execute(self, sql, params):
+        # 排行榜 SQL 使用 $n 占位符，转换为 SQLite 的 ?n
+        self.conn.execute(_sqlite_sql(sql), params)
+
+    def _lb_query(self, sql, params):
+        return self.conn.execute(_sqlite_sql(sql), params).fetchall()
+
+    def _lb_date(self, value):
+        return value.strftime('%Y-%m-%d') if hasattr(value, 'strftime') else str(value)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN / COMMIT 事务，出错时回滚"""
+        self.conn.execute("BEGIN")
+        try:
+            yield
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _query_df(self, sql, params, columns):
+        """执行查询并转换为 DataFrame"""
+        rows = self._query(sql, params)
+        return pd.DataFrame([tuple(r) for r in rows], columns=columns)
+
+    def import_vocabulary(self, df):
+        """
+        批量导入词汇（用于初始化本地库或压测数据）
+
+        Args:
+            df: 含 english/chinese/japanese/level 列的 DataFrame（列名大小写均可）
+
+        Returns:
+            导入的词汇数量
+        """
+        columns = {c.lower(): c for c in df.columns}
+        rows = []
+        for row in df.to_dict('records'):
+            level = row.get(columns.get('level'))
+            rows.append((row.get(columns.get('english')), row.get(columns.get('chinese')),
+                         row.get(columns.get('japanese')), int(level) if pd.notna(level) else 1))
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO vocabulary (english, chinese, japanese, level) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def get_vocabulary(self, level=None):
+        """获取词汇数据"""
+        columns = ['vocab_id', 'english', 'chinese', 'japanese', 'level', 'created_at']
+        if level:
+            return self._query_df(
+                "SELECT vocab_id, english, chinese, japanese, level, created_at FROM vocabulary WHERE level = ?",
+                (level,), columns)
+        return self._query_df(
+            "SELECT vocab_id, english, chinese, japanese, level, created_at FROM vocabulary",
+            (), columns)
+
+    def get_vocabulary_version(self):
+        """词汇表版本 (行数, 最大 created_at)"""
+        row = self._query("SELECT COUNT(*) AS total, MAX(created_at) AS latest FROM vocabulary")[0]
+        return (int(row['total']), row['latest'])
+
+    def get_user_data_version(self, username):
+        """用户各表的版本（一次查询）"""
+        row = self._query(_sqlite_sql(USER_DATA_VERSION_SQL), (self._get_user_id(username),))[0]
+        return _user_data_version(tuple(row))
+
+    def get_user_records(self, username):
+        """获取用户学习记录"""
+        return self._query_df("""
+            SELECT lr.record_id, lr.user_id, lr.vocab_id, lr.star, lr.last_reviewed, lr.review_count,
+                   v.english, v.chinese, v.japanese, v.level
+            FROM user_learning_records lr
+            JOIN vocabulary v ON lr.vocab_id = v.vocab_id
+            WHERE lr.user_id = ?
+        """, (self._get_user_id(username),), ['record_id', 'user_id', 'vocab_id', 'star', 'last_reviewed', 'review_count',
+                            'english', 'chinese', 'japanese', 'level'])
+
+    def get_review_list(self, username):
+        """获取用户复习本"""
+        return self._query_df("""
+            SELECT rl.review_id, rl.user_id, rl.vocab_id, rl.weight, rl.added_at, rl.last_reviewed,
+                   rl.next_review_time, rl.interval_days, rl.ease_factor, rl.repetitions,
+                   v.english, v.chinese, v.japanese, v.level
+            FROM user_review_list rl
+            JOIN vocabulary v ON rl.vocab_id = v.vocab_id
+            WHERE rl.user_id = ?
+        """, (self._get_user_id(username),), REVIEW_LIST_COLUMNS)
+
+    def get_due_reviews(self, username, now=None, limit=50):
+        """已到期的复习单词（走 (user_id, next_review_time) 索引）"""
+        now = now or datetime.datetime.now()
+        return self._query_df("""
+            SELECT rl.review_id, rl.user_id, rl.vocab_id, rl.weight, rl.added_at, rl.last_reviewed,
+                   rl.next_review_time, rl.interval_days, rl.ease_factor, rl.repetitions,
+                   v.english, v.chinese, v.japanese, v.level
+            FROM user_review_list rl
+            JOIN vocabulary v ON rl.vocab_id = v.vocab_id
+            WHERE rl.user_id = ? AND (rl.next_review_time IS NULL OR rl.next_review_time <= ?)
+            ORDER BY rl.next_review_time IS NOT NULL, rl.next_review_time
+            LIMIT ?
+        """, (self._get_user_id(username), now.strftime('%Y-%m-%d %H:%M:%S'), limit), REVIEW_LIST_COLUMNS)
+
+    def get_bookmarks(self, username):
+        """获取用户收藏本"""
+        return self._query_df("""
+            SELECT b.bookmark_id, b.user_id, b.vocab_id, b.added_at, b.note,
+                   v.english, v.chinese, v.japanese, v.level
+            FROM user_bookmarks b
+            JOIN vocabulary v ON b.vocab_id = v.vocab_id
+            WHERE b.user_id = ?
+        """, (self._get_user_id(username),), ['bookmark_id', 'user_id', 'vocab_id', 'added_at', 'note',
+                            'english', 'chinese', 'japanese', 'level'])
+
+    def get_daily_stats(self, username):
+        """获取用户每日统计"""
+        return self._query_df("""
+            SELECT ds.stat_id, ds.user_id, ds.date, ds.total_questions, ds.correct_answers, ds.wrong_answers
+            FROM user_daily_stats ds
+            WHERE ds.user_id = ?
+            ORDER BY ds.date
+        """, (self._get_user_id(username),), ['stat_id', 'user_id', 'date', 'total_questions', 'correct_answers', 'wrong_answers'])
+
+    def _get_user_id(self, username):
+        """获取用户 ID（已登录用户直接使用会话缓存）"""
+        session = session_registry.resolve(username)
+        if session is not None and session.user_id:
+            return session.user_id
+        result = self._query("SELECT user_id FROM users WHERE username = ?", (session_username(username),))
+        return result[0]['user_id'] if result else None
+
+    def open_session(self, username):
+        """登录时创建会话：解析一次 user_id 并预取用户配置"""
+        session = UserSession(username)
+        session.user_id = self._get_user_id(username)
+        if session.user_id:
+            session.config = self._load_user_config(session.user_id)
+        return session_registry.register(session)
+
+    def delete_user(self, username):
+        """删除用户（关联数据由外键级联删除），并使其会话失效"""
+        try:
+            self.conn.execute("DELETE FROM users WHERE username = ?", (session_username(username),))
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to delete user {username}: {e}")
+            return False
+        finally:
+            session_registry.invalidate(session_username(username))
+
+    def rename_user(self, old_username, new_username):
+        """重命名用户，并把会话改挂到新用户名下"""
+        try:
+            user_id = self._get_user_id(old_username)
+            self.conn.execute("UPDATE users SET username = ? WHERE username = ?", (new_username, old_username))
+            session_registry.rename(old_username, new_username)
+            if user_id:
+                self._leaderboard_rename(user_id, new_username)
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to rename user {old_username}: {e}")
+            return False
+
+    def _create_user(self, username, password):
+        """创建新用户"""
+        try:
+            with self._transaction():
+                user_id = self.conn.execute("INSERT INTO users (username, password) VALUES (?, ?)",
+                                            (username, password)).lastrowid
+                self._leaderboard_ensure(user_id, username)
+            print(f"[DEBUG] User {username} created successfully")
+        except Exception as e:
+            print(f"[ERROR] Failed to create user {username}: {e}")
+
+    def update_user_record(self, username, vocab_id, star):
+        """更新用户学习记录"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            return
+
+        with self._transaction():
+            self._leaderboard_record_word(user_id, session_username(username), vocab_id)
+            self.conn.execute(_sqlite_sql(UPSERT_RECORD_SQL), (user_id, vocab_id, star))
+
+    def update_user_records(self, username, stars):
+        """批量更新学习记录（一个事务；新增的单词数一次计入排行榜）"""
+        user_id = self._get_user_id(username)
+        if not user_id or not stars:
+            return
+
+        count_sql = "SELECT COUNT(*) AS total FROM user_learning_records WHERE user_id = ?"
+        with self._transaction():
+            before = self._query(count_sql, (user_id,))[0]['total']
+            self.conn.executemany(_sqlite_sql(UPSERT_RECORD_SQL),
+                                  [(user_id, int(vocab_id), int(star)) for vocab_id, star in stars.items()])
+            added = self._query(count_sql, (user_id,))[0]['total'] - before
+            if added:
+                self._leaderboard_add_words(user_id, session_username(username), added)
+
+    def add_to_review_list(self, username, vocab_id, weight=10.0):
+        """添加到复习本"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            return
+
+        self.conn.execute("""
+            INSERT INTO user_review_list (user_id, vocab_id, weight)
+            VALUES (?, ?, ?)
+            ON CONFLICT (user_id, vocab_id) DO NOTHING
+        """, (user_id, vocab_id, weight))
+
+    def update_review_weight(self, username, vocab_id, weight):
+        """更新复习权重"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            return
+
+        self.conn.execute(_sqlite_sql(UPDATE_WEIGHT_SQL), (weight, user_id, vocab_id))
+
+    def update_review_weights(self, username, weights):
+        """批量更新复习权重（一个事务）"""
+        user_id = self._get_user_id(username)
+        if not user_id or not weights:
+            return
+
+        with self._transaction():
+            self.conn.executemany(_sqlite_sql(UPDATE_WEIGHT_SQL),
+                                  [(float(weight), user_id, int(vocab_id)) for vocab_id, weight in weights.items()])
+
+    def update_review_schedule(self, username, vocab_id, schedule):
+        """更新复习调度"""
+        self.update_review_schedules(username, {vocab_id: schedule})
+
+    def update_review_schedules(self, username, schedules):
+        """批量更新复习调度（一个事务）"""
+        user_id = self._get_user_id(username)
+        if not user_id or not schedules:
+            return
+
+        with self._transaction():
+            self.conn.executemany("""
+                UPDATE user_review_list
+                SET interval_days = ?, ease_factor = ?, repetitions = ?, next_review_time = ?
+                WHERE user_id = ? AND vocab_id = ?
+            """, _schedule_rows(user_id, schedules, lambda value: value))
+
+    def add_bookmark(self, username, vocab_id):
+        """添加收藏"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            return
+
+        self.conn.execute("""
+            INSERT INTO user_bookmarks (user_id, vocab_id)
+            VALUES (?, ?)
+            ON CONFLICT (user_id, vocab_id) DO NOTHING
+        """, (user_id, vocab_id))
+
+    def update_daily_stats(self, username, date, total, correct, wrong):
+        """更新每日统计"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            # 用户不存在，先创建用户（与 openGauss 实现保持一致）
+            print(f"[DEBUG] User {username} not found in database, creating...")
+            self._create_user(session_username(username), "default_password")
+            user_id = self._get_user_id(username)
+            if not user_id:
+                print(f"[ERROR] Failed to create user {username}")
+                return
+
+        # 统一存储为 'YYYY-MM-DD'
+        date_str = date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date)
+
+        with self._transaction():
+            # 排行榜需要用写入前的数据判断是否新增学习天数
+            self._leaderboard_add_daily(user_id, session_username(username), date_str, total, correct)
+
+            self.conn.execute("""
+                INSERT INTO user_daily_stats (user_id, date, total_questions, correct_answers, wrong_answers)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, date) DO UPDATE
+                SET total_questions = total_questions + excluded.total_questions,
+                    correct_answers = correct_answers + excluded.correct_answers,
+                    wrong_answers = wrong_answers + excluded.wrong_answers
+            """, (user_id, date_str, total, correct, wrong))
+
+    def append_chat_messages(self, username, messages):
+        """追加聊天消息（一个事务），返回新消息的 message_id 列表"""
+        user_id = self._get_user_id(username)
+        if not user_id or not messages:
+            return []
+
+        with self._transaction():
+            # 逐条 INSERT 以取得 lastrowid（executemany 不返回每行的 id）
+            ids = [self.conn.execute("INSERT INTO chat_messages (user_id, role, content) VALUES (?, ?, ?)",
+                                     (user_id, m['role'], m['content'])).lastrowid for m in messages]
+        return ids
+
+    def get_chat_messages(self, username, before_id=None, limit=CHAT_PAGE_SIZE):
+        """按 message_id 倒序取一页聊天消息，返回时按时间正序"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            return []
+
+        return _chat_page(self._query(_sqlite_sql(CHAT_PAGE_SQL),
+                                      (user_id, before_id or MAX_CHAT_MESSAGE_ID, limit)))
+
+    def get_user_config(self, username):
+        """获取用户配置（已登录用户优先使用会话缓存）"""
+        session = session_registry.resolve(username)
+        if session is not None and session.config is not None:
+            return dict(session.config)
+
+        user_id = self._get_user_id(username)
+        if not user_id:
+            return None
+
+        config = self._load_user_config(user_id)
+        if session is not None and config is not None:
+            session.config = dict(config)
+        return config
+
+    def _load_user_config(self, user_id):
+        """从 user_config 表读取配置"""
+        try:
+            result = self._query("""
+                SELECT api_key, api_endpoint, api_model, deepseek_chat_history, total_score,
+                       difficulty, target_score, primary_color, theme, main_language, study_language
+                FROM user_config
+                WHERE user_id = ?
+            """, (user_id,))
+
+            if result:
+                row = result[0]
+                return {
+                    'api_key': row['api_key'] or '',
+                    'api_endpoint': row['api_endpoint'] or 'https://api.deepseek.com',
+                    'api_model': row['api_model'] or 'deepseek-chat',
+                    'chat_history': row['deepseek_chat_history'] or '[]',
+                    'total_score': float(row['total_score']) if row['total_score'] is not None else 0.0,
+                    'primary_color': row['primary_color'],
+                    'theme': row['theme'],
+                    'main_language': row['main_language'],
+                    'study_language': row['study_language'],
+                    'difficulty': int(row['difficulty']) if row['difficulty'] is not None else 1,
+                    'target_score': int(row['target_score']) if row['target_score'] is not None else 10000
+                }
+        except Exception as e:
+            print(f"[ERROR] Failed to get user config: {e}")
+
+        return None
+
+    def save_user_config(self, username, api_key=None, api_endpoint=None, api_model=None,
+                        chat_history=None, primary_color=None, theme=None, total_score=None,
+                        main_language=None, study_language=None, difficulty=None, target_score=None):
+        """保存用户配置"""
+        user_id = self._get_user_id(username)
+        if not user_id:
+            print(f"[ERROR] User {username} not found")
+            return False
+
+        values = {
+            'api_key': api_key, 'api_endpoint': api_endpoint, 'api_model': api_model,
+            'chat_history': chat_history, 'total_score': total_score, 'primary_color': primary_color,
+            'theme': theme, 'main_language': main_language, 'study_language': study_language,
+            'difficulty': difficulty, 'target_score': target_score,
+        }
+
+        try:
+            # 插入时未提供的字段使用默认值，冲突时只更新非 None 的字段
+            insert_fields = ['user_id']
+            insert_params = [user_id]
+            update_parts = []
+            for name, (column, default) in self.USER_CONFIG_FIELDS.items():
+                value = values[name]
+                insert_fields.append(column)
+                insert_params.append(value if value is not None else default)
+                if value is not None:
+                    update_parts.append(f"{column} = excluded.{column}")
+
+            conflict_action = f"DO UPDATE SET {', '.join(update_parts)}" if update_parts else "DO NOTHING"
+            self.conn.execute(f"""
+                INSERT INTO user_config ({', '.join(insert_fields)})
+                VALUES ({', '.join('?' for _ in insert_fields)})
+                ON CONFLICT (user_id) {conflict_action}
+            """, insert_params)
+            session_registry.update_config(username, values)
+            if total_score is not None:
+                self._leaderboard_set_score(user_id, session_username(username), total_score)
             return True
         except Exception as e:
             print(f"[ERROR] Failed to save user config: {e}")
@@ -768,7 +1732,7 @@ class DatabaseFactory:
         创建数据库实例
 
         Args:
-            db_type: 数据库类型 ('excel', 'opengauss', 'mock')
+            db_type: 数据库类型 ('excel', 'opengauss', 'sqlite')
             **kwargs: 数据库连接参数
 
         Returns:
@@ -778,6 +1742,8 @@ class DatabaseFactory:
             return ExcelDatabase(**kwargs)
         elif db_type == 'opengauss':
             return OpenGaussDatabase(**kwargs)
+        elif db_type == 'sqlite':
+            return SQLiteDatabase(**kwargs)
         else:
             raise ValueError(f"不支持的数据库类型: {db_type}")
 
@@ -816,7 +1782,13 @@ if __name__ == '__main__':
     # vocab = db.get_vocabulary(level=1)
     # db.close()
 
-    # 方式3: 从配置文件读取
+    # 方式3: 使用本地 SQLite 数据库（无需 openGauss 服务器）
+    # db = DatabaseFactory.create_database('sqlite', db_path='server/vocabulary.db')
+    # db.connect()
+    # vocab = db.get_vocabulary()
+    # db.close()
+
+    # 方式4: 从配置文件读取
     # db = DatabaseFactory.from_config_file('config.json')
     # db.connect()
     # vocab = db.get_vocabulary()
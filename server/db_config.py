@@ -2,7 +2,16 @@
 """
 数据库配置模块 - 硬编码数据库连接信息
 不再依赖 config.json 文件
+
+可通过环境变量切换到本地 SQLite 数据库（用于离线使用、基准测试和压测）：
+    VOCABSLAYER_DB_TYPE=sqlite
+    VOCABSLAYER_SQLITE_PATH=/path/to/vocabulary.db   （可选，默认 server/vocabulary.db）
+
+或切换到离线 Excel 模式：
+    VOCABSLAYER_DB_TYPE=excel
+    VOCABSLAYER_EXCEL_FORMAT=parquet   （可选：auto/parquet/feather/xlsx，默认 auto）
 """
+import os
 
 # 数据库连接配置
 DATABASE_CONFIG = {
@@ -18,4 +27,19 @@ DATABASE_CONFIG = {
 
 def get_database_config():
     """获取数据库配置"""
+    if os.getenv('VOCABSLAYER_DB_TYPE', '').lower() == 'sqlite':
+        sqlite_config = {}
+        if os.getenv('VOCABSLAYER_SQLITE_PATH'):
+            sqlite_config['db_path'] = os.getenv('VOCABSLAYER_SQLITE_PATH')
+        return {
+            "database_type": "sqlite",
+            "database_config": sqlite_config
+        }
+    if os.getenv('VOCABSLAYER_DB_TYPE', '').lower() == 'excel':
+        return {
+            "database_type": "excel",
+            "database_config": {
+                "storage_format": os.getenv('VOCABSLAYER_EXCEL_FORMAT', 'auto')
+            }
+        }
     return DATABASE_CONFIG
@@ -61,6 +61,10 @@ CREATE TABLE IF NOT EXISTS user_review_list (
     weight DECIMAL(10, 2) DEFAULT 10.0,  -- 复习权重，越高越需要复习
     added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_reviewed TIMESTAMP,
+    next_review_time TIMESTAMP,  -- 下次复习时间（为空表示尚未调度）
+    interval_days DECIMAL(10, 4) DEFAULT 0,  -- 当前复习间隔（天）
+    ease_factor DECIMAL(6, 4) DEFAULT 2.5,  -- SM-2 难度系数
+    repetitions INTEGER DEFAULT 0,  -- 连续答对次数
     UNIQUE(user_id, vocab_id)
 );
 
@@ -68,6 +72,8 @@ CREATE TABLE IF NOT EXISTS user_review_list (
 CREATE INDEX idx_review_list_user ON user_review_list(user_id);
 -- 为权重创建索引，方便按权重排序
 CREATE INDEX idx_review_list_weight ON user_review_list(weight DESC);
+-- 按到期时间取单词
+CREATE INDEX idx_review_list_due ON user_review_list(user_id, next_review_time);
 
 -- ========================================
 -- 5. 创建用户收藏本表
@@ -116,6 +122,10 @@ CREATE TABLE IF NOT EXISTS user_config (
     user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE UNIQUE,
     primary_color VARCHAR(20),
     api_key VARCHAR(255),
+    api_endpoint VARCHAR(255) DEFAULT 'https://api.deepseek.com',
+    api_model VARCHAR(50) DEFAULT 'deepseek-chat',
+    deepseek_chat_history TEXT DEFAULT '[]',  -- AI 聊天记录（JSON）
+    total_score DECIMAL(12, 2) DEFAULT 0,  -- 累计积分
     theme VARCHAR(20) DEFAULT 'light',  -- light/dark
     main_language VARCHAR(20) DEFAULT 'Chinese',
     study_language VARCHAR(20) DEFAULT 'English',
@@ -140,6 +150,70 @@ CREATE TABLE IF NOT EXISTS answer_history (
 -- 为用户ID和时间创建索引
 CREATE INDEX idx_answer_history_user_time ON answer_history(user_id, answered_at DESC);
 
+-- ========================================
+-- 9. 排行榜（每个用户一行，由客户端增量维护，见 server/leaderboard.py）
+-- ========================================
+CREATE TABLE IF NOT EXISTS leaderboards (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    username VARCHAR(50) NOT NULL,
+    score DECIMAL(12, 2) NOT NULL DEFAULT 0,  -- 总积分（user_config.total_score）
+    accuracy DECIMAL(5, 2) DEFAULT 0,  -- 历史总正确率
+    completed_count INTEGER DEFAULT 0,  -- 历史总答题数
+    correct_count INTEGER DEFAULT 0,  -- 历史总答对数
+    today_date DATE,  -- today_* 字段对应的日期（最近一次答题日期）
+    today_questions INTEGER DEFAULT 0,
+    today_correct INTEGER DEFAULT 0,
+    today_accuracy DECIMAL(5, 2) DEFAULT 0,
+    study_days INTEGER DEFAULT 0,  -- 有答题记录的天数
+    words_learned INTEGER DEFAULT 0,  -- 学过的单词数
+    daily_score BIGINT DEFAULT 0,
+    weekly_score BIGINT DEFAULT 0,
+    monthly_score BIGINT DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_leaderboards_user ON leaderboards(user_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_score ON leaderboards(score DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_total ON leaderboards(completed_count DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_accuracy ON leaderboards(accuracy DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_days ON leaderboards(study_days DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_words ON leaderboards(words_learned DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_today ON leaderboards(today_date, today_questions DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_today_acc ON leaderboards(today_date, today_accuracy DESC, user_id DESC);
+
+-- ========================================
+-- 10. AI 助手聊天记录（每条消息一行，只追加）
+-- ========================================
+CREATE TABLE IF NOT EXISTS chat_messages (
+    message_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,  -- user / assistant
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 按 message_id 倒序分页读取
+CREATE INDEX idx_chat_messages_user ON chat_messages(user_id, message_id DESC);
+
+-- ========================================
+-- 11. 表结构版本（见 schema_migrations.py）
+-- ========================================
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(200),
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 新建的库已包含全部迁移内容，直接记录为最新版本
+INSERT INTO schema_version (version, description) VALUES
+    (1, 'user_config 增加 API 配置、聊天记录和积分字段'),
+    (2, '学习记录/复习本/收藏本/每日统计的组合唯一约束'),
+    (3, '增量维护的排行榜表'),
+    (4, '复习本的间隔重复调度字段'),
+    (5, 'AI 助手聊天记录表')
+ON CONFLICT (version) DO NOTHING;
+
 -- ========================================
 -- 插入示例数据
 -- ========================================
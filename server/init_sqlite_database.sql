@@ -0,0 +1,245 @@
+-- SQLite 本地数据库初始化脚本
+-- 与 init_database.sql / README 中的 openGauss 表结构和索引保持一致
+-- 由 SQLiteDatabase.connect() 自动执行，所有语句均可重复执行
+
+-- ========================================
+-- 1. 用户表
+-- ========================================
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+
+-- ========================================
+-- 2. 词汇表（全局共享）
+-- ========================================
+CREATE TABLE IF NOT EXISTS vocabulary (
+    vocab_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    english VARCHAR(200),
+    chinese VARCHAR(200),
+    japanese VARCHAR(200),
+    level INTEGER CHECK (level >= 1 AND level <= 3),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_vocabulary_level ON vocabulary(level);
+
+-- ========================================
+-- 3. 用户学习记录表
+-- ========================================
+CREATE TABLE IF NOT EXISTS user_learning_records (
+    record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    vocab_id INTEGER NOT NULL REFERENCES vocabulary(vocab_id) ON DELETE CASCADE,
+    star INTEGER DEFAULT 0 CHECK (star >= 0 AND star <= 3),
+    last_reviewed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    review_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, vocab_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_learning_records_user ON user_learning_records(user_id);
+CREATE INDEX IF NOT EXISTS idx_learning_records_vocab ON user_learning_records(vocab_id);
+
+-- ========================================
+-- 4. 用户复习本表
+-- ========================================
+CREATE TABLE IF NOT EXISTS user_review_list (
+    review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    vocab_id INTEGER NOT NULL REFERENCES vocabulary(vocab_id) ON DELETE CASCADE,
+    weight DECIMAL(10, 2) DEFAULT 10.0,
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_reviewed TIMESTAMP,
+    next_review_time TIMESTAMP,
+    interval_days DECIMAL(10, 4) DEFAULT 0,
+    ease_factor DECIMAL(6, 4) DEFAULT 2.5,
+    repetitions INTEGER DEFAULT 0,
+    UNIQUE(user_id, vocab_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_review_list_user ON user_review_list(user_id);
+CREATE INDEX IF NOT EXISTS idx_review_list_weight ON user_review_list(weight DESC);
+CREATE INDEX IF NOT EXISTS idx_review_list_due ON user_review_list(user_id, next_review_time);
+
+-- ========================================
+-- 5. 用户收藏本表
+-- ========================================
+CREATE TABLE IF NOT EXISTS user_bookmarks (
+    bookmark_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    vocab_id INTEGER NOT NULL REFERENCES vocabulary(vocab_id) ON DELETE CASCADE,
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    note TEXT,
+    UNIQUE(user_id, vocab_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bookmarks_user ON user_bookmarks(user_id);
+
+-- ========================================
+-- 6. 用户每日统计表
+-- ========================================
+CREATE TABLE IF NOT EXISTS user_daily_stats (
+    stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    total_questions INTEGER DEFAULT 0,
+    correct_answers INTEGER DEFAULT 0,
+    wrong_answers INTEGER DEFAULT 0,
+    accuracy DECIMAL(5, 2) GENERATED ALWAYS AS (
+        CASE
+            WHEN total_questions > 0 THEN (correct_answers * 100.0 / total_questions)
+            ELSE 0
+        END
+    ) STORED,
+    study_duration INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_stats_user_date ON user_daily_stats(user_id, date DESC);
+
+-- ========================================
+-- 7. 用户配置表
+-- ========================================
+CREATE TABLE IF NOT EXISTS user_config (
+    config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL UNIQUE REFERENCES users(user_id) ON DELETE CASCADE,
+    primary_color VARCHAR(20),
+    api_key VARCHAR(255),
+    api_endpoint VARCHAR(255) DEFAULT 'https://api.deepseek.com',
+    api_model VARCHAR(50) DEFAULT 'deepseek-chat',
+    deepseek_chat_history TEXT DEFAULT '[]',
+    total_score DECIMAL(12, 2) DEFAULT 0,
+    theme VARCHAR(20) DEFAULT 'light',
+    main_language VARCHAR(20) DEFAULT 'Chinese',
+    study_language VARCHAR(20) DEFAULT 'English',
+    difficulty INTEGER DEFAULT 1,
+    target_score INTEGER DEFAULT 10000,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS trigger_update_config_timestamp
+AFTER UPDATE ON user_config
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE user_config SET updated_at = CURRENT_TIMESTAMP WHERE config_id = NEW.config_id;
+END;
+
+-- ========================================
+-- 8. 答题历史表
+-- ========================================
+CREATE TABLE IF NOT EXISTS answer_history (
+    history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    vocab_id INTEGER NOT NULL REFERENCES vocabulary(vocab_id) ON DELETE CASCADE,
+    question_type VARCHAR(20),
+    is_correct BOOLEAN NOT NULL,
+    time_spent INTEGER,
+    answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_answer_history_user_time ON answer_history(user_id, answered_at DESC);
+
+-- ========================================
+-- 9. 自定义题库
+-- ========================================
+CREATE TABLE IF NOT EXISTS user_custom_banks (
+    bank_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
+    bank_name VARCHAR(255) NOT NULL,
+    source_file VARCHAR(500),
+    description TEXT,
+    question_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_custom_banks_user ON user_custom_banks(user_id);
+
+CREATE TABLE IF NOT EXISTS user_custom_questions (
+    question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bank_id INTEGER REFERENCES user_custom_banks(bank_id) ON DELETE CASCADE,
+    question_text TEXT NOT NULL,
+    answer_text TEXT NOT NULL,
+    question_type VARCHAR(50) DEFAULT 'Q&A',
+    difficulty INTEGER DEFAULT 1 CHECK (difficulty >= 1 AND difficulty <= 3),
+    confidence_score DECIMAL(3, 2) DEFAULT 0.90,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_custom_questions_bank ON user_custom_questions(bank_id);
+
+-- ========================================
+-- 10. 排行榜模块
+-- ========================================
+-- 每个用户一行，由写入路径增量维护（见 server/leaderboard.py）
+CREATE TABLE IF NOT EXISTS leaderboards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    username VARCHAR(50) NOT NULL,
+    score DECIMAL(12, 2) NOT NULL DEFAULT 0,  -- 总积分（user_config.total_score）
+    accuracy DECIMAL(5, 2) DEFAULT 0,  -- 历史总正确率
+    completed_count INTEGER DEFAULT 0,  -- 历史总答题数
+    correct_count INTEGER DEFAULT 0,  -- 历史总答对数
+    today_date DATE,  -- today_* 字段对应的日期（最近一次答题日期）
+    today_questions INTEGER DEFAULT 0,
+    today_correct INTEGER DEFAULT 0,
+    today_accuracy DECIMAL(5, 2) DEFAULT 0,
+    study_days INTEGER DEFAULT 0,  -- 有答题记录的天数
+    words_learned INTEGER DEFAULT 0,  -- 学过的单词数
+    daily_score BIGINT DEFAULT 0,
+    weekly_score BIGINT DEFAULT 0,
+    monthly_score BIGINT DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_leaderboards_user ON leaderboards(user_id);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_score ON leaderboards(score DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_total ON leaderboards(completed_count DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_accuracy ON leaderboards(accuracy DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_days ON leaderboards(study_days DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_words ON leaderboards(words_learned DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_today ON leaderboards(today_date, today_questions DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboards_today_acc ON leaderboards(today_date, today_accuracy DESC, user_id DESC);
+
+CREATE TABLE IF NOT EXISTS score_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    bank_id INTEGER REFERENCES user_custom_banks(bank_id),
+    question_count INTEGER NOT NULL,
+    correct_count INTEGER NOT NULL,
+    time_spent INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_score_records_user ON score_records(user_id);
+CREATE INDEX IF NOT EXISTS idx_score_records_created ON score_records(created_at);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    achievement_type VARCHAR(50) NOT NULL,
+    achievement_name VARCHAR(100) NOT NULL,
+    unlocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, achievement_type)
+);
+
+-- ========================================
+-- 11. AI 助手聊天记录（每条消息一行，只追加）
+-- ========================================
+CREATE TABLE IF NOT EXISTS chat_messages (
+    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,  -- user / assistant
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages(user_id, message_id DESC);
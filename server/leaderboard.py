@@ -0,0 +1,349 @@
+"""
+增量维护的排行榜（leaderboards 表）
+
+每个用户一行（创建用户时插入），写入路径顺带更新：
+- update_user_record(s)：首次学习某个单词时 words_learned + 1
+- update_daily_stats：累加总题数/正确数，维护当天题数和正确率、学习天数
+- save_user_config(total_score=...)：同步总积分
+
+累加类的更新（单词数、答题统计）与明细表的写入在同一事务中执行，失败时一起回滚，
+排行榜不会与明细表产生永久偏差；积分和用户名是覆盖写入，失败后下一次写入即可纠正。
+数据已经不一致时可用 rebuild_leaderboard() 从明细表重建。
+
+读取只访问 leaderboards 表：get_leaderboard_top() 按 (指标, user_id) 做 keyset 分页，
+get_leaderboard_around() 返回当前用户上下若干名，代价与用户总数无关（走对应的排序索引）。
+
+SQL 使用 $n 占位符（openGauss 原生格式），SQLite 实现通过 _lb_execute 转换为 ?n。
+"""
+from datetime import date as _date
+
+# 排序键（与 RankingWidget.SORT_OPTIONS 一致）-> leaderboards 列
+SORT_COLUMNS = {
+    'today_questions': 'today_questions',
+    'today_accuracy': 'today_accuracy',
+    'total_questions': 'completed_count',
+    'total_accuracy': 'accuracy',
+    'total_score': 'score',
+    'study_days': 'study_days',
+    'words_learned': 'words_learned',
+}
+
+# 只统计当天有答题的用户
+TODAY_SORT_KEYS = ('today_questions', 'today_accuracy')
+
+SELECT_COLUMNS = """user_id, username, score, completed_count, accuracy, today_date,
+                   today_questions, today_accuracy, study_days, words_learned"""
+
+RECORD_WORD_SQL = """
+    INSERT INTO leaderboards (user_id, username, words_learned)
+    SELECT CAST($1 AS INTEGER), CAST($2 AS VARCHAR(50)), 1
+    WHERE NOT EXISTS (SELECT 1 FROM user_learning_records WHERE user_id = $1 AND vocab_id = $3)
+    ON CONFLICT (user_id) DO UPDATE
+    SET words_learned = leaderboards.words_learned + 1,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# 批量写入学习记录后按新增的单词数累加（update_user_records）
+ADD_WORDS_SQL = """
+    INSERT INTO leaderboards (user_id, username, words_learned)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (user_id) DO UPDATE
+    SET words_learned = leaderboards.words_learned + EXCLUDED.words_learned,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# 必须在 user_daily_stats 写入之前执行（用旧数据判断是否新增学习天数）
+ADD_DAILY_SQL = """
+    INSERT INTO leaderboards (user_id, username, completed_count, correct_count, accuracy,
+                              today_date, today_questions, today_correct, today_accuracy, study_days)
+    VALUES ($1, $2, $4, $5, CASE WHEN $4 > 0 THEN $5 * 100.0 / $4 ELSE 0 END,
+            $3, $4, $5, CASE WHEN $4 > 0 THEN $5 * 100.0 / $4 ELSE 0 END,
+            CASE WHEN $4 > 0 THEN 1 ELSE 0 END)
+    ON CONFLICT (user_id) DO UPDATE
+    SET completed_count = leaderboards.completed_count + EXCLUDED.completed_count,
+        correct_count = leaderboards.correct_count + EXCLUDED.correct_count,
+        accuracy = CASE WHEN leaderboards.completed_count + EXCLUDED.completed_count > 0
+                        THEN (leaderboards.correct_count + EXCLUDED.correct_count) * 100.0
+                             / (leaderboards.completed_count + EXCLUDED.completed_count)
+                        ELSE 0 END,
+        today_questions = CASE
+            WHEN leaderboards.today_date = EXCLUDED.today_date
+                THEN leaderboards.today_questions + EXCLUDED.today_questions
+            WHEN leaderboards.today_date IS NULL OR leaderboards.today_date < EXCLUDED.today_date
+                THEN EXCLUDED.today_questions
+            ELSE leaderboards.today_questions END,
+        today_correct = CASE
+            WHEN leaderboards.today_date = EXCLUDED.today_date
+                THEN leaderboards.today_correct + EXCLUDED.today_correct
+            WHEN leaderboards.today_date IS NULL OR leaderboards.today_date < EXCLUDED.today_date
+                THEN EXCLUDED.today_correct
+            ELSE leaderboards.today_correct END,
+        today_accuracy = CASE
+            WHEN leaderboards.today_date = EXCLUDED.today_date
+                THEN CASE WHEN leaderboards.today_questions + EXCLUDED.today_questions > 0
+                          THEN (leaderboards.today_correct + EXCLUDED.today_correct) * 100.0
+                               / (leaderboards.today_questions + EXCLUDED.today_questions)
+                          ELSE 0 END
+            WHEN leaderboards.today_date IS NULL OR leaderboards.today_date < EXCLUDED.today_date
+                THEN EXCLUDED.today_accuracy
+            ELSE leaderboards.today_accuracy END,
+        today_date = CASE
+            WHEN leaderboards.today_date IS NULL OR leaderboards.today_date < EXCLUDED.today_date
+                THEN EXCLUDED.today_date
+            ELSE leaderboards.today_date END,
+        study_days = leaderboards.study_days + CASE
+            WHEN EXCLUDED.today_questions > 0 AND NOT EXISTS (
+                SELECT 1 FROM user_daily_stats d
+                WHERE d.user_id = EXCLUDED.user_id AND d.date = EXCLUDED.today_date AND d.total_questions > 0
+            ) THEN 1 ELSE 0 END,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+SET_SCORE_SQL = """
+    INSERT INTO leaderboards (user_id, username, score)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (user_id) DO UPDATE
+    SET score = EXCLUDED.score,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+ENSURE_ROW_SQL = """
+    INSERT INTO leaderboards (user_id, username)
+    VALUES ($1, $2)
+    ON CONFLICT (user_id) DO NOTHING
+"""
+
+RENAME_SQL = "UPDATE leaderboards SET username = $1 WHERE user_id = $2"
+
+# 从明细表重建（迁移时回填、数据修复时使用；与 create_leaderboards.sql 中的回填语句一致）
+REBUILD_SQL = """
+    INSERT INTO leaderboards (user_id, username, score, completed_count, correct_count, accuracy,
+                              today_date, today_questions, today_correct, today_accuracy,
+                              study_days, words_learned)
+    SELECT u.user_id, u.username,
+           COALESCE(c.total_score, 0),
+           COALESCE(t.total_questions, 0),
+           COALESCE(t.correct_answers, 0),
+           CASE WHEN t.total_questions > 0 THEN t.correct_answers * 100.0 / t.total_questions ELSE 0 END,
+           t.last_date,
+           COALESCE(d.total_questions, 0),
+           COALESCE(d.correct_answers, 0),
+           CASE WHEN d.total_questions > 0 THEN d.correct_answers * 100.0 / d.total_questions ELSE 0 END,
+           COALESCE(t.study_days, 0),
+           COALESCE(w.words_learned, 0)
+    FROM users u
+    LEFT JOIN (
+        SELECT user_id,
+               SUM(total_questions) AS total_questions,
+               SUM(correct_answers) AS correct_answers,
+               MAX(date) AS last_date,
+               SUM(CASE WHEN total_questions > 0 THEN 1 ELSE 0 END) AS study_days
+        FROM user_daily_stats
+        GROUP BY user_id
+    ) t ON u.user_id = t.user_id
+    LEFT JOIN user_daily_stats d ON d.user_id = u.user_id AND d.date = t.last_date
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS words_learned
+        FROM user_learning_records
+        GROUP BY user_id
+    ) w ON u.user_id = w.user_id
+    LEFT JOIN user_config c ON c.user_id = u.user_id
+"""
+
+
+def _same_day(value, today):
+    return value is not None and str(value)[:10] == today.strftime('%Y-%m-%d')
+
+
+def row_to_entry(row, today, rank=None):
+    """leaderboards 行 -> 排行榜条目（键名与 get_ranking_data 一致）"""
+    is_today = _same_day(row['today_date'], today)
+    return {
+        'rank': rank,
+        'user_id': row['user_id'],
+        'username': row['username'],
+        'today_questions': int(row['today_questions'] or 0) if is_today else 0,
+        'today_accuracy': float(row['today_accuracy'] or 0.0) if is_today else 0.0,
+        'total_questions': int(row['completed_count'] or 0),
+        'total_accuracy': float(row['accuracy'] or 0.0),
+        'words_learned': int(row['words_learned'] or 0),
+        'total_score': float(row['score'] or 0.0),
+        'study_days': int(row['study_days'] or 0),
+    }
+
+
+class LeaderboardMixin:
+    """
+    排行榜读写（OpenGaussDatabase / SQLiteDatabase 共用）
+
+    子类实现：
+        _lb_execute(sql, params)  执行写语句
+        _lb_query(sql, params)    执行查询并返回行（支持 row['列名']）
+        _lb_date(value)           把日期转换为该数据库的参数格式
+        _transaction()            事务上下文管理器
+    """
+
+    # ---- 写入路径（由 update_user_record / update_daily_stats / save_user_config 调用）
+    # 累加类的更新不捕获异常：调用方把它们和明细表写入放在同一事务中
+    def _leaderboard_record_word(self, user_id, username, vocab_id):
+        """首次学习该单词时 words_learned + 1（须在写入学习记录之前、同一事务中调用）"""
+        self._lb_execute(RECORD_WORD_SQL, (user_id, username, vocab_id))
+
+    def _leaderboard_add_words(self, user_id, username, count):
+        """批量写入学习记录后 words_learned + count（同一事务中调用）"""
+        self._lb_execute(ADD_WORDS_SQL, (user_id, username, count))
+
+    def _leaderboard_add_daily(self, user_id, username, date, total, correct):
+        """累加答题统计（须在写入每日统计之前、同一事务中调用）"""
+        self._lb_execute(ADD_DAILY_SQL, (user_id, username, self._lb_date(date), total, correct))
+
+    def _leaderboard_ensure(self, user_id, username):
+        """确保用户有排行榜行（创建用户时调用）"""
+        self._lb_execute(ENSURE_ROW_SQL, (user_id, username))
+
+    def _leaderboard_set_score(self, user_id, username, score):
+        try:
+            self._lb_execute(SET_SCORE_SQL, (user_id, username, score))
+        except Exception as e:
+            print(f"[WARNING] Failed to update leaderboard score: {e}")
+
+    def _leaderboard_rename(self, user_id, new_username):
+        try:
+            self._lb_execute(RENAME_SQL, (new_username, user_id))
+        except Exception as e:
+            print(f"[WARNING] Failed to rename leaderboard entry: {e}")
+
+    def rebuild_leaderboard(self):
+        """从明细表全量重建排行榜（数据修复用，代价为全表聚合）"""
+        try:
+            with self._transaction():
+                self._lb_execute("DELETE FROM leaderboards", ())
+                self._lb_execute(REBUILD_SQL, ())
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to rebuild leaderboard: {e}")
+            return False
+
+    # ---- 查询
+    def _sort_filter(self, sort_key, params):
+        """返回 (排序列, WHERE 条件列表)"""
+        if sort_key not in SORT_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {sort_key}")
+        conditions = []
+        if sort_key in TODAY_SORT_KEYS:
+            params.append(self._lb_date(_date.today()))
+            conditions.append(f"today_date = ${len(params)}")
+        return SORT_COLUMNS[sort_key], conditions
+
+    def get_leaderboard_top(self, sort_key='total_questions', limit=50, after=None, rank_offset=0):
+        """
+        排行榜前 limit 名（keyset 分页）
+
+        Args:
+            sort_key: 排序键，见 SORT_COLUMNS
+            limit: 每页条数
+            after: 上一页最后一条的 'cursor'，为 None 时从第一名开始
+            rank_offset: 上一页最后一条的名次
+
+        Returns:
+            条目列表，每条含 rank 和 cursor（传给下一页的 after）
+        """
+        today = _date.today()
+        try:
+            params = []
+            column, conditions = self._sort_filter(sort_key, params)
+            if after is not None:
+                params.extend(after)
+                conditions.append(f"({column}, user_id) < (${len(params) - 1}, ${len(params)})")
+            params.append(limit)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = self._lb_query(f"""
+                SELECT {SELECT_COLUMNS}
+                FROM leaderboards
+                {where}
+                ORDER BY {column} DESC, user_id DESC
+                LIMIT ${len(params)}
+            """, tuple(params))
+
+            entries = []
+            for i, row in enumerate(rows, rank_offset + 1):
+                entry = row_to_entry(row, today, rank=i)
+                entry['cursor'] = (row[column], row['user_id'])
+                entries.append(entry)
+            return entries
+        except Exception as e:
+            print(f"[ERROR] Failed to get leaderboard: {e}")
+            return []
+
+    def get_leaderboard_around(self, username, sort_key='total_questions', radius=5):
+        """
+        当前用户及其上下各 radius 名
+
+        Returns:
+            按名次排序的条目列表（含当前用户），用户不存在时返回空列表
+        """
+        today = _date.today()
+        try:
+            user_id = self._get_user_id(username)
+            if not user_id:
+                return []
+            me_rows = self._lb_query(f"SELECT {SELECT_COLUMNS} FROM leaderboards WHERE user_id = $1", (user_id,))
+            if not me_rows:
+                # 还没有任何学习记录的用户
+                self._lb_execute(ENSURE_ROW_SQL, (user_id, str(username)))
+                me_rows = self._lb_query(f"SELECT {SELECT_COLUMNS} FROM leaderboards WHERE user_id = $1", (user_id,))
+            me = me_rows[0]
+
+            params = []
+            column, conditions = self._sort_filter(sort_key, params)
+            if sort_key in TODAY_SORT_KEYS and not _same_day(me['today_date'], today):
+                my_value = 0
+            else:
+                my_value = me[column]
+            params.extend([my_value, user_id])
+            a, b = len(params) - 1, len(params)
+            base = ' AND '.join(conditions + [''])
+
+            higher = self._lb_query(f"""
+                SELECT COUNT(*) AS total FROM leaderboards
+                WHERE {base} ({column}, user_id) > (${a}, ${b})
+            """, tuple(params))
+            my_rank = int(higher[0]['total']) + 1
+
+            above = self._lb_query(f"""
+                SELECT {SELECT_COLUMNS} FROM leaderboards
+                WHERE {base} ({column}, user_id) > (${a}, ${b})
+                ORDER BY {column} ASC, user_id ASC
+                LIMIT ${b + 1}
+            """, tuple(params) + (radius,))
+            below = self._lb_query(f"""
+                SELECT {SELECT_COLUMNS} FROM leaderboards
+                WHERE {base} ({column}, user_id) < (${a}, ${b})
+                ORDER BY {column} DESC, user_id DESC
+                LIMIT ${b + 1}
+            """, tuple(params) + (radius,))
+
+            entries = [row_to_entry(row, today, rank=my_rank - i) for i, row in enumerate(above, 1)]
+            entries.reverse()
+            entries.append(row_to_entry(me, today, rank=my_rank))
+            entries.extend(row_to_entry(row, today, rank=my_rank + i) for i, row in enumerate(below, 1))
+            return entries
+        except Exception as e:
+            print(f"[ERROR] Failed to get leaderboard around {username}: {e}")
+            return []
+
+    def get_ranking_data(self):
+        """获取所有用户的排行榜数据（读取 leaderboards 表，不再实时聚合明细；没有排行榜行的用户记为 0）"""
+        today = _date.today()
+        try:
+            rows = self._lb_query("""
+                SELECT u.user_id, u.username, lb.score, lb.completed_count, lb.accuracy, lb.today_date,
+                       lb.today_questions, lb.today_accuracy, lb.study_days, lb.words_learned
+                FROM users u
+                LEFT JOIN leaderboards lb ON lb.user_id = u.user_id
+                ORDER BY u.username
+            """, ())
+            return [row_to_entry(row, today) for row in rows]
+        except Exception as e:
+            print(f"[ERROR] Failed to get ranking data: {e}")
+            return []
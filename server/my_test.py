@@ -1,24 +1,38 @@
-import io
 import os
-from random import randint, random, shuffle, sample
 from time import time
 from datetime import datetime
 # TODO 2: 使用datetime库获取当前时间,以便于后续数据记录
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import requests
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPixmap, QPainter, QImage
-from matplotlib.backends.backend_template import FigureCanvas
-from matplotlib.figure import Figure
 from openai import OpenAI
 
-from server.database_manager import DatabaseFactory
+from server.ai_recommender import AiRecommender, resolve_ai_config
+from server.chart_service import chart_service
+from server.database_manager import DatabaseFactory, USER_DATA_VERSION_TABLES
+from server.question_batch import get_generator
+from server import review_scheduler
+from server.review_scheduler import DueQueue, ReviewSchedule
+from server.samplers import FenwickSampler, LevelWordSampler
+from server.user_state import UserStateStore
+from server.word_index import get_word_index
+from server.word_record import WordRecord
+from server.vocabulary_store import vocabulary_store
+from server.write_behind import UI_FLUSH_TIMEOUT, get_write_behind
 
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 设置中文黑体
 plt.rcParams['axes.unicode_minus'] = False  # 正常显示负号
 # 设置工作目录为当前脚本所在目录
 # TODO Warning fixed 1: 使用相对路径,不然在不同机器下运行的情况会有所差别,由于存储路径不同可能出现不能运行的情况.下面将对应数据保存至文件夹"Data"中
+def _to_qimage(png):
+    """PNG 字节 → QImage"""
+    qimg = QImage()
+    qimg.loadFromData(png)
+    return qimg
+
+
 class VocabularyLearningSystem:
     class RecordAC:
         def __init__(self):
@@ -58,41 +72,31 @@ class VocabularyLearningSystem:
             raise RuntimeError("无法连接到数据库")
 
         self.today = 0
+        self._word_sampler = None
+        self._review_sampler = None
+        self._due_queue = None
+        self._data_version = {}  # 表名 -> 上次加载时的版本
+        self._ai_recommender = None
+
+        # 词汇数据所有用户共用：整个进程共享一份只读词汇表，df0/df1 都是它的引用
+        # （df1['id'] 为索引的副本，兼容现有代码中使用 word['id'] 的地方）
+        # 共享表的数据是只读的，不要原地修改或增删列，需要修改时先 .copy()
+        self.df0 = self.df1 = vocabulary_store.get(self.db)
 
-        # 从数据库加载词汇数据（所有用户共用）
-        self.df0 = self.db.get_vocabulary()
-        self.df1 = self.db.get_vocabulary()
-
-        # 统一列名为大写（与原Excel格式兼容）
-        column_mapping = {
-            'chinese': 'Chinese',
-            'english': 'English',
-            'japanese': 'Japanese'
-        }
-        rename_dict_0 = {k: v for k, v in column_mapping.items() if k in self.df0.columns}
-        rename_dict_1 = {k: v for k, v in column_mapping.items() if k in self.df1.columns}
-        self.df0 = self.df0.rename(columns=rename_dict_0)
-        self.df1 = self.df1.rename(columns=rename_dict_1)
-
-        # 设置索引并添加id列（兼容现有代码）
-        if 'vocab_id' in self.df0.columns:
-            self.df0 = self.df0.set_index('vocab_id')
-            self.df1 = self.df1.set_index('vocab_id')
-
-        # 添加id列作为索引的副本（兼容现有代码中使用word['id']的地方）
-        self.df1['id'] = self.df1.index
+        # 答题写入走后台回写队列，不阻塞界面线程
+        self.writer = get_write_behind(self.db) if username else None
+
+        # 星级 / 复习本 / 收藏本保存在以 vocab_id 为键的内存存储中，df2/df3/df4 按需导出
+        self.state = UserStateStore(self.df1)
 
         # 从数据库加载用户数据
         if username:
+            # 先把上次会话未写完的数据落库，再读取（只短暂等待，不冻结界面）
+            if not self.writer.flush(UI_FLUSH_TIMEOUT):
+                print("[WARNING] Pending writes not flushed yet, loaded data may miss the latest answers")
             self._load_user_data_from_db()
         else:
             # 创建空DataFrame
-            self.df2 = pd.DataFrame(columns=['star'])
-            self.df2.index.name = 'vocab_id'
-            self.df3 = pd.DataFrame(columns=['chinese', 'english', 'japanese', 'level', 'weight'])
-            self.df3.index.name = 'vocab_id'
-            self.df4 = pd.DataFrame(columns=['chinese', 'english', 'japanese', 'level'])
-            self.df4.index.name = 'vocab_id'
             self.df5 = pd.DataFrame(columns=['total_questions', 'correct_answers', 'wrong_answers'])
             self.df5.index.name = 'date'
 
@@ -100,76 +104,117 @@ class VocabularyLearningSystem:
         self.studylanguage = None
         self.record = self.RecordAC()
         self.current_level_df = None
+        self.current_level = None
+        self.hard_mode = False
+        self.rng = np.random.default_rng()
 
         # 保存路径供后续使用
         self.root_dir = root_dir
 
-    def _load_user_data_from_db(self):
-        """从数据库加载用户数据到DataFrame格式"""
-        # 学习记录
-        df_records = self.db.get_user_records(self.username)
-        if not df_records.empty and 'vocab_id' in df_records.columns:
-            self.df2 = df_records[['vocab_id', 'star']].set_index('vocab_id')
+    def _load_user_data_from_db(self, tables=USER_DATA_VERSION_TABLES, version=None):
+        """
+        从数据库加载用户数据
+
+        Args:
+            tables: 要重新加载的表（'records' / 'review' / 'bookmarks' / 'daily'），默认全部
+            version: 加载前查询到的版本，默认在这里查询
+        """
+        if version is None:
+            version = self._fetch_data_version()
+        tables = set(tables)
+        # 星级和复习权重可能已变化，抽样器下次使用时按新数据重建
+        if 'records' in tables:
+            self._word_sampler = None
+            self.state.load_records(self.db.get_user_records(self.username))
+        if 'review' in tables:
+            self._review_sampler = None
+            self._due_queue = None
+            self.state.load_review(self.db.get_review_list(self.username))
+        if 'bookmarks' in tables:
+            self.state.load_bookmarks(self.db.get_bookmarks(self.username))
+
+        # 每日统计
+        if 'daily' in tables:
+            df_daily = self.db.get_daily_stats(self.username)
+            if not df_daily.empty:
+                self.df5 = df_daily.rename(columns={
+                    'correct_answers': 'ac',
+                    'wrong_answers': 'wa',
+                    'total_questions': 'total'
+                })
+                if 'date' in self.df5.columns:
+                    self.df5 = self.df5.set_index('date')
+            else:
+                self.df5 = pd.DataFrame(columns=['total', 'ac', 'wa'])
+                self.df5.index.name = 'date'
+
+        if version is not None:
+            self._data_version.update({table: version.get(table) for table in tables})
         else:
-            self.df2 = pd.DataFrame(columns=['star'])
-            self.df2.index.name = 'vocab_id'
-
-        # 复习本
-        df_review = self.db.get_review_list(self.username)
-        if not df_review.empty and 'vocab_id' in df_review.columns:
-            # 将数据库列名映射为代码中使用的大写列名
-            column_mapping = {
-                'chinese': 'Chinese',
-                'english': 'English',
-                'japanese': 'Japanese',
-                'vocab_id': 'vocab_id',
-                'level': 'level',
-                'weight': 'weight'
-            }
-            # 只重命名存在的列
-            rename_dict = {k: v for k, v in column_mapping.items() if k in df_review.columns}
-            self.df3 = df_review.rename(columns=rename_dict)
-            if 'vocab_id' in self.df3.columns:
-                self.df3 = self.df3.set_index('vocab_id')
+            self._data_version = {}
+
+    def _fetch_data_version(self):
+        """查询用户各表的版本，后端不支持或查询失败时返回 None"""
+        try:
+            return self.db.get_user_data_version(self.username)
+        except Exception as e:
+            print(f"[WARNING] Failed to get user data version: {e}")
+            return None
+
+    def refresh(self):
+        """
+        增量刷新：只重新加载版本发生变化的表
+
+        Returns:
+            重新加载的表名列表
+        """
+        if not self.username:
+            return []
+        # 先让队列中的写入落库，版本才能反映最新数据；短时间内未写完则跳过本次刷新，
+        # 否则会用数据库中的旧数据覆盖内存中较新的状态
+        if not self.writer.flush(UI_FLUSH_TIMEOUT):
+            print(f"[DEBUG] Pending writes not flushed yet, refresh skipped for {self.username}")
+            return []
+        version = self._fetch_data_version()
+        if version is None:
+            changed = list(USER_DATA_VERSION_TABLES)
         else:
-            self.df3 = pd.DataFrame(columns=['Chinese', 'English', 'Japanese', 'level', 'weight'])
-            self.df3.index.name = 'vocab_id'
-
-        # 收藏本
-        df_bookmarks = self.db.get_bookmarks(self.username)
-        if not df_bookmarks.empty and 'vocab_id' in df_bookmarks.columns:
-            column_mapping = {
-                'chinese': 'Chinese',
-                'english': 'English',
-                'japanese': 'Japanese',
-                'vocab_id': 'vocab_id',
-                'level': 'level'
-            }
-            rename_dict = {k: v for k, v in column_mapping.items() if k in df_bookmarks.columns}
-            self.df4 = df_bookmarks.rename(columns=rename_dict)
-            if 'vocab_id' in self.df4.columns:
-                self.df4 = self.df4.set_index('vocab_id')
+            changed = [table for table in USER_DATA_VERSION_TABLES if version.get(table) != self._data_version.get(table)]
+        if changed:
+            self._load_user_data_from_db(changed, version)
+        print(f"[DEBUG] Refreshed user data for {self.username}: {changed or 'no changes'}")
+        return changed
+
+    def _add_daily_stats(self, day, total, ac, wa):
+        """把一次会话的答题数累加到内存中的当天统计（与数据库的累加写入一致）"""
+        key = day
+        if len(self.df5) and isinstance(self.df5.index[0], str):
+            key = day.strftime('%Y-%m-%d')
+        if key in self.df5.index:
+            self.df5.loc[key, ['total', 'ac', 'wa']] += [total, ac, wa]
         else:
-            self.df4 = pd.DataFrame(columns=['Chinese', 'English', 'Japanese', 'level'])
-            self.df4.index.name = 'vocab_id'
+            row = pd.DataFrame({'total': [total], 'ac': [ac], 'wa': [wa]}, index=pd.Index([key], name='date'))
+            self.df5 = row if self.df5.empty else pd.concat([self.df5[['total', 'ac', 'wa']], row]).sort_index()
 
-        # 每日统计
-        df_daily = self.db.get_daily_stats(self.username)
-        if not df_daily.empty:
-            self.df5 = df_daily.rename(columns={
-                'correct_answers': 'ac',
-                'wrong_answers': 'wa',
-                'total_questions': 'total'
-            })
-            if 'date' in self.df5.columns:
-                self.df5 = self.df5.set_index('date')
-        else:
-            self.df5 = pd.DataFrame(columns=['total', 'ac', 'wa'])
-            self.df5.index.name = 'date'
+    @property
+    def df2(self):
+        """学习记录（只读导出，修改请通过 self.state）"""
+        return self.state.stars_frame()
+
+    @property
+    def df3(self):
+        """复习本（只读导出，修改请通过 self.state）"""
+        return self.state.review_frame()
+
+    @property
+    def df4(self):
+        """收藏本（只读导出，修改请通过 self.state）"""
+        return self.state.bookmarks_frame()
 
     def choose_level(self,n):
         """设置题目难度等级"""
         self.current_level_df = self.df0[self.df0['level'] == n]
+        self.current_level = n
         return self.current_level_df
 
     def set_languages(self,mainlanguage,studylanguage):
@@ -177,356 +222,259 @@ class VocabularyLearningSystem:
         self.mainlanguage = mainlanguage
         self.studylanguage = studylanguage
 
-    def _choose_word(self):
-        """内部方法：根据记忆曲线选择单词"""
-        n = len(self.df1)
-        if n == 0:
-            raise ValueError("词库为空，无法选择单词")
+    def set_hard_mode(self, enabled):
+        """困难模式：选择题的干扰项取自拼写相近的单词"""
+        self.hard_mode = bool(enabled)
 
-        # 尝试最多10次，避免无限递归
-        max_attempts = 10
-        for attempt in range(max_attempts):
-            id0 = n * random()
-            id00 = int(id0)
-            word = self.df1.iloc[id00]
-            id1 = int(word['id'])
-
-            # 检查该单词是否有学习记录
-            if id1 in self.df2.index:
-                record1 = int(self.df2.loc[id1, 'star'])
-            else:
-                # 如果没有记录，初始化为0星
-                record1 = 0
-                # 为新单词创建记录（添加到df2以便后续查询）
-                self.df2.loc[id1] = {'star': 0}
+    def _get_word_sampler(self):
+        """按等级、以掌握星级加权的单词抽样器（词库或用户数据重新加载后重建）"""
+        if self._word_sampler is None or self._word_sampler.frame is not self.df1:
+            stars = pd.Series(self.state.stars, dtype=float) if self.state.stars else None
+            self._word_sampler = LevelWordSampler(self.df1, stars)
+        return self._word_sampler
 
-            # TODO 3 简化链式比较,使用Python风格的比较方式
-            if id1 >= id0 >= id1 - 1 + record1 / 3:
-                return word
+    def _choose_word(self):
+        """内部方法：根据掌握程度在当前难度等级中选择单词"""
+        return WordRecord.from_frame(self._draw_words(1))[0]
+
+    def _get_review_sampler(self):
+        """复习本的树状数组抽样器（复习本重新加载后重建）"""
+        if self._review_sampler is None:
+            # 防止负数权重
+            weights = [max(w, 0.1) for w in self.state.review.values()]
+            self._review_sampler = FenwickSampler(list(self.state.review.keys()), weights)
+        return self._review_sampler
+
+    def _get_due_queue(self):
+        """复习本的到期队列（复习本重新加载后重建）"""
+        if self._due_queue is None:
+            self._due_queue = DueQueue({idx: self.state.get_schedule(idx) or ReviewSchedule()
+                                        for idx in self.state.review})
+        return self._due_queue
+
+    def _reschedule(self, idx, quality=None, schedule=None):
+        """按答题结果（SM-2 评分）或直接给定的状态更新单词的复习调度"""
+        if schedule is None:
+            schedule = review_scheduler.review(self.state.get_schedule(idx), quality)
+        self.state.set_schedule(idx, schedule)
+        if self._due_queue is not None:
+            self._due_queue.push(idx, schedule.next_review_time)
+        return schedule
+
+    def _set_review_weight(self, idx, weight):
+        """修改复习权重，同步更新抽样器"""
+        self.state.set_review_weight(idx, weight)
+        if self._review_sampler is not None:
+            self._review_sampler.set(idx, max(float(weight), 0.1))
 
-        # 如果10次都没选中，直接返回最后一个
-        return word
     def choose_word(self):
         """加权随机从复习本中选择单词"""
-        n = len(self.df3)
-
+        while self.state.review:
+            # 优先选择已到期的单词，没有到期单词时按权重抽取（weight 越大越需要复习）
+            due = self._get_due_queue().take_due(k=1)
+            idx = due[0] if due else self._get_review_sampler().sample(self.rng)
+            record = self.state.review_record(idx)
+            if record is not None:
+                return record
+            print(f"[WARNING] Review word {idx} is no longer in the vocabulary, skipped")
+            self._drop_review_word(idx)
         # 如果复习本为空，抛出异常
-        if n == 0:
-            raise ValueError("复习本为空，无法选择单词")
+        raise ValueError("复习本为空，无法选择单词")
+
+    def _drop_review_word(self, idx):
+        """从内存中的复习本、到期队列和抽样器中移除单词"""
+        self.state.drop_review(idx)
+        if self._due_queue is not None:
+            self._due_queue.remove(idx)
+        # 抽样器不支持删除，下次使用时重建
+        self._review_sampler = None
+
+    def _draw_words(self, n):
+        """按掌握程度加权，一次抽取 n 个当前难度等级的单词（可重复），返回 df1 的子表"""
+        if len(self.df1) == 0:
+            raise ValueError("词库为空，无法选择单词")
+        positions = self._get_word_sampler().draw(self.rng, n, self.current_level)
+        return self.df1.iloc[positions]
 
-        # 假设用 weight 字段做权重，weight 越大越需要复习
-        weights = []
-        for i in range(n):
-            weight = self.df3.iloc[i]['weight']
-            # 转换 Decimal 为 float，并防止负数权重
-            weights.append(float(max(weight, 0.1)))
-
-        # 归一化权重
-        total = sum(weights)
-        if total == 0:
-            # 如果所有权重都是0，使用均匀分布
-            weights = [1.0 / n] * n
-        else:
-            weights = [w / total for w in weights]
-
-        # 用 random.choices 加权抽取
-        import random
-        idx = random.choices(range(n), weights=weights, k=1)[0]
-        word = self.df3.iloc[idx]
-        return word
-
-    def _generate_options(self, correct_answer, language):
-        """生成选择题选项"""
-        options = [correct_answer]
-        while len(options) < 4:
-            random_word = self.df1.sample(1).iloc[0]
-            candidate = random_word[language]
-            if candidate not in options:
-                options.append(candidate)
-        shuffle(options)
-        return {
-            'A': options[0],
-            'B': options[1],
-            'C': options[2],
-            'D': options[3]
-        }, chr(65 + options.index(correct_answer))
+    def _draw_review_words(self, n):
+        """抽取 n 个复习本单词，返回复习本的子表
+
+        先取已到期的单词（最早到期的在前），不足部分按复习权重不放回地抽取。
+        复习本单词数不少于 n 时不会出现重复；否则每轮覆盖全部单词后再开始下一轮。
+        """
+        if not self.state.review:
+            raise ValueError("复习本为空，无法选择单词")
+        sampler = self._get_review_sampler()
+        keys = self._get_due_queue().take_due(k=n)
+        keys.extend(sampler.sample_distinct(self.rng, n - len(keys), exclude=keys))
+        while len(keys) < n:
+            keys.extend(sampler.sample_distinct(self.rng, n - len(keys)))
+        return self.state.review_words(keys)
+
+    def _build_questions(self, words):
+        """为一批目标单词生成题目（向量化出题）"""
+        return get_generator(self.df1).generate(words, self.mainlanguage, self.studylanguage,
+                                                rng=self.rng, hard=self.hard_mode)
 
     def generate_question(self):
         """生成题目"""
-        word = self._choose_word()
-        question_type = randint(0, 2)
-
-        if question_type == 0:  # 外译中
-            question = f"{word[self.mainlanguage]}的{self.studylanguage}是什么？"
-            options, answer = self._generate_options(word[self.studylanguage], self.studylanguage)
-        elif question_type == 1:  # 中译外
-            question = f"{word[self.studylanguage]}的{self.mainlanguage}是什么？"
-            options, answer = self._generate_options(word[self.mainlanguage], self.mainlanguage)
-        else:  # 判断题
-            random_word = self.df1.sample(1).iloc[0]
-            is_correct = random() > 0.5
-            target_word = word if is_correct else random_word
-            question = f"判断{target_word[self.mainlanguage]}的{self.studylanguage}是否为{word[self.studylanguage]}？"
-            options = {'A': '是', 'C': '否'}
-            answer = 'A' if is_correct else 'C'
-
-        return question, options, answer, word
+        questions, options, answers, words = self._build_questions(self._draw_words(1))
+        return questions[0], options[0], answers[0], words[0]
+
     def generate_review_question(self):
         """生成单个复习题目"""
         word = self.choose_word()
-        question_type = randint(0, 2)
-
-        if question_type == 0:  # 外译中
-            question = f"{word[self.mainlanguage]}的{self.studylanguage}是什么？"
-            options, answer = self._generate_options(word[self.studylanguage], self.studylanguage)
-        elif question_type == 1:  # 中译外
-            question = f"{word[self.studylanguage]}的{self.mainlanguage}是什么？"
-            options, answer = self._generate_options(word[self.mainlanguage], self.mainlanguage)
-        else:  # 判断题
-            random_word = self.df1.sample(1).iloc[0]
-            is_correct = random() > 0.5
-            target_word = word if is_correct else random_word
-            question = f"判断{target_word[self.mainlanguage]}的{self.studylanguage}是否为{word[self.studylanguage]}？"
-            options = {'A': '是', 'C': '否'}
-            answer = 'A' if is_correct else 'C'
-
-        return question, options, answer, word
+        questions, options, answers, words = self._build_questions(self.state.review_words([word.name]))
+        return questions[0], options[0], answers[0], words[0]
 
     def generate_review_questions(self, n):
         """批量生成复习题目"""
-        words = []
-        questions = []
-        options_list = []
-        answers = []
-
-        for i in range(n):
-            word = self.choose_word()
-            words.append(word)
-            question_type = randint(0, 2)
-
-            if question_type == 0:  # 外译中
-                question = f"{word[self.mainlanguage]}的{self.studylanguage}是什么？"
-                options, answer = self._generate_options(word[self.studylanguage], self.studylanguage)
-            elif question_type == 1:  # 中译外
-                question = f"{word[self.studylanguage]}的{self.mainlanguage}是什么？"
-                options, answer = self._generate_options(word[self.mainlanguage], self.mainlanguage)
-            else:  # 判断题
-                random_word = self.df1.sample(1).iloc[0]
-                is_correct = random() > 0.5
-                target_word = word if is_correct else random_word
-                question = f"判断{target_word[self.mainlanguage]}的{self.studylanguage}是否为{word[self.studylanguage]}？"
-                options = {'A': '是', 'C': '否'}
-                answer = 'A' if is_correct else 'C'
-
-            questions.append(question)
-            options_list.append(options)
-            answers.append(answer)
-
-        return questions, options_list, answers, words
+        return self._build_questions(self._draw_review_words(n))
 
     def generate_questions(self,n):
         """生成题目"""
-        word0=[]
-        question=[]
-        options=[]
-        answer=[]
-        for i in range(n):
-            word0.append ( self._choose_word())
-            question_type = randint(0, 2)
-            word = word0[i]
-            if question_type == 0:  # 外译中
-                question.append(f"{word[self.mainlanguage]}的{self.studylanguage}是什么？")
-                options0, answer0 = self._generate_options(word[self.studylanguage], self.studylanguage)
-                options.append(options0)
-                answer.append(answer0)
-            elif question_type == 1:  # 中译外
-                question.append(  f"{word[self.studylanguage]}的{self.mainlanguage}是什么？")
-                options0, answer0 = self._generate_options(word[self.mainlanguage], self.mainlanguage)
-                options.append(options0)
-                answer.append(answer0)
-            else:  # 判断题
-                random_word = self.df1.sample(1).iloc[0]
-                is_correct = random() > 0.5
-                target_word = word if is_correct else random_word
-                question.append( f"判断{target_word[self.mainlanguage]}的{self.studylanguage}是否为{word[self.studylanguage]}？")
-                options.append ( {'A': '是', 'C': '否'})
-                answer .append( 'A' if is_correct else 'C')
-
-        return question, options, answer, word0
-
-    def choose_ai_words(self):
-        """从复习本随机选择一个单词，让AI推荐相关单词"""
+        return self._build_questions(self._draw_words(n))
+
+    def _get_ai_recommender(self):
+        """按配置创建 AI 推荐器（首次使用时读取配置）"""
+        if self._ai_recommender is None:
+            user_config = None
+            if self.username:
+                try:
+                    user_config = self.db.get_user_config(self.username)
+                except Exception as e:
+                    print(f"[WARNING] Failed to load user config for AI recommend: {e}")
+            config = resolve_ai_config(os.path.join(self.root_dir, 'config.json'), user_config)
+            self._ai_recommender = AiRecommender(config['endpoint'], config['api_key'], config['model'])
+        return self._ai_recommender
+
+    def _match_study_words(self, words, fuzzy=True):
+        """在词汇表中查找学习语言单词（规范化后精确匹配，fuzzy 时允许复数、时态等屈折变化），返回 WordRecord 列表"""
+        index = get_word_index(self.df1, self.studylanguage)
+        ids = [index.match(word, fuzzy=fuzzy) for word in words]
+        ids = [vocab_id for vocab_id in ids if vocab_id is not None]
+        return WordRecord.from_frame(self.df1.loc[ids]) if ids else []
+
+    def choose_ai_words(self, n=4):
+        """从复习本随机选择 n 个单词，让AI推荐相关单词（并发请求，结果缓存）"""
         # 检查复习本是否为空
         if self.df3.empty:
             return []
-        for i in range(4):
-            # 随机选择一个复习本中的单词
-            sample_word = self.df3.sample(1).iloc[0]
-            main_word = sample_word[self.mainlanguage]
-            study_word = sample_word[self.studylanguage]
-            self.valid_word=[]
-            # 准备提示词
-            prompt = (f"请推荐4个与'{main_word}({study_word})'相关的{self.studylanguage}单词，"
-                      "按推荐强度排序，只返回单词列表，不要任何解释或额外信息，每行一个")
-
-            try:
-                # 使用大语言模型API获取推荐词
-                response = requests.post(
-                    "https://api.deepseek.com",
-                    headers={"Authorization": f"sk-48e6fefd3f3d46c79819e1edab6747a7"},
-                    json={
-                        "model": "deepseek-reasoner",
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.7,
-                        "max_tokens": 100
-                    }
-                )
-
-                # 检查响应状态
-                if response.status_code != 200:
-                    return []
-
-                # 解析推荐词
-                content = response.json()["choices"][0]["message"]["content"]
-                recommended_words = [
-                    word.strip()
-                    for word in content.split("\n")
-                    if word.strip()
-                ]
-
-                # 找出在词汇数据库(df1)中存在的单词
-                valid_words = []
-                for word in recommended_words:
-                    match = self.df1[self.df1[self.studylanguage].str.lower() == word.lower()]
-                    if not match.empty:
-                        valid_words.append(match.iloc[0])
-                self.valid_word += valid_words
-            except Exception as e:
-                print(f"AI推荐出错: {e}")
+        picks = self.df3.sample(min(n, len(self.df3)), random_state=self.rng)
+        pairs = list(zip(picks[self.mainlanguage].tolist(), picks[self.studylanguage].tolist()))
+        recommended = self._get_ai_recommender().recommend(pairs, self.studylanguage)
+
+        # 找出在词汇数据库(df1)中存在的单词（去重）
+        self.valid_word = []
+        seen = set()
+        for word in self._match_study_words([w for words in recommended.values() for w in words]):
+            if word.name not in seen:
+                seen.add(word.name)
+                self.valid_word.append(word)
         return self.valid_word
+
     def generate_ai_questions(self):
         """生成题目"""
         word0=self.choose_ai_words()
-        question=[]
-        options=[]
-        answer=[]
-        for word in word0:
-            question_type = randint(0, 2)
-            if question_type == 0:  # 外译中
-                question.append(f"{word[self.mainlanguage]}的{self.studylanguage}是什么？")
-                options0, answer0 = self._generate_options(word[self.studylanguage], self.studylanguage)
-                options.append(options0)
-                answer.append(answer0)
-            elif question_type == 1:  # 中译外
-                question.append(  f"{word[self.studylanguage]}的{self.mainlanguage}是什么？")
-                options0, answer0 = self._generate_options(word[self.mainlanguage], self.mainlanguage)
-                options.append(options0)
-                answer.append(answer0)
-            else:  # 判断题
-                random_word = self.df1.sample(1).iloc[0]
-                is_correct = random() > 0.5
-                target_word = word if is_correct else random_word
-                question.append( f"判断{target_word[self.mainlanguage]}的{self.studylanguage}是否为{word[self.studylanguage]}？")
-                options.append ( {'A': '是', 'C': '否'})
-                answer .append( 'A' if is_correct else 'C')
-
-        return question, options, answer, word0
+        if not word0:
+            return [], [], [], []
+        return self._build_questions(self.df1.loc[[word.name for word in word0]])
     def handle_correct_review_answer(self, word):
         """处理复习答案正确（不立即保存，等待批量保存）"""
         idx = word.name
-        if idx in self.df3.index:
-            # 转换 Decimal 为 float 进行计算
-            current_weight = float(self.df3.loc[idx, 'weight'])
-            self.df3.loc[idx, 'weight'] = current_weight * 0.8
+        if self.state.in_review(idx):
+            self._set_review_weight(idx, self.state.review_weight(idx) * 0.8)
+            self._reschedule(idx, review_scheduler.QUALITY_CORRECT)
             # 移除立即保存，改为批量保存
 
     def handel_wrong_review_answer(self, word):
         """处理复习答案错误（不立即保存，等待批量保存）"""
         idx = word.name
-        if idx in self.df3.index:
-            # 转换 Decimal 为 float 进行计算
-            current_weight = float(self.df3.loc[idx, 'weight'])
-            self.df3.loc[idx, 'weight'] = current_weight * 1.2
+        if self.state.in_review(idx):
+            self._set_review_weight(idx, self.state.review_weight(idx) * 1.2)
+            self._reschedule(idx, review_scheduler.QUALITY_WRONG)
             # 移除立即保存，改为批量保存
     def handle_correct_answer(self, word):
         """处理正确答案"""
         idx = word.name
 
-        # 确保该单词在df2中有记录
-        if idx not in self.df2.index:
-            self.df2.loc[idx] = {'star': 0}
-
-        current_star = self.df2.loc[idx, 'star']
+        current_star = self.state.get_star(idx)
         if current_star < 3:
-            self.df2.loc[idx, 'star'] += 1
+            self.state.set_star(idx, current_star + 1)
+            if self._word_sampler is not None:
+                self._word_sampler.update_star(idx, current_star + 1)
 
-        # 使用数据库保存
+        # 放入回写队列，由后台线程批量保存
         if self.username:
-            self.db.update_user_record(self.username, int(idx), int(self.df2.loc[idx, 'star']))
+            self.writer.update_user_record(self.username, int(idx), self.state.get_star(idx))
 
     def handle_wrong_answer(self, word):
         """处理错误答案"""
         idx = word.name
 
-        # 确保该单词在df2中有记录
-        if idx not in self.df2.index:
-            self.df2.loc[idx] = {'star': 0}
+        # 确保该单词有学习记录
+        self.state.ensure_star(idx)
 
         # 添加到复习本
-        if self.df3.empty:
-            # 从df1获取单词信息
-            new_row = self.df1.loc[[idx]].copy()
-            new_row['weight'] = 10.0
-            self.df3 = new_row
-        elif idx not in self.df3.index:
-            # 只有不在复习本中才添加
-            new_row = self.df1.loc[[idx]].copy()
-            new_row['weight'] = 10.0
-            self.df3 = pd.concat([self.df3, new_row])
+        if not self.state.in_review(idx):
+            self.state.set_review_weight(idx, 10.0)
+            if self._review_sampler is not None:
+                self._review_sampler.add(idx, 10.0)
+            # 新加入复习本的单词立即到期
+            schedule = self._reschedule(idx, schedule=ReviewSchedule.new())
             # 添加到数据库
             if self.username:
-                self.db.add_to_review_list(self.username, int(idx), 10.0)
+                self.writer.add_to_review_list(self.username, int(idx), 10.0)
         else:
             # 已在复习本中，增加权重
-            current_weight = float(self.df3.loc[idx, 'weight'])
-            new_weight = min(current_weight * 1.2, 50)
-            self.df3.loc[idx, 'weight'] = new_weight
+            new_weight = min(self.state.review_weight(idx) * 1.2, 50)
+            self._set_review_weight(idx, new_weight)
+            schedule = self._reschedule(idx, review_scheduler.QUALITY_WRONG)
             # 更新数据库权重
             if self.username:
-                self.db.update_review_weight(self.username, int(idx), float(new_weight))
+                self.writer.update_review_weight(self.username, int(idx), float(new_weight))
+
+        if self.username:
+            self.writer.update_review_schedule(self.username, int(idx), schedule.to_dict())
 
         # 更新用户记录
         if self.username:
-            self.db.update_user_record(self.username, int(idx), int(self.df2.loc[idx, 'star']))
+            self.writer.update_user_record(self.username, int(idx), self.state.get_star(idx))
 
     def _save_progress(self):
-        """保存学习进度到数据库"""
+        """保存学习进度到数据库（只写本次会话修改过的行，按表批量写入）"""
         if not self.username:
             return
 
-        # 保存学习记录（df2）
-        for idx in self.df2.index:
-            star = int(self.df2.loc[idx, 'star'])
-            self.db.update_user_record(self.username, int(idx), star)
+        # 学习记录（答题时已入队的会在回写队列中合并）
+        stars = {int(idx): self.state.get_star(idx) for idx in self.state.dirty('stars')}
+        self.writer.update_user_records(self.username, stars)
+        self.state.mark_clean('stars')
 
-        # 保存复习本（df3）- 更新权重
-        for idx in self.df3.index:
-            if 'weight' in self.df3.columns:
-                weight = float(self.df3.loc[idx, 'weight'])
-                self.db.update_review_weight(self.username, int(idx), weight)
+        # 复习本 - 修改过的权重
+        weights = {int(idx): self.state.review_weight(idx) for idx in self.state.dirty('review')
+                   if self.state.in_review(idx)}
+        self.writer.update_review_weights(self.username, weights)
+        self.state.mark_clean('review')
+
+        # 复习调度
+        schedules = {int(idx): self.state.get_schedule(idx).to_dict() for idx in self.state.dirty('schedule')
+                     if self.state.get_schedule(idx) is not None}
+        self.writer.update_review_schedules(self.username, schedules)
+        self.state.mark_clean('schedule')
+
+        print(f"[DEBUG] Saving progress: {len(stars)} records, {len(weights)} weights, {len(schedules)} schedules")
+        # 会话结束，请求写入（只短暂等待，未完成的由后台线程继续写入）
+        self.writer.flush(UI_FLUSH_TIMEOUT)
 
     def add_to_book(self, word):
         """添加到收藏本"""
-        if word.name not in self.df4.index:
-            new_row = self.df1.loc[[word.name]]
-            if self.df4.empty:
-                self.df4 = new_row
-            else:
-                self.df4 = pd.concat([self.df4, new_row])
+        if not self.state.is_bookmarked(word.name):
+            self.state.add_bookmark(word.name)
 
             # 保存到数据库
             if self.username:
-                self.db.add_bookmark(self.username, int(word.name))
+                self.writer.add_bookmark(self.username, int(word.name))
 
     def review(self):
         """复习功能"""
@@ -560,9 +508,16 @@ class VocabularyLearningSystem:
                                       self.record.ac,
                                       self.record.wa)
             print(f"[DEBUG] Database update completed")
-            # 重新加载到DataFrame
-            self._load_user_data_from_db()
-            print(f"[DEBUG] After reload, df5 shape: {self.df5.shape}, empty: {self.df5.empty}")
+            # 会话结束：先让队列中的答题记录落库（只短暂等待）
+            flushed = self.writer.flush(UI_FLUSH_TIMEOUT)
+            # 只更新内存中当天这一行，不再重新加载全部数据
+            self._add_daily_stats(today, total_q, self.record.ac, self.record.wa)
+            if flushed:
+                # 本会话的修改都已在内存中，记录写入后的版本，下次 refresh() 不必为它们重新加载
+                version = self._fetch_data_version()
+                if version is not None:
+                    self._data_version = version
+            print(f"[DEBUG] After update, df5 shape: {self.df5.shape}, empty: {self.df5.empty}")
 
     def show_data(self):
         s=[]
@@ -578,106 +533,42 @@ class VocabularyLearningSystem:
                 s.append([f"{self.df4.iloc[i]['Chinese']}" ,f"{self.df4.iloc[i]['English']}",f"{self.df4.iloc[i]['Japanese']}", f"level {self.df4.iloc[i]['level']}"])
             return s
 
-    def show_day_stats(self):
-        """显示每日统计折线图并返回 QImage 对象"""
-        # 初始化 dates 和 total 属性（即使没有数据也要初始化）
+    def day_stats_series(self):
+        """每日统计图的输入数据（同时更新 self.dates / self.total）"""
         self.dates = []
         self.total = []
-
-        # 创建图表
-        fig = Figure(figsize=(10, 5))
-        ax = fig.add_subplot(111)
-
         if self.df5.empty:
             print("暂无每日统计数据！")
-            # 创建空图表，显示提示信息
-            ax.text(0.5, 0.5, '暂无数据\n开始练习后即可看到统计图表',
-                   horizontalalignment='center',
-                   verticalalignment='center',
-                   transform=ax.transAxes,
-                   fontsize=16,
-                   color='gray')
-            ax.set_xlabel('日期')
-            ax.set_ylabel('题目数')
-            ax.set_title('每日答题统计')
-            ax.grid(True, alpha=0.3)
-        else:
-            # 复制并排序数据
-            df = self.df5.copy().sort_index()
-            dates = df.index.tolist()
-            self.dates = dates
-            ac = df['ac'].tolist()
-            wa = df['wa'].tolist()
-            self.total = [a + w for a, w in zip(ac, wa)]
-
-            # 绘制三条折线
-            ax.plot(dates, ac, marker='o', label='正确(ac)')
-            ax.plot(dates, wa, marker='o', label='错误(wa)')
-            ax.plot(dates, self.total, marker='o', label='总答题数')
-
-            # 设置图表属性
-            ax.set_xlabel('日期')
-            ax.set_ylabel('题目数')
-            ax.set_title('每日答题统计')
-            ax.legend()
-            ax.grid(True)
-
-        fig.tight_layout()
-
-        # 转换为 QImage
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
-
-        qimg = QImage()
-        qimg.loadFromData(buf.read())
-
-        buf.close()
+            return {'dates': [], 'ac': [], 'wa': []}
+        df = self.df5.sort_index()
+        self.dates = df.index.tolist()
+        ac = [int(v) for v in df['ac'].tolist()]
+        wa = [int(v) for v in df['wa'].tolist()]
+        self.total = [a + w for a, w in zip(ac, wa)]
+        return {'dates': [str(d)[:10] for d in self.dates], 'ac': ac, 'wa': wa}
+
+    def answer_times_series(self):
+        """本次答题用时图的输入数据"""
+        return {'times': list(self.record.time), 'correct': list(self.record.is_correct)}
+
+    def submit_day_stats(self):
+        """后台渲染每日统计图，返回结果为 PNG 字节的 Future"""
+        return chart_service.submit('day_stats', self.day_stats_series())
+
+    def submit_plot(self):
+        """写入当天统计后后台渲染答题用时图，返回结果为 PNG 字节的 Future"""
+        self.update_day_stats()
+        return chart_service.submit('answer_times', self.answer_times_series())
 
-        return qimg  # 返回 QImage 对象用于显示
+    def show_day_stats(self):
+        """显示每日统计折线图并返回 QImage 对象（同步；界面中请使用 submit_day_stats）"""
+        return _to_qimage(chart_service.render('day_stats', self.day_stats_series()))
 
     def plot(self):
+        """生成答题用时图并返回 QImage 对象（同步；界面中请使用 submit_plot）"""
         self.update_day_stats()
-        """生成图表并返回 Figure 对象"""
-        x = list(range(1, len(self.record.time) + 1))
-        y = self.record.time
-        is_correct = self.record.is_correct
-
-        # 创建图表
-        fig = Figure(figsize=(8, 4))
-        ax = fig.add_subplot(111)
-
-        # 正确题目
-        x_ac = [i + 1 for i, c in enumerate(is_correct) if c]
-        y_ac = [y[i] for i, c in enumerate(is_correct) if c]
-        ax.scatter(x_ac, y_ac, color='green', label='正确', zorder=3)
-
-        # 错误题目
-        x_wa = [i + 1 for i, c in enumerate(is_correct) if not c]
-        y_wa = [y[i] for i, c in enumerate(is_correct) if not c]
-        ax.scatter(x_wa, y_wa, color='red', label='错误', zorder=3)
-
-        # 折线
-        ax.plot(x, y, color='blue', alpha=0.5, zorder=2)
-
-        # 设置图表属性
-        ax.set_xlabel('题目序号')
-        ax.set_ylabel('用时（秒）')
-        ax.set_title('每题用时折线图')
-        ax.legend()
-        ax.grid(True)
-        fig.tight_layout()
-
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
-
-        qimg = QImage()
-        qimg.loadFromData(buf.read())
-
-        buf.close()
+        return _to_qimage(chart_service.render('answer_times', self.answer_times_series()))
 
-        return qimg  # 返回图表对象，而非直接显示
     def run(self):
         """主运行循环"""
         print("欢迎使用智能单词学习系统！")
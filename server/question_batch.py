@@ -0,0 +1,253 @@
+"""
+向量化的批量出题
+
+原来每道题都要 iloc 取行、多次 df1.sample(1) 凑选项，再拼接字符串，
+单题耗时在毫秒级。这里把一批题目的题型、判断题真假、干扰项和选项顺序
+都用 NumPy 数组一次性生成，最后只在构造题目文本时逐题循环。
+
+干扰项来自每个语言列预先构建的 DistractorIndex：优先取与正确答案同等级、
+同文字类型、长度相近的单词，困难模式下进一步取拼写相邻的单词。
+
+QuestionBatchGenerator 按词汇表构建（各语言一个 DistractorIndex），
+get_generator(frame) 返回与共享词汇表对应的实例，词汇表重新加载后自动重建。
+"""
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from server.word_record import WordRecord
+
+LANGUAGES = ('Chinese', 'English', 'Japanese')
+
+# 题型
+TYPE_MAIN_TO_STUDY = 0  # 外译中
+TYPE_STUDY_TO_MAIN = 1  # 中译外
+TYPE_JUDGE = 2          # 判断题
+
+OPTION_KEYS = np.array(['A', 'B', 'C', 'D'])
+JUDGE_OPTIONS = {'A': '是', 'C': '否'}
+
+
+def star_weights(stars):
+    """掌握程度 → 抽取权重：0 星为 4，3 星为 1（星级越低越常出现）"""
+    stars = np.clip(np.nan_to_num(np.asarray(stars, dtype=np.float64)), 0, 3)
+    return 4.0 - stars
+
+
+# 干扰项按 (等级, 文字类型, 长度段) 分桶，长度段的分界
+LENGTH_BINS = [3, 5, 7, 10]
+# 困难模式：在同一桶内按字典序取正确答案前后各 NEAR_WINDOW 个取值作为候选
+NEAR_WINDOW = 6
+
+_SCRIPT_PATTERNS = (
+    ('kana', r'[\u3040-\u30ff]'),
+    ('han', r'[\u4e00-\u9fff]'),
+    ('latin', r'[A-Za-z]'),
+)
+
+
+def _script_of(values):
+    """每个取值的文字类型：含假名 / 含汉字 / 拉丁字母 / 其他"""
+    text = pd.Series(values, dtype=object).astype(str)
+    script = np.full(len(text), 'other', dtype=object)
+    for name, pattern in reversed(_SCRIPT_PATTERNS):
+        script[text.str.contains(pattern, regex=True).to_numpy()] = name
+    return script
+
+
+def _sample_distinct_offsets(rng, sizes, k):
+    """
+    每行在 [0, sizes[i]) 中不放回地抽取 k 个整数（Floyd 算法，按列向量化）
+
+    Args:
+        sizes: 每行的取值范围大小（须 >= k）
+    """
+    n = len(sizes)
+    out = np.empty((n, k), dtype=np.int64)
+    for col in range(k):
+        upper = sizes - k + col
+        pick = (rng.random(n) * (upper + 1)).astype(np.int64)
+        duplicate = (out[:, :col] == pick[:, None]).any(axis=1) if col else np.zeros(n, dtype=bool)
+        out[:, col] = np.where(duplicate, upper, pick)
+    return out
+
+
+class DistractorIndex:
+    """
+    某个语言列的干扰项索引
+
+    去重后的取值按 (等级, 文字类型, 长度段, 取值) 排序，每个桶、每个 (等级, 文字类型)
+    以及每个等级在排序数组中都是连续区间。为正确答案抽干扰项时，选择包含它且
+    至少有 k+1 个取值的最小区间，在区间内跳过正确答案、不放回地抽取。
+    """
+
+    def __init__(self, values, levels):
+        frame = pd.DataFrame({'value': values, 'level': levels})
+        frame = frame[frame['value'].notna()]
+        frame = frame[frame['value'].astype(str).str.len() > 0]
+        # 同一取值出现在多个等级时，归入第一次出现的等级
+        frame = frame.drop_duplicates('value')
+        text = frame['value'].astype(str)
+        frame['script'] = _script_of(frame['value'].to_numpy())
+        frame['length'] = np.digitize(text.str.len().to_numpy(), LENGTH_BINS)
+        frame['sort_key'] = text.str.lower()
+        frame = frame.sort_values(['level', 'script', 'length', 'sort_key'], kind='mergesort')
+
+        self.values = frame['value'].to_numpy(dtype=object)
+        self._codes = pd.Index(self.values)
+        m = len(self.values)
+        # 每个取值所在的三级区间 [start, end)：桶 / (等级, 文字类型) / 等级
+        self._ranges = []
+        for keys in (['level', 'script', 'length'], ['level', 'script'], ['level']):
+            group = frame.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+            change = np.flatnonzero(np.diff(group)) + 1
+            bounds = np.concatenate([[0], change, [m]])
+            group_id = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+            self._ranges.append((bounds[group_id], bounds[group_id + 1]))
+
+    def __len__(self):
+        return len(self.values)
+
+    def draw(self, correct, k, rng, hard=False):
+        """
+        为每个正确答案抽取 k 个互不相同、且不等于正确答案的干扰项
+
+        Args:
+            correct: 正确答案数组（长度 n）
+            k: 每题的干扰项个数
+            rng: numpy.random.Generator
+            hard: 困难模式，只在同一桶内字典序相邻的取值中抽取
+
+        Returns:
+            (n, k) 的 object 数组
+        """
+        m = len(self.values)
+        if m - 1 < k:
+            raise ValueError(f"词库中不同的取值不足{k + 1}个，无法生成选项")
+        codes = self._codes.get_indexer(correct)
+        in_pool = codes >= 0
+        safe = np.where(in_pool, codes, 0)
+
+        # 从小到大尝试桶 / (等级, 文字类型) / 等级，取第一个足够大的区间，都不够时用全部取值
+        lo = np.zeros(len(codes), dtype=np.int64)
+        hi = np.full(len(codes), m, dtype=np.int64)
+        chosen = ~in_pool
+        for starts, ends in self._ranges:
+            start, end = starts[safe], ends[safe]
+            fits = ~chosen & (end - start >= k + 1)
+            lo[fits], hi[fits] = start[fits], end[fits]
+            chosen |= fits
+
+        if hard:
+            # 把区间收窄到正确答案前后各 NEAR_WINDOW 个取值（区间够大时）
+            width = np.minimum(hi - lo, 2 * NEAR_WINDOW + 1)
+            near_lo = np.clip(safe - NEAR_WINDOW, lo, hi - width)
+            lo = np.where(in_pool, near_lo, lo)
+            hi = np.where(in_pool, lo + width, hi)
+
+        # 区间内跳过正确答案：偏移 >= 正确答案位置的整体后移一位
+        sizes = hi - lo - in_pool
+        drawn = lo[:, None] + _sample_distinct_offsets(rng, sizes, k)
+        drawn += in_pool[:, None] & (drawn >= codes[:, None])
+        return self.values[drawn]
+
+
+class QuestionBatchGenerator:
+    """基于一份词汇表的批量出题器（只读，可在多个 VocabularyLearningSystem 间共享）"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        levels = frame['level'].to_numpy() if 'level' in frame.columns else np.zeros(len(frame))
+        self._indexes = {}  # 语言 -> DistractorIndex
+        for language in LANGUAGES:
+            if language in frame.columns:
+                self._indexes[language] = DistractorIndex(frame[language].to_numpy(dtype=object), levels)
+
+    def _draw_distractors(self, language, correct, k, rng, hard=False):
+        """为每个正确答案抽取 k 个干扰项，返回 (n, k) 的 object 数组"""
+        return self._indexes[language].draw(correct, k, rng, hard=hard)
+
+    def generate(self, words, mainlanguage, studylanguage, rng=None, question_types=None, hard=False):
+        """
+        为给定的一批单词生成题目
+
+        Args:
+            words: 目标单词 DataFrame（每行一题，可以有重复行，索引为 vocab_id）
+            mainlanguage: 母语列名
+            studylanguage: 学习语言列名
+            rng: numpy.random.Generator，默认新建
+            question_types: 指定题型数组，默认随机
+            hard: 困难模式，干扰项取自拼写相近的单词
+
+        Returns:
+            (questions, options_list, answers, words)，words 为 WordRecord 列表
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        n = len(words)
+        if n == 0:
+            return [], [], [], []
+
+        main = words[mainlanguage].to_numpy(dtype=object)
+        study = words[studylanguage].to_numpy(dtype=object)
+        if question_types is None:
+            question_types = rng.integers(0, 3, n)
+        question_types = np.asarray(question_types)
+
+        # 选择题：正确答案 + 3 个干扰项，整行随机排列
+        is_choice = question_types != TYPE_JUDGE
+        answer_language = np.where(question_types == TYPE_MAIN_TO_STUDY, 0, 1)
+        option_rows = np.empty((n, 4), dtype=object)
+        answer_pos = np.zeros(n, dtype=np.int64)
+        for flag, language, correct in ((0, studylanguage, study), (1, mainlanguage, main)):
+            rows = np.flatnonzero(is_choice & (answer_language == flag))
+            if len(rows) == 0:
+                continue
+            candidates = np.empty((len(rows), 4), dtype=object)
+            candidates[:, 0] = correct[rows]
+            candidates[:, 1:] = self._draw_distractors(language, correct[rows], 3, rng, hard)
+            perm = rng.random((len(rows), 4)).argsort(axis=1)
+            option_rows[rows] = np.take_along_axis(candidates, perm, axis=1)
+            answer_pos[rows] = (perm == 0).argmax(axis=1)
+
+        # 判断题：一半给出本词，一半换成其他单词的母语释义
+        judge_rows = np.flatnonzero(~is_choice)
+        is_correct = rng.random(len(judge_rows)) > 0.5
+        shown_main = main[judge_rows].copy()
+        wrong = np.flatnonzero(~is_correct)
+        if len(wrong):
+            shown_main[wrong] = self._draw_distractors(mainlanguage, main[judge_rows[wrong]], 1, rng, hard)[:, 0]
+        judge_text = dict(zip(judge_rows.tolist(), shown_main.tolist()))
+        judge_answer = dict(zip(judge_rows.tolist(), np.where(is_correct, 'A', 'C').tolist()))
+
+        questions = []
+        options_list = []
+        answers = []
+        letters = OPTION_KEYS[answer_pos].tolist()
+        for i, qtype in enumerate(question_types.tolist()):
+            if qtype == TYPE_MAIN_TO_STUDY:
+                questions.append(f"{main[i]}的{studylanguage}是什么？")
+            elif qtype == TYPE_STUDY_TO_MAIN:
+                questions.append(f"{study[i]}的{mainlanguage}是什么？")
+            else:
+                questions.append(f"判断{judge_text[i]}的{studylanguage}是否为{study[i]}？")
+                options_list.append(dict(JUDGE_OPTIONS))
+                answers.append(judge_answer[i])
+                continue
+            options_list.append(dict(zip(OPTION_KEYS.tolist(), option_rows[i].tolist())))
+            answers.append(letters[i])
+
+        return questions, options_list, answers, WordRecord.from_frame(words)
+
+
+_cache_lock = Lock()
+_cached = None
+
+
+def get_generator(frame):
+    """返回 frame 对应的出题器；共享词汇表不变时复用同一实例"""
+    global _cached
+    with _cache_lock:
+        if _cached is None or _cached.frame is not frame:
+            _cached = QuestionBatchGenerator(frame)
+        return _cached
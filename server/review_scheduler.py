@@ -0,0 +1,243 @@
+"""
+复习本的间隔重复调度（SM-2）
+
+每个 (用户, 单词) 保存 interval_days（当前间隔）、ease_factor（难度系数）、
+repetitions（连续答对次数）和 next_review_time（下次复习时间）：
+- 答对：间隔按 1 天 → 6 天 → 间隔 × 难度系数 增长，难度系数按 SM-2 公式微调
+- 答错：连续次数清零，RELEARN_DELAY 后重新复习，难度系数下降（最低 1.3）
+
+DueQueue 是按到期时间排序的小顶堆（延迟删除），取出 k 个到期单词为 O(k log n)，
+不需要扫描整个复习本；next_review_time 为空（尚未调度）的单词视为已到期。
+reschedule_history() 为导入的历史数据（只有星级、复习次数、最后复习时间，
+没有调度字段）批量推算调度状态。
+"""
+import datetime
+import heapq
+
+import pandas as pd
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# 答错后重新复习的间隔
+RELEARN_DELAY = datetime.timedelta(minutes=10)
+
+# 答题结果对应的 SM-2 评分（0-5）
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+
+class ReviewSchedule:
+    """单个单词的调度状态"""
+
+    __slots__ = ('interval_days', 'ease_factor', 'repetitions', 'next_review_time')
+
+    def __init__(self, interval_days=0.0, ease_factor=DEFAULT_EASE, repetitions=0, next_review_time=None):
+        self.interval_days = float(interval_days)
+        self.ease_factor = float(ease_factor)
+        self.repetitions = int(repetitions)
+        self.next_review_time = to_datetime(next_review_time)
+
+    @classmethod
+    def new(cls, now=None):
+        """新加入复习本：立即到期"""
+        return cls(next_review_time=now or datetime.datetime.now())
+
+    def to_dict(self):
+        """写入队列 / 数据库使用的字段（时间为 ISO 字符串，便于写入日志）"""
+        due = self.next_review_time
+        return {
+            'interval_days': round(self.interval_days, 4),
+            'ease_factor': round(self.ease_factor, 4),
+            'repetitions': self.repetitions,
+            'next_review_time': due.isoformat(sep=' ', timespec='seconds') if due else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(_number(data.get('interval_days'), 0.0),
+                   _number(data.get('ease_factor'), DEFAULT_EASE),
+                   _number(data.get('repetitions'), 0),
+                   to_datetime(data.get('next_review_time')))
+
+    def __repr__(self):
+        return (f"ReviewSchedule(interval_days={self.interval_days}, ease_factor={self.ease_factor}, "
+                f"repetitions={self.repetitions}, next_review_time={self.next_review_time})")
+
+
+def _number(value, default):
+    """数据库返回的 None / NaN / Decimal → float，缺失时用默认值"""
+    if value is None:
+        return default
+    value = float(value)
+    return default if value != value else value
+
+
+def to_datetime(value):
+    """datetime / Timestamp / ISO 字符串 / None → datetime 或 None（NaT / NaN 也返回 None）"""
+    # NaT 是 datetime 的子类，必须在 isinstance 判断之前处理
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    if hasattr(value, 'to_pydatetime'):
+        # pandas Timestamp（也是 datetime 的子类）→ 普通 datetime
+        return value.to_pydatetime().replace(tzinfo=None)
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def review(schedule, quality, now=None):
+    """
+    按 SM-2 计算一次复习后的调度状态
+
+    Args:
+        schedule: 当前 ReviewSchedule（None 视为新单词）
+        quality: 0-5 评分，< 3 视为没记住
+        now: 复习时间，默认当前时间
+
+    Returns:
+        新的 ReviewSchedule
+    """
+    now = now or datetime.datetime.now()
+    schedule = schedule or ReviewSchedule()
+    ease = schedule.ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    ease = max(MIN_EASE, ease)
+
+    if quality < 3:
+        return ReviewSchedule(0.0, ease, 0, now + RELEARN_DELAY)
+
+    repetitions = schedule.repetitions + 1
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = max(schedule.interval_days, 1.0) * ease
+    return ReviewSchedule(interval, ease, repetitions, now + datetime.timedelta(days=interval))
+
+
+def from_history(star=0, review_count=0, weight=10.0, last_reviewed=None, now=None):
+    """
+    由没有调度字段的历史数据推算调度状态
+
+    星级视为连续答对次数，按 SM-2 的间隔序列推算当前间隔；复习权重越高
+    （答错越多）难度系数越低。到期时间 = 最后复习时间 + 间隔。
+    """
+    now = now or datetime.datetime.now()
+    weight = float(weight) if weight is not None else 10.0
+    ease = min(DEFAULT_EASE, max(MIN_EASE, DEFAULT_EASE - (weight - 10.0) / 40.0))
+    repetitions = int(star or 0)
+    if review_count and repetitions > int(review_count):
+        repetitions = int(review_count)
+
+    interval = 0.0
+    for n in range(1, repetitions + 1):
+        interval = 1.0 if n == 1 else 6.0 if n == 2 else interval * ease
+
+    last = to_datetime(last_reviewed) or now
+    return ReviewSchedule(interval, ease, repetitions, last + datetime.timedelta(days=interval))
+
+
+class DueQueue:
+    """按到期时间排序的小顶堆，同一单词只保留最新一项（旧项延迟删除）"""
+
+    def __init__(self, schedules=None):
+        self._due = {}  # vocab_id -> 当前到期时间
+        self._heap = []
+        for vocab_id, schedule in (schedules or {}).items():
+            self._due[vocab_id] = to_datetime(schedule.next_review_time) or datetime.datetime.min
+        self._heap = [(due, vocab_id) for vocab_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._due)
+
+    def push(self, vocab_id, due):
+        """加入或更新单词的到期时间，O(log n)"""
+        due = to_datetime(due) or datetime.datetime.min
+        self._due[vocab_id] = due
+        heapq.heappush(self._heap, (due, vocab_id))
+        # 过期项太多时压缩
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(d, v) for v, d in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, vocab_id):
+        self._due.pop(vocab_id, None)
+
+    def _pop_valid(self):
+        while self._heap:
+            due, vocab_id = heapq.heappop(self._heap)
+            if self._due.get(vocab_id) == due:
+                return due, vocab_id
+        return None
+
+    def take_due(self, now=None, k=1):
+        """
+        返回最多 k 个已到期的单词（最早到期的在前），O(k log n)
+
+        单词仍留在队列中，答题后由 push() 更新到期时间。
+        """
+        now = now or datetime.datetime.now()
+        taken = []
+        while len(taken) < k:
+            item = self._pop_valid()
+            if item is None:
+                break
+            if item[0] > now:
+                heapq.heappush(self._heap, item)
+                break
+            taken.append(item)
+        for item in taken:
+            heapq.heappush(self._heap, item)
+        return [vocab_id for _, vocab_id in taken]
+
+    def next_due_time(self):
+        """最早的到期时间，队列为空时返回 None"""
+        item = self._pop_valid()
+        if item is None:
+            return None
+        heapq.heappush(self._heap, item)
+        return item[0]
+
+
+def reschedule_history(db, username, now=None, only_missing=True):
+    """
+    批量为导入的历史复习数据推算调度状态并写回数据库
+
+    Args:
+        db: 已连接的 DatabaseInterface
+        username: 用户名或 UserSession
+        now: 推算用的当前时间
+        only_missing: True 时只处理还没有调度数据（next_review_time 为空）的单词
+
+    Returns:
+        写入的单词数
+    """
+    review_df = db.get_review_list(username)
+    if review_df.empty:
+        return 0
+    records = db.get_user_records(username)
+    history = {}
+    if not records.empty:
+        for vocab_id, star, count, last in zip(records['vocab_id'].tolist(), records['star'].tolist(),
+                                               records['review_count'].tolist(), records['last_reviewed'].tolist()):
+            history[int(vocab_id)] = (star, count, last)
+
+    schedules = {}
+    for row in review_df.to_dict('records'):
+        vocab_id = int(row['vocab_id'])
+        if only_missing and to_datetime(row.get('next_review_time')) is not None:
+            continue
+        star, count, last = history.get(vocab_id, (0, 0, None))
+        last = to_datetime(row.get('last_reviewed')) or to_datetime(last)
+        schedules[vocab_id] = from_history(star, count, row.get('weight'), last, now)
+
+    if schedules:
+        db.update_review_schedules(username, {k: s.to_dict() for k, s in schedules.items()})
+    print(f"[DEBUG] Rescheduled {len(schedules)} review words for {username}")
+    return len(schedules)
@@ -0,0 +1,287 @@
+"""
+出题用的加权抽样器
+
+- AliasTable：Walker/Vose 别名表，O(n) 构建，O(1) 抽样（支持一次向量化抽取多个）
+- LevelWordSampler：按难度等级、以掌握星级加权抽取单词。同一等级内按 (等级, 星级)
+  分类，先用别名表按 "类内单词数 × 星级权重" 选类，再在类内均匀抽取。
+  星级变化只需把单词从一个类移到另一个类（O(1)），并重建只有几项的类别别名表。
+- FenwickSampler：复习本按权重抽样，树状数组维护权重前缀和，修改和抽样都是 O(log n)，
+  支持不放回地一次抽取 k 个不同的单词。
+"""
+import numpy as np
+
+from server.question_batch import star_weights
+
+# 星级取值范围 0..3
+STAR_LEVELS = 4
+
+
+class AliasTable:
+    """Walker 别名表：按给定权重抽取下标"""
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        total = weights.sum()
+        if n == 0 or total <= 0:
+            raise ValueError("权重全为0，无法抽样")
+        self.n = n
+        self.prob = np.ones(n, dtype=np.float64)
+        self.alias = np.arange(n, dtype=np.int64)
+
+        scaled = weights * (n / total)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # 剩余项由于浮点误差可能略偏离 1，直接视为 1
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def draw(self, rng, size=None):
+        """抽取一个（size=None）或 size 个下标"""
+        column = rng.integers(0, self.n, size)
+        coin = rng.random(size)
+        return np.where(coin < self.prob[column], column, self.alias[column])
+
+
+class LevelWordSampler:
+    """按等级、以掌握星级加权的单词抽样器，返回词汇表中的行位置"""
+
+    def __init__(self, frame, stars=None):
+        """
+        Args:
+            frame: 词汇表 DataFrame（索引为 vocab_id，含 level 列）
+            stars: 以 vocab_id 为索引的星级 Series，缺失的单词视为 0 星
+        """
+        self.frame = frame
+        n = len(frame)
+        self._positions = {vocab_id: pos for pos, vocab_id in enumerate(frame.index.tolist())}
+        if stars is not None and len(stars):
+            star_array = stars.reindex(frame.index, fill_value=0).to_numpy(dtype=np.float64)
+        else:
+            star_array = np.zeros(n)
+        self._star = np.clip(np.nan_to_num(star_array), 0, STAR_LEVELS - 1).astype(np.int8)
+        self._class_weight = star_weights(np.arange(STAR_LEVELS))
+
+        levels = frame['level'].to_numpy() if 'level' in frame.columns else np.zeros(n)
+        self._levels = list(dict.fromkeys(levels.tolist()))
+        self._level_code = {level: code for code, level in enumerate(self._levels)}
+        self._level = np.array([self._level_code[level] for level in levels.tolist()], dtype=np.int64)
+
+        # 每个 (等级, 星级) 类一个定长缓冲区 + 计数，_slot 记录单词在所属缓冲区中的位置
+        level_sizes = np.bincount(self._level, minlength=len(self._levels)) if n else np.zeros(0, np.int64)
+        self._members = {}
+        self._counts = np.zeros((len(self._levels), STAR_LEVELS), dtype=np.int64)
+        self._slot = np.zeros(n, dtype=np.int64)
+        for code in range(len(self._levels)):
+            for star in range(STAR_LEVELS):
+                self._members[(code, star)] = np.empty(level_sizes[code], dtype=np.int64)
+        for pos in range(n):
+            self._append(pos, self._level[pos], self._star[pos])
+
+        self._tables = {}  # 等级代码（None 表示全部等级）-> (类别列表, AliasTable)
+
+    def __len__(self):
+        return len(self._star)
+
+    def _append(self, pos, code, star):
+        count = self._counts[code, star]
+        self._members[(code, star)][count] = pos
+        self._slot[pos] = count
+        self._counts[code, star] = count + 1
+
+    def _remove(self, pos, code, star):
+        """从类中移除（与最后一个元素交换）"""
+        buf = self._members[(code, star)]
+        last_index = self._counts[code, star] - 1
+        last = buf[last_index]
+        buf[self._slot[pos]] = last
+        self._slot[last] = self._slot[pos]
+        self._counts[code, star] = last_index
+
+    def update_star(self, vocab_id, star):
+        """单词星级变化：移到新的类，并使相关的类别别名表失效"""
+        pos = self._positions.get(vocab_id)
+        if pos is None:
+            return
+        star = int(min(max(star, 0), STAR_LEVELS - 1))
+        old = int(self._star[pos])
+        if old == star:
+            return
+        code = int(self._level[pos])
+        self._remove(pos, code, old)
+        self._append(pos, code, star)
+        self._star[pos] = star
+        self._tables.pop(code, None)
+        self._tables.pop(None, None)
+
+    def _table(self, level):
+        """取（必要时重建）某个等级的类别别名表"""
+        if level is None:
+            code = None
+        else:
+            code = self._level_code.get(level)
+            if code is None:
+                raise ValueError(f"难度等级 {level} 没有单词")
+        cached = self._tables.get(code)
+        if cached is None:
+            codes = range(len(self._levels)) if code is None else [code]
+            classes = [(c, s) for c in codes for s in range(STAR_LEVELS) if self._counts[c, s] > 0]
+            if not classes:
+                raise ValueError("词库为空，无法选择单词")
+            weights = [self._counts[c, s] * self._class_weight[s] for c, s in classes]
+            cached = (classes, AliasTable(weights))
+            self._tables[code] = cached
+        return cached
+
+    def draw(self, rng, size, level=None):
+        """
+        抽取 size 个单词（可重复）
+
+        Args:
+            rng: numpy.random.Generator
+            size: 抽取个数
+            level: 难度等级，None 表示全部等级
+
+        Returns:
+            词汇表中的行位置数组
+        """
+        classes, table = self._table(level)
+        chosen = table.draw(rng, size)
+        positions = np.empty(size, dtype=np.int64)
+        for k in np.unique(chosen).tolist():
+            rows = np.flatnonzero(chosen == k)
+            key = classes[k]
+            picks = rng.integers(0, self._counts[key], len(rows))
+            positions[rows] = self._members[key][picks]
+        return positions
+
+
+class FenwickSampler:
+    """
+    树状数组（Fenwick tree）加权抽样器
+
+    按键（vocab_id）维护权重，O(log n) 修改权重、O(log n) 抽样；
+    sample_distinct() 不放回地抽取 k 个不同的键。
+    """
+
+    def __init__(self, keys=(), weights=()):
+        self._keys = list(keys)
+        self._index = {key: i for i, key in enumerate(self._keys)}
+        self._weights = [float(w) for w in weights]
+        if len(self._weights) != len(self._keys):
+            raise ValueError("键和权重的个数不一致")
+        self._rebuild(max(len(self._keys), 8))
+
+    def _rebuild(self, capacity):
+        """按新容量 O(n) 重建树"""
+        self._capacity = capacity
+        self._tree = [0.0] * (capacity + 1)
+        for i, w in enumerate(self._weights):
+            self._tree[i + 1] += w
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                self._tree[parent] += self._tree[i]
+        self._top_bit = 1 << (capacity.bit_length() - 1)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    @property
+    def total(self):
+        """当前全部权重之和"""
+        total = 0.0
+        i = len(self._keys)
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _add(self, i, delta):
+        i += 1
+        while i <= self._capacity:
+            self._tree[i] += delta
+            i += i & -i
+
+    def weight(self, key):
+        return self._weights[self._index[key]]
+
+    def set(self, key, weight):
+        """修改已有键的权重，键不存在时追加"""
+        weight = float(weight)
+        i = self._index.get(key)
+        if i is None:
+            self.add(key, weight)
+            return
+        self._add(i, weight - self._weights[i])
+        self._weights[i] = weight
+
+    def add(self, key, weight):
+        """追加新键（容量不足时翻倍重建）"""
+        if key in self._index:
+            self.set(key, weight)
+            return
+        self._index[key] = len(self._keys)
+        self._keys.append(key)
+        self._weights.append(float(weight))
+        if len(self._keys) > self._capacity:
+            self._rebuild(self._capacity * 2)
+        else:
+            self._add(len(self._keys) - 1, float(weight))
+
+    def _find(self, target):
+        """返回前缀和首次超过 target 的下标"""
+        pos = 0
+        bit = self._top_bit
+        while bit:
+            nxt = pos + bit
+            if nxt <= self._capacity and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            bit >>= 1
+        # 浮点误差可能越过最后一个元素
+        return min(pos, len(self._keys) - 1)
+
+    def sample(self, rng):
+        """按权重抽取一个键"""
+        total = self.total
+        if not self._keys or total <= 0:
+            raise ValueError("复习本为空，无法选择单词")
+        return self._keys[self._find(rng.random() * total)]
+
+    def sample_distinct(self, rng, k, exclude=()):
+        """
+        不放回地按权重抽取 min(k, n) 个不同的键（跳过 exclude 中的键）
+
+        抽中的键暂时把权重置零，抽完后恢复，整体 O(k log n)。
+        """
+        chosen = list(dict.fromkeys(self._index[key] for key in exclude if key in self._index))
+        for i in chosen:
+            self._add(i, -self._weights[i])
+        excluded = len(chosen)
+        k = min(k, len(self._keys) - excluded)
+        try:
+            for _ in range(k):
+                total = self.total
+                if total <= 0:
+                    break
+                i = self._find(rng.random() * total)
+                chosen.append(i)
+                self._add(i, -self._weights[i])
+        finally:
+            for i in chosen:
+                self._add(i, self._weights[i])
+        return [self._keys[i] for i in chosen[excluded:]]
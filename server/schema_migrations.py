@@ -0,0 +1,89 @@
+"""
+openGauss 表结构版本迁移
+
+schema_version 表记录已执行的迁移。OpenGaussDatabase.connect() 时调用 migrate()，
+按版本号顺序执行尚未执行的迁移脚本（每个迁移一个事务，用 advisory lock 防止多个客户端同时迁移）。
+迁移到最新版本后，user_config 的字段集合即为 USER_CONFIG_COLUMNS，不必再查询 information_schema。
+
+新增迁移：在 server/ 下添加可重复执行的 SQL 脚本，并在 MIGRATIONS 末尾追加一项；
+同时更新 init_database.sql（新建库直接记录为最新版本）和 init_sqlite_database.sql。
+"""
+import os
+
+# (版本号, 脚本文件, 说明)
+MIGRATIONS = [
+    (1, 'update_user_config_columns.sql', 'user_config 增加 API 配置、聊天记录和积分字段'),
+    (2, 'add_unique_constraints.sql', '学习记录/复习本/收藏本/每日统计的组合唯一约束'),
+    (3, 'create_leaderboards.sql', '增量维护的排行榜表'),
+    (4, 'add_review_schedule.sql', '复习本的间隔重复调度字段'),
+    (5, 'create_chat_messages.sql', 'AI 助手聊天记录表'),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# 迁移到版本 1 之后 user_config 拥有的全部字段
+USER_CONFIG_COLUMNS_VERSION = 1
+USER_CONFIG_COLUMNS = frozenset([
+    'config_id', 'user_id', 'primary_color', 'api_key', 'api_endpoint', 'api_model',
+    'deepseek_chat_history', 'total_score', 'theme', 'main_language', 'study_language',
+    'difficulty', 'target_score', 'updated_at',
+])
+
+# pg_advisory_xact_lock 的键（任意固定值）
+_MIGRATION_LOCK_KEY = 73110042
+
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def current_version(conn):
+    """读取已执行的最高版本号，schema_version 表不存在时返回 0"""
+    try:
+        rows = conn.prepare("SELECT COALESCE(MAX(version), 0) AS version FROM schema_version")()
+        return int(rows[0]['version'])
+    except Exception:
+        return 0
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(200),
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def migrate(conn):
+    """
+    执行尚未执行的迁移
+
+    Args:
+        conn: py_opengauss 连接
+
+    Returns:
+        迁移后的版本号
+    """
+    version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+
+    _ensure_version_table(conn)
+    for target, filename, description in MIGRATIONS:
+        if target <= version:
+            continue
+        with open(os.path.join(_SERVER_DIR, filename), 'r', encoding='utf-8') as f:
+            sql = f.read()
+
+        with conn.xact():
+            conn.execute(f"SELECT pg_advisory_xact_lock({_MIGRATION_LOCK_KEY})")
+            # 拿到锁后重新确认，其他客户端可能已经执行过
+            if current_version(conn) >= target:
+                version = target
+                continue
+            print(f"[DEBUG] Applying schema migration {target}: {description}")
+            conn.execute(sql)
+            conn.prepare("INSERT INTO schema_version (version, description) VALUES ($1, $2)")(target, description)
+        version = target
+
+    return version
@@ -0,0 +1,36 @@
+-- 为 user_config 补齐 AI 配置、聊天记录和积分字段
+-- 旧版 init_database.sql 创建的库缺少这些字段，客户端曾在每次读写配置时查询
+-- information_schema 判断字段是否存在。由 schema_migrations.py 作为版本 1 执行，可重复执行。
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_config' AND column_name='api_endpoint') THEN
+        ALTER TABLE user_config ADD COLUMN api_endpoint VARCHAR(255) DEFAULT 'https://api.deepseek.com';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_config' AND column_name='api_model') THEN
+        ALTER TABLE user_config ADD COLUMN api_model VARCHAR(50) DEFAULT 'deepseek-chat';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_config' AND column_name='deepseek_chat_history') THEN
+        ALTER TABLE user_config ADD COLUMN deepseek_chat_history TEXT DEFAULT '[]';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_config' AND column_name='total_score') THEN
+        ALTER TABLE user_config ADD COLUMN total_score DECIMAL(12, 2) DEFAULT 0;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_config' AND column_name='difficulty') THEN
+        ALTER TABLE user_config ADD COLUMN difficulty INTEGER DEFAULT 1;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name='user_config' AND column_name='target_score') THEN
+        ALTER TABLE user_config ADD COLUMN target_score INTEGER DEFAULT 10000;
+    END IF;
+END $$;
@@ -0,0 +1,104 @@
+"""
+用户会话
+
+登录（verify_user）时由数据库实现的 open_session() 创建 UserSession，
+携带 user_id 和缓存的用户配置。DatabaseInterface 的所有方法既接受用户名，
+也接受 UserSession；已登录用户即使只传用户名，也会通过 session_registry
+命中缓存的 user_id，写入热路径不再按用户名反查。
+
+删除或重命名用户时必须调用 session_registry.invalidate() / rename()，
+否则缓存的 user_id 可能指向已不存在的用户，或被同名新用户误用。
+"""
+from threading import Lock
+
+
+class UserSession:
+    """登录会话：用户名 + user_id + 缓存的用户配置"""
+
+    def __init__(self, username, user_id=None, config=None):
+        self.username = username
+        self.user_id = user_id
+        self.config = config
+        self.valid = True
+
+    def invalidate(self):
+        """使会话失效（用户被删除）"""
+        self.valid = False
+        self.user_id = None
+        self.config = None
+
+    def __str__(self):
+        # 便于在日志和只需要用户名的旧代码中直接使用
+        return self.username
+
+    def __repr__(self):
+        return f"UserSession(username={self.username!r}, user_id={self.user_id!r}, valid={self.valid})"
+
+
+class SessionRegistry:
+    """按用户名登记的会话表（进程内共享，连接池中的各个连接共用）"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = Lock()
+
+    def register(self, session):
+        """登记会话，同名旧会话被替换"""
+        with self._lock:
+            self._sessions[session.username] = session
+        return session
+
+    def get(self, username):
+        """返回有效会话，不存在时返回 None"""
+        with self._lock:
+            session = self._sessions.get(username)
+        return session if session is not None and session.valid else None
+
+    def resolve(self, user):
+        """UserSession 或用户名 → 有效会话（没有则返回 None）"""
+        if isinstance(user, UserSession):
+            return user if user.valid else None
+        return self.get(user)
+
+    def invalidate(self, username):
+        """用户被删除：移除并使会话失效"""
+        with self._lock:
+            session = self._sessions.pop(username, None)
+        if session is not None:
+            session.invalidate()
+            print(f"[DEBUG] Session invalidated for user {username}")
+
+    def rename(self, old_username, new_username):
+        """用户重命名：user_id 不变，会话改挂到新用户名下"""
+        with self._lock:
+            session = self._sessions.pop(old_username, None)
+            # 新用户名下若有旧会话（理论上不应存在），一并失效
+            stale = self._sessions.pop(new_username, None)
+            if session is not None:
+                session.username = new_username
+                self._sessions[new_username] = session
+        if stale is not None and stale is not session:
+            stale.invalidate()
+
+    def update_config(self, user, fields):
+        """保存配置后同步更新缓存（只合并非 None 的字段）"""
+        session = self.resolve(user)
+        if session is not None and session.config is not None:
+            session.config.update({k: v for k, v in fields.items() if v is not None})
+
+    def clear(self):
+        """注销所有会话"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.invalidate()
+
+
+def session_username(user):
+    """UserSession 或用户名 → 用户名"""
+    return user.username if isinstance(user, UserSession) else user
+
+
+# 全局会话表
+session_registry = SessionRegistry()
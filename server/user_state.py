@@ -0,0 +1,202 @@
+"""
+用户学习状态的内存存储
+
+原来星级（df2）、复习本（df3）、收藏本（df4）都是 DataFrame，答题时逐行
+loc 扩展或 pd.concat，每次都复制整张表，一次长时间练习的代价是平方级的。
+UserStateStore 用以 vocab_id 为键的字典保存这些状态：
+
+- 查询、修改都是 O(1)
+- 每次修改记录在对应表的脏集合中，持久化时只需写入变化的行
+- stars_frame() / review_frame() / bookmarks_frame() 按需导出 DataFrame
+  （供图表、展示等只读代码使用），导出结果缓存到下一次修改为止
+"""
+import pandas as pd
+
+from server.review_scheduler import ReviewSchedule
+from server.word_record import WordRecord
+
+# 复习本 / 收藏本导出时从词汇表取的列
+WORD_COLUMNS = ['Chinese', 'English', 'Japanese', 'level']
+
+# 复习本中调度相关的列
+SCHEDULE_COLUMNS = ['vocab_id', 'next_review_time', 'interval_days', 'ease_factor', 'repetitions']
+
+TABLES = ('stars', 'review', 'schedule', 'bookmarks')
+
+
+class UserStateStore:
+    """以 vocab_id 为键的星级、复习权重和收藏状态"""
+
+    def __init__(self, vocab):
+        """
+        Args:
+            vocab: 共享词汇表 DataFrame（索引为 vocab_id），导出复习本/收藏本时取单词信息
+        """
+        self.vocab = vocab
+        self.stars = {}      # vocab_id -> 星级
+        self.review = {}     # vocab_id -> 复习权重
+        self.schedule = {}   # vocab_id -> ReviewSchedule（复习本中的单词）
+        self.bookmarks = {}  # vocab_id -> None（保持加入顺序）
+        self._dirty = {table: set() for table in TABLES}
+        self._frames = {}
+
+    # ---- 加载
+    def load(self, records=None, review=None, bookmarks=None):
+        """
+        用数据库返回的 DataFrame 替换全部状态（含 vocab_id 列），并清空脏集合
+
+        Args:
+            records: get_user_records() 的结果（vocab_id, star）
+            review: get_review_list() 的结果（vocab_id, weight）
+            bookmarks: get_bookmarks() 的结果（vocab_id）
+        """
+        self.load_records(records)
+        self.load_review(review)
+        self.load_bookmarks(bookmarks)
+
+    def load_records(self, records):
+        """只替换星级"""
+        self.stars = {}
+        if records is not None and not records.empty and 'vocab_id' in records.columns:
+            self.stars = {int(k): int(v) for k, v in zip(records['vocab_id'].tolist(), records['star'].tolist())}
+        self._reset('stars')
+
+    def load_review(self, review):
+        """只替换复习本（权重和调度）"""
+        self.review = {}
+        self.schedule = {}
+        if review is not None and not review.empty and 'vocab_id' in review.columns:
+            weights = review['weight'].tolist() if 'weight' in review.columns else [10.0] * len(review)
+            # 转换 Decimal 为 float
+            self.review = {int(k): float(w) for k, w in zip(review['vocab_id'].tolist(), weights)}
+            if 'next_review_time' in review.columns:
+                columns = [c for c in SCHEDULE_COLUMNS if c in review.columns]
+                self.schedule = {int(row['vocab_id']): ReviewSchedule.from_dict(row)
+                                 for row in review[columns].to_dict('records')}
+        self._reset('review', 'schedule')
+
+    def load_bookmarks(self, bookmarks):
+        """只替换收藏本"""
+        self.bookmarks = {}
+        if bookmarks is not None and not bookmarks.empty and 'vocab_id' in bookmarks.columns:
+            self.bookmarks = dict.fromkeys(int(k) for k in bookmarks['vocab_id'].tolist())
+        self._reset('bookmarks')
+
+    def _reset(self, *tables):
+        for table in tables:
+            self._dirty[table].clear()
+            self._frames.pop(table, None)
+
+    def _touch(self, table, vocab_id):
+        self._dirty[table].add(vocab_id)
+        self._frames.pop(table, None)
+
+    # ---- 星级
+    def get_star(self, vocab_id, default=0):
+        return self.stars.get(vocab_id, default)
+
+    def has_star(self, vocab_id):
+        return vocab_id in self.stars
+
+    def set_star(self, vocab_id, star):
+        self.stars[vocab_id] = int(star)
+        self._touch('stars', vocab_id)
+
+    def ensure_star(self, vocab_id):
+        """没有学习记录的单词记为 0 星"""
+        if vocab_id not in self.stars:
+            self.set_star(vocab_id, 0)
+
+    # ---- 复习本
+    def in_review(self, vocab_id):
+        return vocab_id in self.review
+
+    def review_weight(self, vocab_id):
+        return self.review[vocab_id]
+
+    def set_review_weight(self, vocab_id, weight):
+        """修改或加入复习本"""
+        self.review[vocab_id] = float(weight)
+        self._touch('review', vocab_id)
+
+    def drop_review(self, vocab_id):
+        """从内存中的复习本移除单词（词汇表中已不存在的单词），不写回数据库"""
+        self.review.pop(vocab_id, None)
+        self.schedule.pop(vocab_id, None)
+        self._dirty['review'].discard(vocab_id)
+        self._dirty['schedule'].discard(vocab_id)
+        self._frames.pop('review', None)
+
+    def get_schedule(self, vocab_id):
+        """复习调度状态，尚未调度时返回 None"""
+        return self.schedule.get(vocab_id)
+
+    def set_schedule(self, vocab_id, schedule):
+        self.schedule[vocab_id] = schedule
+        self._touch('schedule', vocab_id)
+
+    # ---- 收藏本
+    def is_bookmarked(self, vocab_id):
+        return vocab_id in self.bookmarks
+
+    def add_bookmark(self, vocab_id):
+        if vocab_id not in self.bookmarks:
+            self.bookmarks[vocab_id] = None
+            self._touch('bookmarks', vocab_id)
+
+    # ---- 脏数据
+    def dirty(self, table):
+        """本次会话中修改过的 vocab_id 集合（副本）"""
+        return set(self._dirty[table])
+
+    def mark_clean(self, table, vocab_ids=None):
+        """持久化成功后清除脏标记，vocab_ids 为 None 时全部清除"""
+        if vocab_ids is None:
+            self._dirty[table].clear()
+        else:
+            self._dirty[table].difference_update(vocab_ids)
+
+    # ---- 导出
+    def _word_rows(self, vocab_ids):
+        """词汇表中对应的行（跳过词汇表中已不存在的单词）"""
+        index = self.vocab.index
+        keys = [k for k in vocab_ids if k in index]
+        return self.vocab.loc[keys, [c for c in WORD_COLUMNS if c in self.vocab.columns]]
+
+    def review_words(self, vocab_ids):
+        """复习本中指定单词的 DataFrame（含 weight 列），O(k)"""
+        frame = self._word_rows(vocab_ids).copy()
+        frame['weight'] = [self.review.get(k) for k in frame.index.tolist()]
+        return frame
+
+    def review_record(self, vocab_id):
+        """复习本中单个单词的 WordRecord，词汇表中已不存在该单词时返回 None"""
+        records = WordRecord.from_frame(self.review_words([vocab_id]))
+        return records[0] if records else None
+
+    def stars_frame(self):
+        """星级表（索引 vocab_id，列 star）"""
+        frame = self._frames.get('stars')
+        if frame is None:
+            frame = pd.DataFrame({'star': list(self.stars.values())},
+                                 index=pd.Index(list(self.stars.keys()), name='vocab_id'))
+            self._frames['stars'] = frame
+        return frame
+
+    def review_frame(self):
+        """复习本（索引 vocab_id，列 Chinese/English/Japanese/level/weight）"""
+        frame = self._frames.get('review')
+        if frame is None:
+            frame = self.review_words(self.review.keys())
+            frame.index.name = 'vocab_id'
+            self._frames['review'] = frame
+        return frame
+
+    def bookmarks_frame(self):
+        """收藏本（索引 vocab_id，列 Chinese/English/Japanese/level）"""
+        frame = self._frames.get('bookmarks')
+        if frame is None:
+            frame = self._word_rows(self.bookmarks.keys()).copy()
+            frame.index.name = 'vocab_id'
+            self._frames['bookmarks'] = frame
+        return frame
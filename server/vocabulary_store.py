@@ -0,0 +1,113 @@
+"""
+进程内共享的只读词汇表
+
+词汇表所有用户共用，且只在服务器端导入新词时变化。HomeWidget、dataWidget、
+ExamContainer、reviewContainer 等各自创建 VocabularyLearningSystem，
+此前每个实例都要完整读取两次词汇表并重建索引。现在整个进程只加载一次：
+
+- vocabulary_store.get(db) 返回共享的 DataFrame（列名 Chinese/English/Japanese/level/id，
+  索引 vocab_id），调用方只能读取或取切片。每列的底层数组都设为只读，原地赋值
+  （df.loc[...] = x、df['level'] += 1 等）会抛出 ValueError；需要修改时先 .copy()。
+  增删列不会被数组只读拦截，同样禁止
+- 每隔 check_interval 秒用 (行数, 最大 created_at) 与数据库比较一次，不一致时重新加载；
+  重新加载生成新的 DataFrame，旧实例持有的引用不受影响
+"""
+import time
+from threading import Lock
+
+import pandas as pd
+
+# 数据库列名 -> 代码中使用的列名（与原 Excel 格式兼容）
+COLUMN_MAPPING = {
+    'chinese': 'Chinese',
+    'english': 'English',
+    'japanese': 'Japanese'
+}
+
+
+def _build_frame(df):
+    """把数据库返回的词汇表整理成共享格式，并压缩数值列"""
+    df = df.rename(columns={k: v for k, v in COLUMN_MAPPING.items() if k in df.columns})
+    if 'vocab_id' in df.columns:
+        df = df.set_index('vocab_id')
+    # created_at 只用于版本检查，不保留在共享表中
+    df = df.drop(columns=['created_at'], errors='ignore')
+    if 'level' in df.columns and not df['level'].isna().any():
+        df['level'] = pd.to_numeric(df['level'], downcast='integer')
+    if pd.api.types.is_integer_dtype(df.index):
+        df.index = df.index.astype('int32')
+    # id 列作为索引的副本（兼容使用 word['id'] 的代码）
+    df['id'] = df.index
+    return _freeze(df)
+
+
+def _freeze(df):
+    """返回数据相同、但每列底层数组只读的 DataFrame（共享表被原地修改时立即报错）"""
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy(copy=True)
+        values.setflags(write=False)
+        columns[column] = values
+    # copy=False：保留只读数组本身，不合并成新的可写数据块
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+class VocabularyStore:
+    """共享词汇表：首次使用时加载，按版本号检测服务器端变化"""
+
+    def __init__(self, check_interval=300.0):
+        self.check_interval = check_interval
+        self._lock = Lock()
+        self._frame = None
+        self._version = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+    def get(self, db):
+        """
+        获取共享词汇表
+
+        Args:
+            db: 已连接的 DatabaseInterface，用于首次加载和版本检查
+
+        Returns:
+            只读 DataFrame（多个调用方共享同一对象）
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._frame is None:
+                self._load(db)
+            elif now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                try:
+                    version = db.get_vocabulary_version()
+                except Exception as e:
+                    print(f"[WARNING] Vocabulary version check failed: {e}")
+                    version = self._version
+                if version != self._version:
+                    print(f"[DEBUG] Vocabulary changed on server ({self._version} -> {version}), reloading")
+                    self._load(db)
+            return self._frame
+
+    def _load(self, db):
+        """加载词汇表（调用方须持有锁）"""
+        version = db.get_vocabulary_version()
+        self._frame = _build_frame(db.get_vocabulary())
+        self._version = version
+        self._checked_at = time.monotonic()
+        self.loads += 1
+        print(f"[DEBUG] Vocabulary loaded: {len(self._frame)} words")
+
+    @property
+    def version(self):
+        return self._version
+
+    def invalidate(self):
+        """丢弃缓存，下次 get() 时重新加载（例如导入新词之后）"""
+        with self._lock:
+            self._frame = None
+            self._version = None
+
+
+# 全局共享词汇表
+vocabulary_store = VocabularyStore()
@@ -0,0 +1,109 @@
+"""
+词汇表的规范化查找索引
+
+choose_ai_words 原来为每个推荐词执行 df1[df1[语言].str.lower() == word.lower()]，
+每次都要把整列转成小写再全表扫描。WordIndex 在词汇表加载后按语言各构建一次：
+
+- normalize()：NFKC（全角 → 半角、兼容字符统一）+ casefold + 去掉空白和标点，
+  "Apple"、"ａｐｐｌｅ"、" apple. " 都规范为 "apple"
+- lookup()：规范化后的精确查找，字典 O(1)
+- match(fuzzy=True)：精确查找不到时，只尝试英语屈折变化还原出的词干（复数、过去式、
+  进行时、比较级），"apples" → "apple"、"studied" → "study"；不做字形相似匹配，
+  避免 "cart" → "car" 这类无关单词被当作推荐词
+
+get_word_index(frame, language) 返回与共享词汇表对应的索引，词汇表重新加载后自动重建。
+"""
+import unicodedata
+from threading import Lock
+
+# 英语屈折词尾 -> 去掉词尾后依次尝试补上的结尾
+INFLECTION_SUFFIXES = (
+    ('ies', ('y',)),
+    ('ied', ('y',)),
+    ('es', ('',)),
+    ('s', ('',)),
+    ('ed', ('e', '')),
+    ('ing', ('e', '')),
+    ('est', ('e', '')),
+    ('er', ('e', '')),
+)
+# 这些词尾前的辅音可能被双写（stopped、running、bigger）
+DOUBLING_SUFFIXES = ('ed', 'ing', 'est', 'er')
+# 词干的最短长度
+MIN_STEM = 2
+
+
+def normalize(text):
+    """规范化单词：NFKC + casefold，去掉空白、标点和符号"""
+    if text is None or text != text:
+        # None / NaN
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] not in 'PZSC')
+
+
+def inflection_stems(key):
+    """规范化后的英语单词 → 可能的原形（按优先顺序），非 ASCII 单词不处理"""
+    if not key.isascii() or not key.isalpha():
+        return []
+    stems = []
+    for suffix, endings in INFLECTION_SUFFIXES:
+        if not key.endswith(suffix) or len(key) - len(suffix) < MIN_STEM:
+            continue
+        base = key[:-len(suffix)]
+        stems.extend(base + ending for ending in endings)
+        if suffix in DOUBLING_SUFFIXES and len(base) > MIN_STEM and base[-1] == base[-2]:
+            stems.append(base[:-1])
+    return stems
+
+
+class WordIndex:
+    """某个语言列的规范化查找索引"""
+
+    def __init__(self, values):
+        """
+        Args:
+            values: 以 vocab_id 为索引的 Series（某个语言列）
+        """
+        self._exact = {}  # 规范化单词 -> 第一个 vocab_id
+        for vocab_id, value in zip(values.index.tolist(), values.tolist()):
+            key = normalize(value)
+            if key and key not in self._exact:
+                self._exact[key] = vocab_id
+
+    def __len__(self):
+        return len(self._exact)
+
+    def lookup(self, word):
+        """精确查找（规范化后），找不到时返回 None"""
+        return self._exact.get(normalize(word))
+
+    def match(self, word, fuzzy=False):
+        """先精确查找，找不到且 fuzzy 时再按屈折变化还原的词干查找"""
+        key = normalize(word)
+        vocab_id = self._exact.get(key)
+        if vocab_id is None and fuzzy:
+            for stem in inflection_stems(key):
+                vocab_id = self._exact.get(stem)
+                if vocab_id is not None:
+                    break
+        return vocab_id
+
+
+_cache_lock = Lock()
+_cached_frame = None
+_cached = {}  # 语言 -> WordIndex
+
+
+def get_word_index(frame, language):
+    """返回 frame 中 language 列的索引；共享词汇表不变时复用"""
+    global _cached_frame
+    with _cache_lock:
+        if _cached_frame is not frame:
+            _cached_frame = frame
+            _cached.clear()
+        index = _cached.get(language)
+        if index is None:
+            index = WordIndex(frame[language])
+            _cached[language] = index
+        return index
@@ -0,0 +1,84 @@
+"""
+出题流程中使用的轻量单词记录
+
+generate_question / choose_word 等原来返回 pandas Series，界面和 handle_*_answer
+每次 word[语言]、word.name 都要走 Series 的索引逻辑，并且一直持有整张表的引用。
+WordRecord 使用 __slots__ 只保存几个字段，不可修改。
+
+兼容旧代码：word.name 为 vocab_id，word['Chinese'] / word['id'] 等下标访问、
+word.get()、'English' in word 仍然可用；确实需要 Series 时调用 to_series()。
+"""
+
+# 记录保存的字段（与词汇表 / 复习本的列名一致），name 为 vocab_id
+FIELDS = ('Chinese', 'English', 'Japanese', 'level', 'weight')
+
+
+class WordRecord:
+    """不可变的单词记录"""
+
+    __slots__ = ('name',) + FIELDS
+
+    def __init__(self, name, Chinese=None, English=None, Japanese=None, level=None, weight=None):
+        setter = object.__setattr__
+        setter(self, 'name', name)
+        setter(self, 'Chinese', Chinese)
+        setter(self, 'English', English)
+        setter(self, 'Japanese', Japanese)
+        setter(self, 'level', level)
+        setter(self, 'weight', weight)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """把 DataFrame（索引为 vocab_id）的每一行转为记录，按列整体取值，不逐行构造 Series"""
+        columns = [frame[field].tolist() if field in frame.columns else [None] * len(frame)
+                   for field in FIELDS]
+        return [cls(name, *values) for name, *values in zip(frame.index.tolist(), *columns)]
+
+    @property
+    def id(self):
+        return self.name
+
+    def __setattr__(self, key, value):
+        raise AttributeError("WordRecord is immutable")
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.name
+        if key in FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key == 'id' or key in FIELDS
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def keys(self):
+        return ['id'] + [field for field in FIELDS if getattr(self, field) is not None]
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+    def to_series(self):
+        """兼容需要 pandas Series 的旧代码"""
+        import pandas as pd
+        return pd.Series(self.to_dict(), name=self.name)
+
+    def __eq__(self, other):
+        if not isinstance(other, WordRecord):
+            return NotImplemented
+        return self.name == other.name and all(getattr(self, f) == getattr(other, f) for f in FIELDS)
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return f"WordRecord({self.name!r}, Chinese={self.Chinese!r}, English={self.English!r}, Japanese={self.Japanese!r})"
+
+    def __reduce__(self):
+        return (WordRecord, (self.name,) + tuple(getattr(self, f) for f in FIELDS))
@@ -0,0 +1,405 @@
+"""
+答题写入的异步回写队列（write-behind）
+
+答题时 VocabularyLearningSystem 只把写操作放进队列并追加到本地日志，
+由后台线程使用独立的数据库连接批量写入（Excel 等内存后端没有独立连接，
+批次在调用方线程写入界面的数据库实例，后台线程不访问该实例，见 share_db）：
+- 同一 (用户, 操作, vocab_id) 的多次更新在内存中合并，只写最后的值
+- 每隔 flush_interval 秒、以及会话结束（update_day_stats / 程序退出）时批量刷新，
+  星级 / 复习权重 / 调度按用户合并为一次批量写入（一个事务）
+- 每个操作先追加到 pending_writes.jsonl（只写入操作系统缓冲，不在界面线程 fsync），
+  程序崩溃后下次启动自动重放；批次写入数据库失败时把待重试的日志 fsync 落盘（不在入队时进行）。
+  断电时最多丢失最近一个刷新周期内、尚未写入数据库的答题
+
+合并后的操作都是幂等的（设置星级/权重、不存在才插入），重放已部分写入的批次不会出错。
+注意：合并后同一单词在一次刷新内只计一次 review_count。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+# 刷新时按此顺序执行：先加入复习本，再更新其权重和调度
+OPERATIONS = ('update_user_record', 'add_to_review_list', 'update_review_weight', 'update_review_schedule',
+              'add_bookmark')
+
+# 界面线程调用 flush() 时最多等待的秒数：数据库慢或不可用时不冻结界面，
+# 未完成的写入留在队列和日志中由后台线程继续写入；只有 close() 完整等待
+UI_FLUSH_TIMEOUT = 0.5
+
+# 有批量接口的操作：刷新时同一用户的多条合并为一次调用（一个事务）
+BATCH_METHODS = {
+    'update_user_record': 'update_user_records',
+    'update_review_weight': 'update_review_weights',
+    'update_review_schedule': 'update_review_schedules',
+}
+
+
+def _default_db_factory():
+    """后台线程使用的独立数据库连接"""
+    from server.database_manager import DatabaseFactory
+    db = DatabaseFactory.from_config_file('config.json')
+    if db and db.connect():
+        return db
+    return None
+
+
+class WriteBehindQueue:
+    """合并写入 + 定时批量刷新 + 崩溃安全日志"""
+
+    def __init__(self, journal_path, db_factory=_default_db_factory, flush_interval=2.0, shared_db=None):
+        """
+        Args:
+            shared_db: 后台线程直接使用的数据库实例（见 share_db），None 时用 db_factory 创建连接
+        """
+        self.journal_path = journal_path
+        self.flushing_path = journal_path + '.flushing'
+        self.db_factory = db_factory
+        self.flush_interval = flush_interval
+
+        self._cond = threading.Condition()
+        self._pending = {}  # (op, username, vocab_id) -> value
+        self._in_flight = False
+        self._flush_requested = False
+        self._closed = False
+        self._journal = None
+        self._db = None              # 后台线程自己创建的连接
+        self._shared_db = shared_db  # 调用方共享的实例（内存后端），不由队列关闭
+        self._last_write = time.monotonic()  # 共享实例上次写入的时间
+        self.stats = {'enqueued': 0, 'coalesced': 0, 'written': 0, 'flushes': 0, 'failures': 0}
+
+        self._replay_journal()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def share_db(self, db):
+        """
+        直接写入调用方的数据库实例
+
+        Excel 后端的数据保存在实例内存中，独立创建的实例与界面使用的实例互不可见；
+        第一个登记的实例作为主实例，之后的登记忽略。ExcelDatabase 不是线程安全的，
+        所以批次改为在调用方线程（入队时距上次写入超过 flush_interval、flush()、close()）
+        写入，后台线程不再访问该实例
+        """
+        with self._cond:
+            if self._shared_db is None:
+                self._shared_db = db
+
+    # ---- 入队接口（与 DatabaseInterface 同名）
+    def update_user_record(self, username, vocab_id, star):
+        self._enqueue('update_user_record', username, vocab_id, int(star))
+
+    def add_to_review_list(self, username, vocab_id, weight=10.0):
+        self._enqueue('add_to_review_list', username, vocab_id, float(weight))
+
+    def update_review_weight(self, username, vocab_id, weight):
+        self._enqueue('update_review_weight', username, vocab_id, float(weight))
+
+    def update_review_schedule(self, username, vocab_id, schedule):
+        # schedule 为 ReviewSchedule.to_dict()，可直接写入日志
+        self._enqueue('update_review_schedule', username, vocab_id, dict(schedule))
+
+    def add_bookmark(self, username, vocab_id):
+        self._enqueue('add_bookmark', username, vocab_id, None)
+
+    # 批量入队：整批只写一次日志
+    def update_user_records(self, username, stars):
+        self._enqueue_many('update_user_record', username, {k: int(v) for k, v in stars.items()})
+
+    def update_review_weights(self, username, weights):
+        self._enqueue_many('update_review_weight', username, {k: float(v) for k, v in weights.items()})
+
+    def update_review_schedules(self, username, schedules):
+        self._enqueue_many('update_review_schedule', username, {k: dict(v) for k, v in schedules.items()})
+
+    def _enqueue(self, op, username, vocab_id, value):
+        from server.user_session import session_username
+        key = (op, session_username(username), int(vocab_id))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._append_journal(key, value)
+            if key in self._pending:
+                self.stats['coalesced'] += 1
+            self._pending[key] = value
+            self.stats['enqueued'] += 1
+        self._write_inline_if_due()
+
+    def _enqueue_many(self, op, username, values):
+        """{vocab_id: value} 一次入队"""
+        from server.user_session import session_username
+        if not values:
+            return
+        user = session_username(username)
+        keys = {(op, user, int(vocab_id)): value for vocab_id, value in values.items()}
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._append_journal_many(keys)
+            for key, value in keys.items():
+                if key in self._pending:
+                    self.stats['coalesced'] += 1
+                self._pending[key] = value
+            self.stats['enqueued'] += len(keys)
+        self._write_inline_if_due()
+
+    # ---- 日志
+    def _append_journal(self, key, value):
+        """追加一条日志（调用方须持有锁）"""
+        self._append_journal_many({key: value})
+
+    def _append_journal_many(self, entries):
+        """追加多条日志，flush 到操作系统但不 fsync（在界面线程调用，调用方须持有锁）"""
+        try:
+            if self._journal is None:
+                os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            now = time.time()
+            self._journal.write(''.join(
+                json.dumps({'op': op, 'user': username, 'vocab_id': vocab_id,
+                            'value': value, 'ts': now}, ensure_ascii=False) + '\n'
+                for (op, username, vocab_id), value in entries.items()))
+            self._journal.flush()
+        except Exception as e:
+            # 日志失败不影响答题，只是失去崩溃保护
+            print(f"[WARNING] Failed to write journal: {e}")
+
+    def _sync_flushing(self):
+        """批次写入失败：把等待重试的日志 fsync 落盘（写入批次的线程调用，不持有锁）"""
+        try:
+            if os.path.exists(self.flushing_path):
+                with open(self.flushing_path, 'a', encoding='utf-8') as f:
+                    os.fsync(f.fileno())
+        except Exception as e:
+            print(f"[WARNING] Failed to sync journal: {e}")
+
+    def _rotate_journal(self):
+        """把当前日志并入 .flushing 文件，新的写入进入空日志（调用方须持有锁）"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.flushing_path):
+            # 上次刷新失败留下的批次仍未确认，追加在其后
+            with open(self.journal_path, 'r', encoding='utf-8') as src, \
+                    open(self.flushing_path, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.flushing_path)
+
+    def _replay_journal(self):
+        """启动时重放上次未写入数据库的日志"""
+        replayed = 0
+        for path in (self.flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能只写了一半
+                        continue
+                    if entry.get('op') not in OPERATIONS:
+                        continue
+                    self._pending[(entry['op'], entry['user'], int(entry['vocab_id']))] = entry.get('value')
+                    replayed += 1
+        if replayed:
+            print(f"[DEBUG] Replaying {replayed} journaled writes ({len(self._pending)} after coalescing)")
+            self._flush_requested = True
+
+    # ---- 批次
+    def _take_batch(self):
+        """取出待写入的批次并轮换日志（调用方须持有锁）"""
+        batch = self._pending
+        self._pending = {}
+        self._in_flight = True
+        self._flush_requested = False
+        try:
+            self._rotate_journal()
+        except Exception as e:
+            print(f"[WARNING] Failed to rotate journal: {e}")
+        return batch
+
+    def _finish_batch(self, batch, ok):
+        """批次写入结束（调用方须持有锁）"""
+        self._in_flight = False
+        if ok:
+            try:
+                if os.path.exists(self.flushing_path):
+                    os.remove(self.flushing_path)
+            except Exception as e:
+                print(f"[WARNING] Failed to remove flushed journal: {e}")
+        else:
+            # 失败：放回队列（保留期间产生的更新值），日志文件保留等待下次重试
+            for key, value in batch.items():
+                self._pending.setdefault(key, value)
+        self._cond.notify_all()
+
+    def _write_inline(self):
+        """共享实例：在调用方线程写入当前批次，全部写入返回 True"""
+        with self._cond:
+            if self._in_flight:
+                return False
+            if not self._pending:
+                return True
+            batch = self._take_batch()
+        ok = self._write_batch(batch)
+        with self._cond:
+            self._finish_batch(batch, ok)
+            self._last_write = time.monotonic()
+        if not ok:
+            self._sync_flushing()
+        return ok
+
+    def _write_inline_if_due(self):
+        """共享实例：距上次写入超过 flush_interval 时在调用方线程写入"""
+        if self._shared_db is not None and time.monotonic() - self._last_write >= self.flush_interval:
+            self._write_inline()
+
+    # ---- 后台线程
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._flush_requested and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if not self._pending or self._shared_db is not None:
+                    # 共享实例的批次由调用方线程写入（_write_inline）
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                    continue
+                batch = self._take_batch()
+
+            ok = self._write_batch(batch)
+
+            with self._cond:
+                self._finish_batch(batch, ok)
+                if self._closed and (ok is False or not self._pending):
+                    return
+            if not ok:
+                self._sync_flushing()
+                time.sleep(self.flush_interval)
+
+    def _write_batch(self, batch):
+        """把一批合并后的操作写入数据库，成功返回 True"""
+        try:
+            db = self._shared_db
+            if db is None:
+                if self._db is None or not self._db.ping():
+                    self._db = self.db_factory()
+                    if self._db is None:
+                        raise RuntimeError("database not available")
+                db = self._db
+
+            for op in OPERATIONS:
+                items = [(username, vocab_id, value)
+                         for (key_op, username, vocab_id), value in batch.items() if key_op == op]
+                if not items:
+                    continue
+                if op in BATCH_METHODS and hasattr(db, BATCH_METHODS[op]):
+                    # 同一用户的更新合并为一次批量写入
+                    grouped = {}
+                    for username, vocab_id, value in items:
+                        grouped.setdefault(username, {})[vocab_id] = value
+                    method = getattr(db, BATCH_METHODS[op])
+                    for username, values in grouped.items():
+                        method(username, values)
+                    continue
+                method = getattr(db, op)
+                for username, vocab_id, value in items:
+                    if op == 'add_bookmark':
+                        method(username, vocab_id)
+                    else:
+                        method(username, vocab_id, value)
+
+            self.stats['written'] += len(batch)
+            self.stats['flushes'] += 1
+            return True
+        except Exception as e:
+            print(f"[ERROR] Write-behind flush failed, will retry: {e}")
+            self.stats['failures'] += 1
+            if self._db is not None:
+                try:
+                    self._db.close()
+                except Exception:
+                    pass
+                self._db = None
+            return False
+
+    # ---- 控制接口
+    def flush(self, timeout=10.0):
+        """
+        立即刷新并等待完成，全部写入返回 True
+
+        超时只是不再等待：刷新请求仍由后台线程完成，写入仍在日志中。
+        共享实例（内存后端）直接在调用方线程写入，不受 timeout 影响
+        """
+        if self._shared_db is not None:
+            return self._write_inline()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    print("[WARNING] Write-behind flush timed out, writes remain journaled")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    def close(self, timeout=10.0):
+        """程序退出时刷新剩余写入并停止后台线程"""
+        with self._cond:
+            if self._closed:
+                return
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_write_behind(db=None):
+    """
+    进程内共享的回写队列（首次调用时重放日志并启动后台线程）
+
+    Args:
+        db: 调用方的数据库实例；内存后端（Excel）时后台线程直接写入该实例
+    """
+    global _instance
+    with _instance_lock:
+        shared_db = db if db is not None and db.in_memory else None
+        if _instance is None:
+            journal_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pending_writes.jsonl')
+            # 启动时重放的日志也要写入共享实例，所以在后台线程启动前传入
+            _instance = WriteBehindQueue(journal_path, shared_db=shared_db)
+            atexit.register(_instance.close)
+        elif shared_db is not None:
+            _instance.share_db(shared_db)
+        return _instance
@@ -0,0 +1,58 @@
+"""db_connection_pool：退出时关闭连接"""
+import pytest
+
+from client.db_connection_pool import DatabaseConnection, connection_pool
+
+
+class _FakeDb:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self):
+        return True
+
+    def close(self):
+        # ExcelDatabase 在 close() 时保存修改过的表
+        self.closed = True
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """用假连接替换全局连接池的连接创建，返回已创建的连接列表"""
+    created = []
+
+    def create():
+        db = _FakeDb()
+        created.append(db)
+        return db
+
+    monkeypatch.setattr(connection_pool, '_create_connection', create)
+    monkeypatch.setattr(connection_pool, '_idle', type(connection_pool._idle)())
+    monkeypatch.setattr(connection_pool, '_size', 0)
+    monkeypatch.setattr(connection_pool, '_shutdown', False)
+    return created
+
+
+def test_shutdown_closes_idle_and_returned_connections(created):
+    pool = connection_pool
+    borrowed = pool.acquire()
+    with DatabaseConnection() as idle_db:
+        pass
+    assert created == [borrowed, idle_db]
+
+    pool.shutdown()
+    assert idle_db.closed
+    assert not borrowed.closed
+
+    # 退出时仍在借出中的连接，归还时直接关闭而不是放回池中
+    pool.release(borrowed)
+    assert borrowed.closed
+    assert pool.get_stats()['size'] == 0
+
+
+def test_connection_failure_raises(created, monkeypatch):
+    monkeypatch.setattr(connection_pool, '_create_connection', lambda: None)
+    with pytest.raises(RuntimeError):
+        with DatabaseConnection():
+            pass
+    assert connection_pool.get_stats()['size'] == 0
@@ -0,0 +1,86 @@
+"""review_scheduler：未调度的单词（next_review_time 为 NULL / NaT）"""
+import datetime
+import os
+
+import pandas as pd
+
+from server.database_manager import SQLiteDatabase
+from server.review_scheduler import DueQueue, ReviewSchedule, reschedule_history, to_datetime
+
+NOW = datetime.datetime(2025, 1, 10, 12, 0, 0)
+
+
+def test_to_datetime_missing_values():
+    assert to_datetime(pd.NaT) is None
+    assert to_datetime(None) is None
+    assert to_datetime(float('nan')) is None
+    assert to_datetime(pd.Timestamp(NOW)) == NOW
+    assert type(to_datetime(pd.Timestamp(NOW))) is datetime.datetime
+
+
+def test_from_dict_nat_and_none():
+    for missing in (pd.NaT, None):
+        schedule = ReviewSchedule.from_dict({'next_review_time': missing})
+        assert schedule.next_review_time is None
+        assert schedule.to_dict()['next_review_time'] is None
+
+
+def test_due_queue_serves_unscheduled_words():
+    schedules = {
+        1: ReviewSchedule(next_review_time=pd.NaT),
+        2: ReviewSchedule(next_review_time=NOW + datetime.timedelta(days=3)),
+        3: ReviewSchedule(next_review_time=None),
+        4: ReviewSchedule(next_review_time=pd.Timestamp(NOW - datetime.timedelta(hours=1))),
+    }
+    queue = DueQueue(schedules)
+    assert sorted(queue.take_due(NOW, k=5)) == [1, 3, 4]
+
+    queue.push(5, pd.NaT)
+    assert 5 in queue.take_due(NOW, k=5)
+
+
+class _FrameDb:
+    """get_review_list 返回 datetime64 列（NULL 为 NaT）的数据库"""
+
+    def __init__(self):
+        self.written = None
+
+    def get_review_list(self, username):
+        return pd.DataFrame({
+            'vocab_id': [1, 2, 3],
+            'weight': [10.0, 20.0, 10.0],
+            'last_reviewed': pd.to_datetime([NOW, None, NOW]),
+            'next_review_time': pd.to_datetime([None, None, NOW]),
+        })
+
+    def get_user_records(self, username):
+        return pd.DataFrame({'vocab_id': [1], 'star': [2], 'review_count': [2], 'last_reviewed': [NOW]})
+
+    def update_review_schedules(self, username, schedules):
+        self.written = schedules
+
+
+def test_reschedule_history_nat_rows():
+    db = _FrameDb()
+    assert reschedule_history(db, 'u', now=NOW) == 2
+    assert sorted(db.written) == [1, 2]
+    assert all(s['next_review_time'] not in (None, 'NaT') for s in db.written.values())
+
+
+def test_reschedule_history_sqlite(tmp_path):
+    db = SQLiteDatabase(db_path=os.path.join(tmp_path, 'vocab.db'))
+    db.connect()
+    try:
+        db.import_vocabulary(pd.DataFrame({'english': ['apple', 'book'], 'chinese': ['苹果', '书'],
+                                           'japanese': ['りんご', '本'], 'level': [1, 1]}))
+        db._create_user('u', 'x')
+        for vocab_id in (1, 2):
+            db.add_to_review_list('u', vocab_id)
+
+        assert reschedule_history(db, 'u', now=NOW) == 2
+        due = pd.to_datetime(db.get_review_list('u')['next_review_time'])
+        assert due.notna().all()
+        # 已调度的单词不再重复推算
+        assert reschedule_history(db, 'u', now=NOW) == 0
+    finally:
+        db.close()
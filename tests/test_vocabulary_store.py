@@ -0,0 +1,44 @@
+"""vocabulary_store：共享词汇表只读"""
+import pandas as pd
+import pytest
+
+from server.vocabulary_store import VocabularyStore
+
+
+class _VocabDb:
+    def __init__(self):
+        self.vocab = pd.DataFrame({
+            'vocab_id': [1, 2],
+            'chinese': ['苹果', '书'],
+            'english': ['apple', 'book'],
+            'japanese': ['りんご', '本'],
+            'level': [1, 2],
+        })
+
+    def get_vocabulary(self):
+        return self.vocab
+
+    def get_vocabulary_version(self):
+        return (len(self.vocab), None)
+
+
+def test_shared_frame_is_read_only():
+    db = _VocabDb()
+    store = VocabularyStore()
+    frame = store.get(db)
+    assert store.get(db) is frame
+    assert list(frame.columns) == ['Chinese', 'English', 'Japanese', 'level', 'id']
+    assert frame.loc[2, 'English'] == 'book'
+    assert frame.loc[2, 'id'] == 2
+
+    with pytest.raises(ValueError):
+        frame.loc[1, 'English'] = 'pear'
+    with pytest.raises(ValueError):
+        frame.iat[0, 3] = 5
+    assert frame.loc[1, 'English'] == 'apple'
+
+    # 切片和副本可以修改，且不影响共享表和数据库返回的原表
+    subset = frame[frame['level'] == 1].copy()
+    subset.loc[1, 'English'] = 'pear'
+    assert frame.loc[1, 'English'] == 'apple'
+    assert db.vocab.loc[0, 'english'] == 'apple'
@@ -0,0 +1,117 @@
+"""write_behind：日志落盘不在调用线程上进行"""
+import os
+import threading
+import time
+
+from server import write_behind
+from server.write_behind import WriteBehindQueue
+
+
+class _RecordingDb:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.stars = {}
+        self.threads = set()
+
+    def ping(self):
+        return True
+
+    def close(self):
+        pass
+
+    def update_user_records(self, username, stars):
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise RuntimeError("database down")
+        self.stars.update(stars)
+
+
+def _track_fsync(monkeypatch):
+    threads = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        threads.append(threading.current_thread().name)
+        real_fsync(fd)
+
+    monkeypatch.setattr(write_behind.os, 'fsync', fsync)
+    return threads
+
+
+def test_enqueue_does_not_fsync(tmp_path, monkeypatch):
+    fsync_threads = _track_fsync(monkeypatch)
+    db = _RecordingDb()
+    queue = WriteBehindQueue(str(tmp_path / 'pending.jsonl'), db_factory=lambda: db, flush_interval=60)
+    try:
+        for star in range(5):
+            queue.update_user_record('alice', 7, star)
+        assert fsync_threads == []
+        # 未刷新前日志已写入操作系统，进程崩溃后可以重放
+        assert len((tmp_path / 'pending.jsonl').read_text(encoding='utf-8').splitlines()) == 5
+        assert queue.flush()
+        assert db.stars == {7: 4}
+    finally:
+        queue.close()
+    assert fsync_threads == []
+
+
+def test_failed_batch_is_synced_by_worker(tmp_path, monkeypatch):
+    fsync_threads = _track_fsync(monkeypatch)
+    journal = str(tmp_path / 'pending.jsonl')
+    queue = WriteBehindQueue(journal, db_factory=lambda: _RecordingDb(fail=True), flush_interval=0.05)
+    try:
+        queue.update_user_record('alice', 7, 3)
+        assert not queue.flush(timeout=0.3)
+        assert fsync_threads and set(fsync_threads) == {'write-behind'}
+    finally:
+        queue.close(timeout=0.3)
+
+    # 下次启动重放未写入的日志
+    db = _RecordingDb()
+    queue = WriteBehindQueue(journal, db_factory=lambda: db, flush_interval=60)
+    try:
+        assert queue.flush()
+        assert db.stars == {7: 3}
+    finally:
+        queue.close()
+
+
+def test_shared_db_is_used_instead_of_factory(tmp_path):
+    def factory():
+        raise AssertionError("shared database must be used")
+
+    journal = str(tmp_path / 'pending.jsonl')
+    main_db = _RecordingDb()
+    queue = WriteBehindQueue(journal, db_factory=factory, flush_interval=60)
+    try:
+        queue.share_db(main_db)
+        queue.share_db(_RecordingDb())  # 之后登记的实例被忽略
+        queue.update_user_record('alice', 7, 2)
+        assert queue.flush()
+        assert main_db.stars == {7: 2}
+    finally:
+        queue.close()
+
+    # 构造时直接传入共享实例（get_write_behind 用这种方式，启动重放的日志也写入它）
+    queue = WriteBehindQueue(journal, db_factory=factory, flush_interval=60, shared_db=main_db)
+    queue.update_user_record('alice', 8, 1)
+    queue.close()
+    assert main_db.stars == {7: 2, 8: 1}
+    assert not os.path.exists(journal + '.flushing')
+
+    # 共享实例不是线程安全的，只在调用方线程写入
+    assert main_db.threads == {threading.current_thread().name}
+
+
+def test_shared_db_written_on_enqueue_when_due(tmp_path):
+    main_db = _RecordingDb()
+    queue = WriteBehindQueue(str(tmp_path / 'pending.jsonl'), db_factory=None, flush_interval=0.05,
+                             shared_db=main_db)
+    try:
+        time.sleep(0.06)
+        queue.update_user_record('alice', 7, 2)
+        assert main_db.stars == {7: 2}
+        assert queue.pending_count() == 0
+        assert main_db.threads == {threading.current_thread().name}
+    finally:
+        queue.close()